@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+PuzzleBossBattle 对局记录分析
+流式读取游戏导出的对局记录（格式见 src/js/replayLog.js），汇总分数、连击、道具使用和Boss关卡通过情况
+
+文件通过内存映射逐行读取，每局结束后只保留累加的计数，内存占用与记录数量无关。
+大文件按对局边界切分成多个片段，和多个文件一起分给进程池并行分析。
+
+使用方法：
+    python analytics/analyze_replays.py puzzle-replays.log        # 分析单个文件
+    python analytics/analyze_replays.py logs/                     # 分析目录下所有 .log 文件
+    python analytics/analyze_replays.py logs/ --jobs 4            # 使用4个进程
+    python analytics/analyze_replays.py logs/ --json report.json  # 另存JSON报告
+
+只依赖Python标准库，可离线运行。
+"""
+
+import os
+import sys
+import argparse
+import collections
+import concurrent.futures
+import json
+import mmap
+import time
+
+# 大文件切分的片段大小（字节），片段边界对齐到对局开头
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# 分数分布的分组宽度
+SCORE_BUCKET = 100
+
+# 报告中列出的最难关卡数
+HARDEST_LEVELS = 10
+
+# 对局结束的结算结果（lose 之后Boss战会重新开始当前关卡，不算结束）
+FINAL_RESULTS = {'over', 'clear', 'quit'}
+
+def positive_int(value):
+    """解析正整数参数"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"必须是正整数: {value}")
+    return number
+
+def parse_arguments():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description="PuzzleBossBattle 对局记录分析",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python analytics/analyze_replays.py puzzle-replays.log
+  python analytics/analyze_replays.py logs/ --jobs 4
+  python analytics/analyze_replays.py logs/ --json report.json
+        """
+    )
+
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="对局记录文件或目录（目录中递归查找 .log 文件）"
+    )
+
+    parser.add_argument(
+        "--jobs", "-j",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="并行分析的进程数（默认: CPU核心数）"
+    )
+
+    parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="把完整统计结果保存为JSON文件"
+    )
+
+    return parser.parse_args()
+
+def find_log_files(paths):
+    """列出所有要分析的文件，目录中递归查找 .log 文件"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in sorted(os.walk(path)):
+                files.extend(os.path.join(directory, name) for name in sorted(names) if name.endswith('.log'))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"[错误] 文件不存在: {path}")
+            sys.exit(1)
+    return files
+
+def split_file(path, chunk_bytes=CHUNK_BYTES):
+    """把文件切分为 (路径, 起始, 结束) 片段，每个片段从一局的开头（G 行）开始"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    bounds = [0]
+    if size > chunk_bytes:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = chunk_bytes
+            while position < size:
+                game_start = data.find(b'\nG ', position)
+                if game_start < 0:
+                    break
+                bounds.append(game_start + 1)
+                position = game_start + 1 + chunk_bytes
+    bounds.append(size)
+    return [(path, start, end) for start, end in zip(bounds, bounds[1:])]
+
+def new_stats():
+    """可以直接累加的空统计"""
+    return {
+        'files': 0,
+        'lines': 0,
+        'bad_lines': 0,
+        'games': collections.Counter(),       # 按模式统计的对局数
+        'results': collections.Counter(),     # 按最终结算统计的对局数（没有结算的记为 unfinished）
+        'swaps': 0,                           # 有效交换
+        'invalid_swaps': 0,                   # 没有形成匹配被换回的交换
+        'combos': collections.Counter(),      # 每次有效交换的连击数分布
+        'combo_max': 0,
+        'score_total': 0,
+        'score_max': 0,
+        'scores': collections.Counter(),      # 每局最终分数分布（按 SCORE_BUCKET 分组）
+        'items': collections.Counter(),       # 各道具使用次数
+        'games_with_items': 0,
+        'levels': collections.defaultdict(collections.Counter)  # {关卡: {attempts, wins, losses, quits, moves}}
+    }
+
+def merge_stats(total, stats):
+    """累加两份统计"""
+    for key, value in stats.items():
+        if key == 'levels':
+            for level, counts in value.items():
+                total['levels'][level].update(counts)
+        elif key.endswith('_max'):
+            total[key] = max(total[key], value)
+        elif isinstance(value, collections.Counter):
+            total[key].update(value)
+        else:
+            total[key] += value
+    return total
+
+class GameState:
+    """正在读取的一局"""
+
+    __slots__ = ('mode', 'score', 'items', 'result', 'level', 'level_moves')
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.score = 0          # 最近一行记录的分数（交换行中为未转换的字节串）
+        self.items = 0
+        self.result = None
+        self.level = None       # 正在进行的Boss关卡（没有进行中的关卡时为None）
+        self.level_moves = 0
+
+def close_level(stats, game, outcome):
+    """结束正在进行的Boss关卡"""
+    if game.level is None:
+        return
+    counts = stats['levels'][game.level]
+    counts[outcome] += 1
+    counts['moves'] += game.level_moves
+    game.level = None
+
+def close_game(stats, game):
+    """一局读取完毕，累加到统计中"""
+    close_level(stats, game, 'quits')
+    try:
+        score = int(game.score)
+    except ValueError:
+        score = 0
+        stats['bad_lines'] += 1
+    stats['games'][game.mode] += 1
+    stats['results'][game.result or 'unfinished'] += 1
+    stats['score_total'] += score
+    stats['score_max'] = max(stats['score_max'], score)
+    stats['scores'][score // SCORE_BUCKET * SCORE_BUCKET] += 1
+    if game.items:
+        stats['games_with_items'] += 1
+
+def analyze_chunk(path, start, end):
+    """分析文件中的一个片段，返回统计"""
+    stats = new_stats()
+    combos = stats['combos']
+    items = stats['items']
+    game = None
+
+    # 交换占绝大多数行，计数先放在局部变量中，读取完毕后再写入统计
+    lines = invalid_swaps = bad_lines = 0
+    combo_fields = collections.Counter()
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        data.seek(start)
+        readline = data.readline
+        position = start
+        while position < end:
+            line = readline()
+            position += len(line)
+            fields = line.split()
+            if not fields:
+                continue
+            lines += 1
+            tag = fields[0]
+
+            try:
+                if tag == b'S' and game is not None:
+                    # 分数和连击数保持为字节串，结算时再转换为整数
+                    game.score = fields[5]
+                    if fields[6] != b'0':
+                        combo_fields[fields[6]] += 1
+                        game.level_moves += 1
+                    else:
+                        invalid_swaps += 1
+                elif tag == b'G':
+                    if game is not None:
+                        close_game(stats, game)
+                    game = GameState(fields[3].decode())
+                elif game is None:
+                    bad_lines += 1
+                elif tag == b'I':
+                    items[fields[1].decode()] += 1
+                    game.score = int(fields[2])
+                    game.items += 1
+                elif tag == b'X':
+                    continue  # 交换道具选择的格子只用于回放
+                elif tag == b'L':
+                    # 上一关还在进行中就进入了更高的关卡，说明上一关通过了
+                    level = int(fields[1])
+                    if game.level is not None:
+                        close_level(stats, game, 'wins' if level > game.level else 'quits')
+                    game.level = level
+                    game.level_moves = 0
+                    stats['levels'][level]['attempts'] += 1
+                elif tag == b'P':
+                    close_level(stats, game, 'quits')
+                elif tag == b'E':
+                    result = fields[1].decode()
+                    game.score = int(fields[2])
+                    if result == 'lose':
+                        close_level(stats, game, 'losses')
+                    elif result == 'clear':
+                        close_level(stats, game, 'wins')
+                    if result in FINAL_RESULTS:
+                        game.result = result
+                else:
+                    bad_lines += 1
+            except (IndexError, ValueError):
+                bad_lines += 1
+
+    if game is not None:
+        close_game(stats, game)
+    for combo, count in combo_fields.items():
+        if combo.isdigit():
+            combos[int(combo)] += count
+        else:
+            bad_lines += count
+    stats['lines'] = lines
+    stats['bad_lines'] = bad_lines + stats['bad_lines']
+    stats['invalid_swaps'] = invalid_swaps
+    stats['swaps'] = sum(combos.values())
+    stats['combo_max'] = max(combos, default=0)
+    return stats
+
+def analyze(files, jobs):
+    """切分所有文件并行分析，返回合并后的统计"""
+    chunks = [chunk for path in files for chunk in split_file(path)]
+    total = new_stats()
+    total['files'] = len(files)
+    if not chunks:
+        return total
+
+    if jobs == 1 or len(chunks) == 1:
+        for chunk in chunks:
+            merge_stats(total, analyze_chunk(*chunk))
+        return total
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as executor:
+        futures = [executor.submit(analyze_chunk, *chunk) for chunk in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            merge_stats(total, future.result())
+    return total
+
+def level_rows(stats):
+    """每关的通过情况"""
+    rows = []
+    for level in sorted(stats['levels']):
+        counts = stats['levels'][level]
+        finished = counts['wins'] + counts['losses'] + counts['quits']
+        rows.append({
+            'level': level,
+            'attempts': counts['attempts'],
+            'wins': counts['wins'],
+            'losses': counts['losses'],
+            'quits': counts['quits'],
+            'win_rate': counts['wins'] / finished if finished else 0,
+            'avg_moves': counts['moves'] / finished if finished else 0
+        })
+    return rows
+
+def print_report(stats, seconds):
+    """打印汇总报告"""
+    games = sum(stats['games'].values())
+    swaps = stats['swaps']
+    attempted = swaps + stats['invalid_swaps']
+    print(f"""
+==========================================
+对局记录分析结果
+==========================================
+文件数: {stats['files']:,}，记录行数: {stats['lines']:,}（无法解析 {stats['bad_lines']:,} 行）
+对局数: {games:,}（经典模式 {stats['games']['classic']:,}，Boss战 {stats['games']['boss']:,}）""")
+    if not games:
+        print("==========================================")
+        return
+
+    results = '，'.join(f"{name} {count:,}" for name, count in stats['results'].most_common())
+    print(f"""结算结果: {results}
+平均分数: {stats['score_total'] / games:.1f}（最高 {stats['score_max']:,}）
+有效交换: {swaps:,}（平均 {swaps / games:.1f} 步/局），无效交换占 {stats['invalid_swaps'] / attempted if attempted else 0:.1%}
+平均连击: {sum(combo * count for combo, count in stats['combos'].items()) / swaps if swaps else 0:.3f} 次/步（最高 {stats['combo_max']} 连击）""")
+
+    print("\n连击分布:")
+    for combo in sorted(stats['combos']):
+        print(f"  {combo:>3} 连击: {stats['combos'][combo] / swaps:>7.2%}")
+
+    print(f"\n道具使用（{stats['games_with_items'] / games:.1%} 的对局使用过道具）:")
+    for item, count in stats['items'].most_common():
+        print(f"  {item}: {count:,}（{count / games:.3f} 次/局）")
+
+    rows = level_rows(stats)
+    if rows:
+        hardest = sorted((row for row in rows if row['attempts']), key=lambda row: row['win_rate'])[:HARDEST_LEVELS]
+        print("\n通过率最低的Boss关卡:")
+        print(f"{'关卡':>4}{'尝试':>8}{'通过':>8}{'失败':>8}{'放弃':>8}{'通过率':>9}{'平均步数':>10}")
+        for row in hardest:
+            print(f"{row['level']:>6}{row['attempts']:>10,}{row['wins']:>10,}{row['losses']:>10,}{row['quits']:>10,}"
+                  f"{row['win_rate']:>12.1%}{row['avg_moves']:>12.1f}")
+
+    print(f"==========================================\n耗时: {seconds:.1f} 秒")
+
+def stats_to_json(stats, seconds):
+    """转换为可以写入JSON的结构"""
+    data = {key: dict(value) if isinstance(value, collections.Counter) else value
+            for key, value in stats.items() if key != 'levels'}
+    data['levels'] = level_rows(stats)
+    data['seconds'] = seconds
+    return data
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+    files = find_log_files(args.paths)
+    if not files:
+        print("[错误] 没有找到对局记录文件")
+        sys.exit(1)
+
+    print(f"[分析] {len(files):,} 个文件，{args.jobs} 个进程")
+    start = time.perf_counter()
+    stats = analyze(files, args.jobs)
+    seconds = time.perf_counter() - start
+    print_report(stats, seconds)
+
+    if args.json:
+        directory = os.path.dirname(args.json)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(stats_to_json(stats, seconds), f, ensure_ascii=False, indent=2)
+        print(f"[保存] 统计结果: {args.json}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n[警告] 分析被用户中断")
+        sys.exit(1)
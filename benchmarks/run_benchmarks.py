@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+PuzzleBossBattle 构建性能基准测试
+以 src/ 中的真实源文件为模板生成不同规模的合成JS/CSS文件树，
+测量构建流程各阶段的吞吐量（MB/s），并与保存的基准结果对比，性能回退时以非零状态退出
+
+使用方法：
+    python benchmarks/run_benchmarks.py                     # 默认规模（100K、1M）并与基准对比
+    python benchmarks/run_benchmarks.py --full              # 完整规模（100K、1M、10M、50M）
+    python benchmarks/run_benchmarks.py --sizes 1M,10M      # 指定规模
+    python benchmarks/run_benchmarks.py --repeat 11         # 每项计时11轮，取中位数
+    python benchmarks/run_benchmarks.py --warmup 2          # 每项先预热2次再计时
+    python benchmarks/run_benchmarks.py --update-baseline   # 用本次结果更新基准
+    python benchmarks/run_benchmarks.py --tolerance 0.2     # 所有测量项统一使用20%的容差
+    python benchmarks/run_benchmarks.py --output result.json   # 保存本次结果
+
+只依赖Python标准库，可离线运行。
+"""
+
+import os
+import io
+import sys
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import math
+import platform
+import statistics
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+import build  # noqa: E402
+
+# 基准结果文件
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# 默认规模和 --full 规模
+DEFAULT_SIZES = "100K,1M"
+FULL_SIZES = "100K,1M,10M,50M"
+
+# 吞吐量低于基准的比例超过该值即视为性能回退；更新基准时按各项的波动为每一项记录容差，不低于该值
+DEFAULT_TOLERANCE = 0.12
+
+# 单项容差为基准波动（各轮耗时相对中位数的中位绝对偏差）的倍数，且不超过上限
+SPREAD_FACTOR = 4
+MAX_TOLERANCE = 0.25
+
+# 默认的预热次数和重复次数
+DEFAULT_WARMUP = 1
+DEFAULT_REPEAT = 7
+
+# 每次计时至少持续的时间（秒），耗时很短的阶段在一次计时内循环执行多遍
+MIN_SAMPLE_SECONDS = 0.05
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 * 1024}
+
+def parse_size(value):
+    """解析 100K / 1M 形式的规模"""
+    text = value.strip().upper()
+    multiplier = SIZE_UNITS.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in SIZE_UNITS else text
+    try:
+        size = int(float(number) * multiplier)
+    except ValueError:
+        size = 0
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"无效的规模: {value}")
+    return size
+
+def parse_sizes(value):
+    """解析逗号分隔的规模列表，返回 [(标签, 字节数)]"""
+    return [(item.strip().upper(), parse_size(item)) for item in value.split(',') if item.strip()]
+
+def parse_arguments():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description="PuzzleBossBattle 构建性能基准测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python benchmarks/run_benchmarks.py                     # 默认规模并与基准对比
+  python benchmarks/run_benchmarks.py --full              # 完整规模（100K、1M、10M、50M）
+  python benchmarks/run_benchmarks.py --sizes 1M,10M      # 指定规模
+  python benchmarks/run_benchmarks.py --update-baseline   # 用本次结果更新基准
+        """
+    )
+
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=None,
+        help=f"逗号分隔的合成源码规模（默认: {DEFAULT_SIZES}）"
+    )
+
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help=f"使用完整规模 {FULL_SIZES}（耗时较长）"
+    )
+
+    parser.add_argument(
+        "--repeat", "-r",
+        type=build.positive_int,
+        default=DEFAULT_REPEAT,
+        help=f"每项测量的计时次数，取中位数（默认: {DEFAULT_REPEAT}）"
+    )
+
+    parser.add_argument(
+        "--warmup",
+        type=build.positive_int,
+        default=DEFAULT_WARMUP,
+        help=f"每项测量前不计时的预热次数，至少1次（默认: {DEFAULT_WARMUP}）"
+    )
+
+    parser.add_argument(
+        "--jobs", "-j",
+        type=build.positive_int,
+        default=1,
+        help="merge_js_files 使用的进程数（默认: 1，测量单核吞吐量）"
+    )
+
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help=f"所有测量项统一允许的吞吐量下降比例（默认: 使用基准中每一项记录的容差，没有记录时为 {DEFAULT_TOLERANCE}）"
+    )
+
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE,
+        help="基准结果文件（默认: benchmarks/baseline.json）"
+    )
+
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="将本次结果写入基准文件，不做对比"
+    )
+
+    parser.add_argument(
+        "--output", "-o",
+        metavar="PATH",
+        help="将本次结果以JSON格式写入指定文件"
+    )
+
+    args = parser.parse_args()
+    if args.sizes is None:
+        args.sizes = parse_sizes(FULL_SIZES if args.full else DEFAULT_SIZES)
+    return args
+
+def generate_source_tree(output_dir, kind, source_files, target_size):
+    """循环复制真实源文件，生成总大小不小于 target_size 的合成文件树
+
+    每个副本都带有编号注释，保证内容互不相同；文件按原有合并顺序编号。
+    返回 (文件路径列表, 总字节数)。
+    """
+    templates = [(os.path.basename(path), build.read_file(os.path.join(ROOT_DIR, path)))
+                 for path in source_files]
+    tree_dir = os.path.join(output_dir, kind)
+    os.makedirs(tree_dir, exist_ok=True)
+
+    files = []
+    total_size = 0
+    index = 0
+    while total_size < target_size:
+        name, content = templates[index % len(templates)]
+        content = f"/* 合成文件 #{index}（基于 {name}） */\n{content}"
+        file_path = os.path.join(tree_dir, f"{index:05d}_{name}")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        files.append(file_path)
+        total_size += len(content.encode('utf-8'))
+        index += 1
+
+    return files, total_size
+
+def time_loops(func, loops):
+    """连续执行 func loops 遍，返回平均每遍的耗时（秒）和最后一遍的返回值"""
+    start = time.perf_counter()
+    for _ in range(loops):
+        result = func()
+    return (time.perf_counter() - start) / loops, result
+
+class StageTimer:
+    """交替测量多个阶段的耗时
+
+    add 时先不计时地预热，并根据预热的耗时确定每次计时循环执行的遍数；
+    run 时按轮次依次计时每个阶段，每个阶段取所有轮次的中位数，并用中位绝对偏差衡量波动。
+    同一阶段的多次计时分散在整个测量过程中，机器短时间变慢只会影响少数几次计时，
+    不会拖慢某个阶段的全部结果；计时期间关闭垃圾回收，避免回收时机带来的抖动。
+    """
+
+    def __init__(self, warmup):
+        self.warmup = warmup
+        self.stages = []  # [名称, 输入字节数, 函数, 循环遍数, 各轮耗时]
+
+    def add(self, name, input_size, func):
+        """登记一个阶段并预热，返回预热时的结果（供后续阶段使用）"""
+        for _ in range(self.warmup):
+            elapsed, result = time_loops(func, 1)
+        loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / elapsed)) if elapsed > 0 else 1
+        self.stages.append([name, input_size, func, loops, []])
+        return result
+
+    def run(self, repeat):
+        """计时 repeat 轮，返回 [(名称, 输入字节数, 耗时中位数, 相对波动)]"""
+        gc_enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                for stage in self.stages:
+                    elapsed, _ = time_loops(stage[2], stage[3])
+                    stage[4].append(elapsed)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return [(name, input_size) + summarize_samples(samples) for name, input_size, _, _, samples in self.stages]
+
+def summarize_samples(samples):
+    """返回 (中位数, 中位绝对偏差与中位数之比)"""
+    median = statistics.median(samples)
+    if median <= 0:
+        return median, 0.0
+    deviation = statistics.median(abs(sample - median) for sample in samples)
+    return median, deviation / median
+
+def stage_tolerance(spread):
+    """按基准的波动确定单项容差"""
+    return round(min(MAX_TOLERANCE, max(DEFAULT_TOLERANCE, SPREAD_FACTOR * spread)), 3)
+
+def quiet(func, *args, **kwargs):
+    """调用构建函数并丢弃其控制台输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+def consume_template(html_content, css_chunks, js_chunks):
+    """完整产出一次HTML模板，返回输出字符数"""
+    build_info = {
+        'timestamp': "2000-01-01 00:00:00",
+        'build_type': "压缩构建",
+        'css_size': build.chunks_size(css_chunks),
+        'js_size': build.chunks_size(js_chunks)
+    }
+    chunks = build.build_html_template(html_content, css_chunks, js_chunks, "bench000", build_info)
+    return sum(len(chunk) for chunk in chunks)
+
+def run_size(label, size, repeat, warmup, jobs):
+    """在一种规模下测量所有阶段，返回 {阶段@规模: 结果}"""
+    html_content = build.read_file(os.path.join(ROOT_DIR, "index.html"))
+    timer = StageTimer(warmup)
+
+    with tempfile.TemporaryDirectory(prefix="puzzle-bench-") as temp_dir:
+        js_files, js_size = generate_source_tree(temp_dir, "js", build.JS_FILES, size)
+        css_files, css_size = generate_source_tree(temp_dir, "css", build.CSS_FILES, size)
+        js_contents = [build.read_file(path) for path in js_files]
+        css_contents = [build.read_file(path) for path in css_files]
+
+        print(f"[规模] {label}: JS {len(js_files)} 个文件 {js_size:,} 字节，"
+              f"CSS {len(css_files)} 个文件 {css_size:,} 字节")
+
+        timer.add("minify_js", js_size, lambda: [build.minify_js(content) for content in js_contents])
+        timer.add("minify_js_with_map", js_size, lambda: [build.minify_js_with_map(content) for content in js_contents])
+        css_chunks = timer.add("minify_css", css_size, lambda: [build.minify_css(content) for content in css_contents])
+        js_chunks, _, _ = timer.add("merge_js_files", js_size, lambda: quiet(
+            build.merge_js_files, js_files, minify=True, use_cache=False, jobs=jobs))
+
+        css_chunks = build.join_chunks(css_chunks, '\n')
+        html_length = quiet(consume_template, html_content, css_chunks, js_chunks)
+        timer.add("build_html_template", html_length, lambda: quiet(consume_template, html_content, css_chunks, js_chunks))
+
+        timings = timer.run(repeat)
+
+    formatted = {}
+    for name, input_size, seconds, spread in timings:
+        key = f"{name}@{label}"
+        formatted[key] = {
+            'size_bytes': input_size,
+            'seconds': round(seconds, 6),
+            'mb_per_s': round(input_size / 1024 / 1024 / seconds, 3) if seconds > 0 else None,
+            'spread': round(spread, 4)
+        }
+        print(f"  {key:<32}{seconds * 1000:>12.1f} ms{formatted[key]['mb_per_s']:>12.2f} MB/s{spread * 100:>8.1f}%")
+    return formatted
+
+def environment_info():
+    """记录运行环境，便于判断基准是否可比"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'build_version': build.VERSION,
+        'minifier_version': build.MINIFIER_VERSION
+    }
+
+def load_baseline(baseline_path):
+    """读取基准结果，不存在时返回None"""
+    if not os.path.exists(baseline_path):
+        return None
+    try:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[错误] 读取基准文件失败 {baseline_path}: {e}")
+        sys.exit(1)
+
+def compare_with_baseline(results, baseline, tolerance):
+    """与基准对比吞吐量，返回 (性能回退的测量项列表, 基准中没有的测量项列表)
+
+    tolerance 为 None 时每一项使用基准中记录的容差（旧基准没有记录时为 DEFAULT_TOLERANCE）。
+    """
+    regressions = []
+    missing = []
+    baseline_results = baseline.get('results', {})
+
+    print("""
+==========================================
+与基准对比
+==========================================""")
+    print(f"{'测量项':<30}{'基准MB/s':>12}{'本次MB/s':>12}{'变化':>10}{'容差':>8}")
+
+    for key, result in results.items():
+        expected = baseline_results.get(key)
+        if not expected or not expected.get('mb_per_s') or not result['mb_per_s']:
+            missing.append(key)
+            print(f"{key:<33}{'-':>12}{result['mb_per_s'] or 0:>12.2f}{'无基准':>10}  ← 缺少基准")
+            continue
+
+        allowed = tolerance if tolerance is not None else expected.get('tolerance', DEFAULT_TOLERANCE)
+        change = result['mb_per_s'] / expected['mb_per_s'] - 1
+        marker = ""
+        if change < -allowed:
+            regressions.append((key, expected['mb_per_s'], result['mb_per_s'], change, allowed))
+            marker = "  ← 回退"
+        print(f"{key:<33}{expected['mb_per_s']:>12.2f}{result['mb_per_s']:>12.2f}{change * 100:>+10.1f}%"
+              f"{allowed:>9.0%}{marker}")
+
+    if baseline.get('environment') != environment_info():
+        print("[警告] 基准结果来自不同的运行环境，对比结果仅供参考")
+
+    return regressions, missing
+
+def write_results(file_path, data):
+    """写入JSON结果"""
+    content = json.dumps(data, ensure_ascii=False, indent=2) + '\n'
+    if not build.write_file(file_path, content):
+        sys.exit(1)
+    print(f"[保存] {file_path}")
+
+def main():
+    """主函数"""
+    print("""
+PuzzleBossBattle 构建性能基准测试
+==========================================
+    """)
+
+    args = parse_arguments()
+
+    results = {}
+    for label, size in args.sizes:
+        results.update(run_size(label, size, args.repeat, args.warmup, args.jobs))
+
+    data = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'repeat': args.repeat,
+        'warmup': args.warmup,
+        'jobs': args.jobs,
+        'results': results
+    }
+
+    if args.output:
+        write_results(args.output, data)
+
+    if args.update_baseline:
+        # 保留基准中本次没有测量的规模（如只更新了默认规模时的 10M、50M）
+        baseline = load_baseline(args.baseline) or {}
+        for result in results.values():
+            result['tolerance'] = stage_tolerance(result['spread'])
+        data['results'] = {**baseline.get('results', {}), **results}
+        write_results(args.baseline, data)
+        return
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"[警告] 基准文件不存在: {args.baseline}，使用 --update-baseline 生成")
+        return
+
+    regressions, missing = compare_with_baseline(results, baseline, args.tolerance)
+    if missing:
+        # 新增的测量项必须和代码一起提交基准，否则永远不会被检查
+        print(f"\n[错误] {len(missing)} 项在基准中没有记录，请用 --update-baseline 更新 {args.baseline}:")
+        for key in missing:
+            print(f"  {key}")
+    if regressions:
+        print(f"\n[错误] {len(regressions)} 项吞吐量比基准下降超过容差:")
+        for key, expected, actual, change, allowed in regressions:
+            print(f"  {key}: {expected:.2f} → {actual:.2f} MB/s ({change * 100:+.1f}%，容差 {allowed:.0%})")
+    if missing or regressions:
+        sys.exit(1)
+
+    print("\n✅ 所有测量项都在基准的容差范围内")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n[警告] 基准测试被用户中断")
+        sys.exit(1)
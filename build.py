@@ -6,6 +6,16 @@ PuzzleBossBattle 构建脚本
 使用方法：
     python build.py                    # 默认构建（压缩JS）
     python build.py --no-minify        # 不压缩JS
+    python build.py --no-cache         # 忽略构建缓存，强制完整构建
+    python build.py --jobs 4           # 使用4个进程并行压缩
+    python build.py --watch            # 监听源文件变化并自动重新构建
+    python build.py --split            # 拆分输出带哈希的CSS/JS文件和预压缩文件
+    python build.py --mode classic     # 只包含经典模式的精简构建
+    python build.py --mode-report      # 对比各构建模式的体积
+    python build.py --critical-css     # 只内联首屏CSS，其余样式在首屏渲染后加载
+    python build.py --sourcemap        # 生成JS源码映射文件（--inline-sourcemap 内嵌到JS中）
+    python build.py --check-budgets    # 检查各文件的体积预算，超出时构建失败
+    python build.py --profile          # 显示各阶段耗时和内存峰值
     python build.py --help             # 显示帮助信息
 """
 
@@ -13,10 +23,26 @@ import os
 import re
 import sys
 import argparse
+import base64
+import concurrent.futures
+import contextlib
 import datetime
+import functools
+import gzip
 import hashlib
+import itertools
+import json
+import time
+import tracemalloc
+from html.parser import HTMLParser
 from pathlib import Path
 
+# 可选依赖：安装 brotli 后拆分输出时额外生成 .br 预压缩文件
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # 版本信息
 VERSION = "1.0.0"
 AUTHOR = "PuzzleBossBattle Team"
@@ -25,6 +51,7 @@ AUTHOR = "PuzzleBossBattle Team"
 JS_FILES = [
     "src/js/constants.js",
     "src/js/logSystem.js",
+    "src/js/replayLog.js",
     "src/js/bossSystem.js",
     "src/js/itemSystem.js",
     "src/js/gameLogic.js",
@@ -45,6 +72,86 @@ CSS_FILES = [
     "src/css/responsive.css"
 ]
 
+# 构建缓存目录（按文件内容哈希保存压缩结果）
+CACHE_DIR = ".build-cache"
+
+# 拆分输出模式下的资源清单文件名和资源文件名中的哈希长度
+ASSET_MANIFEST_FILE = "asset-manifest.json"
+ASSET_HASH_LENGTH = 10
+
+# 拆分输出模式和源码映射生成的文件（如 app.3f2a9c1b0d.js.gz、app.3f2a9c1b0d.js.map），切换模式或内容变化后需要清理
+SPLIT_OUTPUT_RE = re.compile(
+    r"app\.[0-9a-f]+\.(?:js|css)(?:\.gz|\.br|\.map)?|index\.html\.(?:gz|br)|index\.js\.map|asset-manifest\.json")
+
+# 内联构建时JS源码映射的文件名（内联脚本的 sourceMappingURL 相对于页面地址）
+INLINE_SOURCE_MAP_FILE = "index.js.map"
+
+# 构建时需要处理的HTML模板位置：开发用的CSS/JS引用、</head>、</body>
+HTML_SPLICE_RE = re.compile(
+    r'(?P<css_link><link rel="stylesheet" href="src/css/[^"]+">\s*)'
+    r'|(?P<script_tag><script src="src/js/[^"]+"></script>\s*)'
+    r'|(?P<head_end></head>)'
+    r'|(?P<body_end></body>)'
+)
+
+# 监听模式下检查文件变化的间隔（秒）
+WATCH_INTERVAL = 0.1
+
+# 压缩器版本，修改 minify_js / minify_css 后需要递增，使旧缓存失效
+MINIFIER_VERSION = "4"
+
+# 构建模式（摇树优化配置）
+# stubs 中列出的是该模式下永远不会执行的入口，构建时替换为空实现，
+# 只能通过它们访问到的函数、类、方法和常量会被整体移除。
+# 顶层函数直接写函数名，类方法写成 "类名.方法名"。
+BUILD_PROFILES = {
+    'full': {
+        'description': '完整构建，包含全部模式',
+        'stubs': None
+    },
+    'classic': {
+        'description': '仅经典模式',
+        'stubs': [
+            'startBossMode',
+            'Match3Game.switchMode',
+            'Match3Game.showLevelSelection',
+            'BossSystem.initBoss',
+            'BossSystem.triggerBossSkill',
+            'BossSystem.playerAttackBoss',
+            'BossSystem.reset',
+            'GameLogic.processMovesBonus',
+            'UIRenderer.updateBossUI',
+            'UIRenderer.getBossModeRules'
+        ]
+    },
+    'boss': {
+        'description': '仅Boss战模式',
+        'stubs': [
+            'startClassicMode',
+            'Match3Game.saveAndRestart',
+            'UIRenderer.getClassicModeRules'
+        ]
+    }
+}
+
+# 摇树规则版本，修改 tree_shake_js 或 TREE_SHAKE_KEEP 后需要递增，使已有的构建输出失效
+TREE_SHAKE_VERSION = "2"
+
+# 摇树时始终保留的公开接口：代码中没有调用，只从控制台或外部脚本访问（写法同 stubs）
+TREE_SHAKE_KEEP = [
+    'ReplayLog.replay'
+]
+
+def positive_int(value):
+    """argparse类型：正整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是有效的整数: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须大于等于1: {value}")
+    return number
+
 def parse_arguments():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(
@@ -54,6 +161,17 @@ def parse_arguments():
 示例:
   python build.py                    # 默认构建（压缩JS）
   python build.py --no-minify        # 不压缩JS
+  python build.py --no-cache         # 忽略构建缓存，强制完整构建
+  python build.py --jobs 4           # 使用4个进程并行压缩
+  python build.py --watch            # 监听源文件变化并自动重新构建
+  python build.py --split            # 拆分输出带哈希的CSS/JS文件和预压缩文件
+  python build.py --mode classic     # 只包含经典模式的精简构建
+  python build.py --mode-report      # 对比各构建模式的体积
+  python build.py --critical-css     # 只内联首屏CSS，其余样式在首屏渲染后加载
+  python build.py --sourcemap        # 生成JS源码映射文件（--inline-sourcemap 内嵌到JS中）
+  python build.py --check-budgets    # 检查各文件的体积预算，超出时构建失败
+  python build.py --profile          # 显示各阶段耗时和内存峰值
+  python build.py --report-json build-report.json   # 输出JSON格式的性能报告
   python build.py --help             # 显示帮助信息
         """
     )
@@ -64,6 +182,83 @@ def parse_arguments():
         help="跳过JavaScript压缩，保留可读格式"
     )
 
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"不读取也不写入构建缓存（{CACHE_DIR}/），强制完整构建"
+    )
+
+    parser.add_argument(
+        "--jobs", "-j",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        metavar="N",
+        help="并行压缩使用的进程数（默认: CPU核心数）"
+    )
+
+    parser.add_argument(
+        "--split", "-s",
+        action="store_true",
+        help="拆分输出：生成 app.<哈希>.css / app.<哈希>.js、.gz/.br 预压缩文件和资源清单，HTML只保留引用"
+    )
+
+    parser.add_argument(
+        "--mode", "-m",
+        choices=list(BUILD_PROFILES),
+        default="full",
+        help="构建模式：full 完整构建；classic / boss 移除该模式用不到的代码（默认: full）"
+    )
+
+    parser.add_argument(
+        "--mode-report",
+        action="store_true",
+        help="分析并对比各构建模式摇树后的JS体积，不生成输出文件"
+    )
+
+    parser.add_argument(
+        "--critical-css",
+        action="store_true",
+        help=f"只在<head>中内联首屏（#{CRITICAL_ROOT_ID}）用到的CSS，其余样式在首屏渲染后加载，"
+             "并移除HTML和JS中都没有用到的选择器"
+    )
+
+    source_map_group = parser.add_mutually_exclusive_group()
+    source_map_group.add_argument(
+        "--sourcemap",
+        action="store_true",
+        help="生成v3源码映射文件，把合并压缩后的JS位置对应回 src/js 中的原始文件和行"
+    )
+    source_map_group.add_argument(
+        "--inline-sourcemap",
+        action="store_true",
+        help="生成源码映射并以data URL的形式内嵌到JS末尾，不单独输出映射文件"
+    )
+
+    parser.add_argument(
+        "--check-budgets",
+        action="store_true",
+        help=f"按 {BUDGET_FILE} 检查每个JS/CSS模块和最终HTML的原始/gzip体积，"
+             "超出预算时列出与上一次构建的差异并以非零状态退出（只检查压缩构建；监听模式下每次重新构建都会检查）"
+    )
+
+    parser.add_argument(
+        "--profile", "-p",
+        action="store_true",
+        help="显示各阶段（读取、合并、压缩、哈希、模板、写入）耗时、每个文件的压缩耗时和内存峰值"
+    )
+
+    parser.add_argument(
+        "--report-json",
+        metavar="PATH",
+        help="将性能统计以JSON格式写入指定文件，便于CI存档和对比"
+    )
+
+    parser.add_argument(
+        "--watch", "-w",
+        action="store_true",
+        help="构建后保持运行，监听源文件变化并只重新构建受影响的部分"
+    )
+
     parser.add_argument(
         "--version", "-v",
         action="version",
@@ -88,7 +283,9 @@ def write_file(file_path, content):
     """写入文件内容"""
     try:
         # 确保目录存在
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
 
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
@@ -97,42 +294,447 @@ def write_file(file_path, content):
         print(f"[错误] 写入文件失败 {file_path}: {e}")
         return False
 
-def minify_js(js_code):
-    """简单的JavaScript压缩"""
-    if not js_code:
-        return js_code
+def hash_bytes(data):
+    """计算内容的SHA-256哈希"""
+    return hashlib.sha256(data).hexdigest()
 
-    # 移除单行注释
-    js_code = re.sub(r'//.*', '', js_code)
+def get_cache_key(kind, content, minify):
+    """生成缓存键：由源文件内容哈希和压缩器设置共同决定"""
+    settings = f"{kind}|minify={minify}|minifier={MINIFIER_VERSION}\n"
+    return hash_bytes(settings.encode('utf-8') + content.encode('utf-8'))
 
-    # 移除多行注释
-    js_code = re.sub(r'/\*[\s\S]*?\*/', '', js_code)
+def cache_load(key):
+    """读取缓存的压缩结果，未命中时返回None"""
+    try:
+        with open(os.path.join(CACHE_DIR, "objects", key), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
 
-    # 移除多余的空格和换行
-    # 保留必要的空格（如 var a = 1;）
-    lines = js_code.split('\n')
-    cleaned_lines = []
+def cache_store(key, content):
+    """保存压缩结果到缓存（先写临时文件再替换，避免留下半截内容）"""
+    object_dir = os.path.join(CACHE_DIR, "objects")
+    try:
+        os.makedirs(object_dir, exist_ok=True)
+        tmp_path = os.path.join(object_dir, f"{key}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, os.path.join(object_dir, key))
+    except OSError as e:
+        print(f"[警告] 写入构建缓存失败: {e}")
 
-    for line in lines:
-        line = line.strip()
-        if line:  # 跳过空行
-            # 移除行尾分号后的空格
-            line = re.sub(r';\s*', ';', line)
-            # 移除赋值操作符周围的空格
-            line = re.sub(r'\s*=\s*', '=', line)
-            line = re.sub(r'\s*\+\s*', '+', line)
-            line = re.sub(r'\s*-\s*', '-', line)
-            line = re.sub(r'\s*\*\s*', '*', line)
-            line = re.sub(r'\s*/\s*', '/', line)
-            line = re.sub(r'\s*,\s*', ',', line)
-            line = re.sub(r'\s*:\s*', ':', line)
-            line = re.sub(r'\s*{\s*', '{', line)
-            line = re.sub(r'\s*}\s*', '}', line)
-            line = re.sub(r'\s*\(\s*', '(', line)
-            line = re.sub(r'\s*\)\s*', ')', line)
-            cleaned_lines.append(line)
+def load_cache_manifest():
+    """读取上一次构建记录的输入指纹"""
+    try:
+        with open(os.path.join(CACHE_DIR, "manifest.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    return ' '.join(cleaned_lines)
+def save_cache_manifest(manifest):
+    """保存本次构建的输入指纹"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CACHE_DIR, "manifest.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"[警告] 写入构建缓存失败: {e}")
+
+class BuildProfiler:
+    """构建性能统计：各阶段耗时、每个文件的压缩耗时和内存峰值
+
+    阶段可以嵌套，嵌套阶段的耗时会从外层阶段中扣除，因此各阶段耗时之和不超过总耗时。
+    """
+
+    STAGES = ['read', 'merge', 'minify', 'hash', 'template', 'write']
+
+    def __init__(self):
+        self.stages = {name: 0.0 for name in self.STAGES}
+        self.files = []
+        self.outputs = {}
+        self.total = 0.0
+        self.peak_memory = 0
+        self._start_time = None
+        self._child_times = []
+
+    def start(self):
+        """开始统计（同时开始跟踪内存分配）"""
+        tracemalloc.start()
+        self._start_time = time.perf_counter()
+
+    def finish(self):
+        """结束统计"""
+        self.total = time.perf_counter() - self._start_time
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """统计一个阶段的耗时"""
+        start = time.perf_counter()
+        self._child_times.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            child_time = self._child_times.pop()
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - child_time
+            if self._child_times:
+                self._child_times[-1] += elapsed
+
+    def timed_iter(self, name, iterable):
+        """逐项产出 iterable 的内容，产生每一项所用的时间计入指定阶段"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record_file(self, file_path, kind, original_size, minified_size, seconds, cached):
+        """记录单个文件的压缩情况"""
+        self.files.append({
+            'file': file_path,
+            'kind': kind,
+            'original_size': original_size,
+            'minified_size': minified_size,
+            'minify_seconds': seconds,
+            'cached': cached
+        })
+
+    def to_dict(self, args):
+        """生成可供CI存档的统计数据"""
+        return {
+            'version': VERSION,
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'options': json.loads(build_options_signature(args)),
+            'jobs': args.jobs,
+            'total_seconds': self.total,
+            'stages': self.stages,
+            'peak_memory_bytes': self.peak_memory,
+            'files': self.files,
+            'outputs': self.outputs
+        }
+
+    def format_report(self):
+        """生成便于阅读的统计表格"""
+        lines = [
+            "==========================================",
+            "PuzzleBossBattle 构建性能报告",
+            "==========================================",
+            f"{'阶段':<12}{'耗时(ms)':>12}{'占比':>8}"
+        ]
+        for name, seconds in self.stages.items():
+            share = seconds / self.total * 100 if self.total else 0
+            lines.append(f"{name:<14}{seconds * 1000:>12.1f}{share:>9.1f}%")
+        accounted = sum(self.stages.values())
+        lines.append(f"{'other':<14}{(self.total - accounted) * 1000:>12.1f}")
+        lines.append(f"{'total':<14}{self.total * 1000:>12.1f}")
+
+        if self.files:
+            lines.append("------------------------------------------")
+            lines.append(f"{'文件':<34}{'原始':>10}{'压缩后':>10}{'耗时(ms)':>10}")
+            for record in sorted(self.files, key=lambda item: item['minify_seconds'], reverse=True):
+                timing = "缓存" if record['cached'] else f"{record['minify_seconds'] * 1000:.1f}"
+                lines.append(f"{record['file']:<36}{record['original_size']:>10,}"
+                             f"{record['minified_size']:>11,}{timing:>11}")
+
+        lines.append("------------------------------------------")
+        lines.append(f"内存峰值: {self.peak_memory / 1024 / 1024:.2f} MB（主进程，tracemalloc）")
+        lines.append("==========================================")
+        return '\n'.join(lines)
+
+def profile_stage(profiler, name):
+    """profiler 为None时不做统计"""
+    return profiler.stage(name) if profiler else contextlib.nullcontext()
+
+def source_map_mode(args):
+    """源码映射的输出方式：'file'、'inline' 或None（不生成）"""
+    if args.inline_sourcemap:
+        return 'inline'
+    return 'file' if args.sourcemap else None
+
+def build_options_signature(args):
+    """影响构建输出的参数（只影响构建速度的参数如 --jobs 不计入）"""
+    options = {
+        'minify': not args.no_minify,
+        'split': args.split,
+        'mode': args.mode,
+        'critical_css': args.critical_css,
+        'source_map': source_map_mode(args)
+    }
+    return json.dumps(options, sort_keys=True)
+
+def compute_build_fingerprint(args, input_files):
+    """根据所有输入文件内容和构建参数计算构建指纹"""
+    hasher = hashlib.sha256()
+    hasher.update(f"{VERSION}|{MINIFIER_VERSION}|{MOVE_TABLE_VERSION}|{CRITICAL_CSS_VERSION}|{TREE_SHAKE_VERSION}|"
+                  f"{build_options_signature(args)}\n".encode('utf-8'))
+
+    for file_path in input_files:
+        try:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            # 缺失的文件交给后续流程报错
+            return None
+        hasher.update(f"{file_path}|{hash_bytes(data)}\n".encode('utf-8'))
+
+    return hasher.hexdigest()
+
+def is_build_up_to_date(fingerprint):
+    """判断上一次的构建输出是否仍然有效（指纹一致且输出文件未被改动）"""
+    manifest = load_cache_manifest()
+    outputs = manifest.get('outputs')
+    if not fingerprint or manifest.get('fingerprint') != fingerprint or not outputs:
+        return False
+
+    for output_path, output_hash in outputs.items():
+        try:
+            with open(output_path, 'rb') as f:
+                if hash_bytes(f.read()) != output_hash:
+                    return False
+        except OSError:
+            return False
+
+    return True
+
+# JavaScript词法规则（按顺序尝试，每次只匹配一个词法单元）
+JS_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*[\s\S]*?(?:\*/|$))
+  | (?P<string>'(?:[^'\\\n]|\\[\s\S])*'|"(?:[^"\\\n]|\\[\s\S])*")
+  | (?P<word>[\w$\u0080-\uffff]+)
+  | (?P<template>`)
+  | (?P<punct>[\s\S])
+""", re.VERBOSE)
+
+# 模板字符串中 ` 或 ${ 之前的原样内容
+JS_TEMPLATE_CHUNK_RE = re.compile(r"(?:[^`\\$]|\\[\s\S]|\$(?!\{))*")
+
+# 正则表达式字面量（含字符类和标志）
+JS_REGEX_LITERAL_RE = re.compile(r"/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[\w$]*")
+
+# 其后的 / 表示正则字面量而不是除号的关键字
+JS_REGEX_PREFIX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete',
+    'void', 'throw', 'case', 'do', 'else', 'yield', 'await'
+}
+
+# 紧跟在 < 之后会组成 <!-- 的内容：内联在 <script> 中时会被HTML解析器当成注释开头
+JS_HTML_COMMENT_AFTER_RE = re.compile(r"!(?:\s|/\*[\s\S]*?\*/)*-(?:\s|/\*[\s\S]*?\*/)*-")
+
+# 换行两侧分别是这些字符时，换行可能影响自动分号插入，必须保留
+JS_NEWLINE_BEFORE_CHARS = set(')]}\'"`+-')
+JS_NEWLINE_AFTER_CHARS = set('([{\'"`+-!~')
+
+def is_js_word_char(char):
+    """判断字符是否属于标识符、关键字或数字"""
+    return char.isalnum() or char in '_$' or ord(char) > 127
+
+def tokenize_js(js_code):
+    """单遍扫描JavaScript源码
+
+    逐个产出 (类型, 文本, 起始位置, 前导空白) 元组，注释和空白不单独产出，
+    而是折叠为下一个词法单元的前导空白：'' 表示无、' ' 表示空格、'\\n' 表示含换行。
+    字符串、模板字符串（含嵌套的 ${...}）和正则字面量作为整体产出。
+    """
+    pos = 0
+    length = len(js_code)
+    gap = ''
+    regex_allowed = True
+    prev_text = ''
+    template_braces = []  # 每层 ${...} 内尚未闭合的大括号数量
+
+    while pos < length:
+        match = JS_TOKEN_RE.match(js_code, pos)
+        kind = match.lastgroup
+        text = match.group(kind)
+        start = pos
+        pos = match.end()
+
+        if kind in ('ws', 'line_comment', 'block_comment'):
+            if '\n' in text:
+                gap = '\n'
+            elif not gap:
+                gap = ' '
+            continue
+
+        if kind == 'punct' and text == '/' and regex_allowed:
+            regex_match = JS_REGEX_LITERAL_RE.match(js_code, start)
+            if regex_match:
+                kind = 'regex'
+                text = regex_match.group()
+                pos = regex_match.end()
+
+        if kind == 'template' or (kind == 'punct' and text == '}' and template_braces and template_braces[-1] == 0):
+            # 模板字符串开始，或 ${...} 结束后继续扫描模板内容
+            if kind == 'punct':
+                template_braces.pop()
+            chunk_end = JS_TEMPLATE_CHUNK_RE.match(js_code, pos).end()
+            if js_code.startswith('${', chunk_end):
+                pos = chunk_end + 2
+                template_braces.append(0)
+            else:
+                pos = min(chunk_end + 1, length)
+            kind = 'template'
+            text = js_code[start:pos]
+        elif kind == 'punct' and template_braces:
+            if text == '{':
+                template_braces[-1] += 1
+            elif text == '}':
+                template_braces[-1] -= 1
+
+        yield kind, text, start, gap
+        gap = ''
+
+        if kind == 'word':
+            # obj.return 等属性名不是关键字，之后的 / 是除号
+            regex_allowed = text in JS_REGEX_PREFIX_KEYWORDS and prev_text != '.'
+        elif kind == 'template':
+            regex_allowed = text.endswith('${')
+        elif kind == 'punct':
+            regex_allowed = text not in ')]}'
+        else:
+            regex_allowed = False
+        prev_text = text
+
+def js_token_tail(kind, text):
+    """记录词法单元结尾的类型，供 js_separator 判断：'regex' 正则字面量、'number' 数字，其余为 ''"""
+    if kind == 'regex':
+        return 'regex'
+    if kind == 'word' and text[0].isdigit():
+        return 'number'
+    return ''
+
+def js_separator(prev_tail, prev_char, next_char, gap):
+    """计算两个词法单元之间需要保留的最少空白（prev_tail 为 js_token_tail 的结果）"""
+    if not gap:
+        return ''
+
+    # 正则字面量后紧跟的标识符会被当成标志，换行还关系到自动分号插入
+    if prev_tail == 'regex' and is_js_word_char(next_char):
+        return gap
+
+    # 避免 1 .toString() 变成 1.toString()，数字后的点会被当成小数点
+    if prev_tail == 'number' and next_char == '.':
+        return ' '
+
+    if (gap == '\n'
+            and (is_js_word_char(prev_char) or prev_char in JS_NEWLINE_BEFORE_CHARS)
+            and (is_js_word_char(next_char) or next_char in JS_NEWLINE_AFTER_CHARS)):
+        return '\n'
+
+    if is_js_word_char(prev_char) and is_js_word_char(next_char):
+        return ' '
+
+    # 避免 a + +b 变成 a++b，以及除号后紧跟正则被当成注释
+    if (prev_char in '+-' and next_char == prev_char) or (prev_char == '/' and next_char in '/*'):
+        return ' '
+
+    return ''
+
+def minify_js(js_code):
+    """JavaScript压缩：单遍扫描移除注释和多余空白
+
+    字符串、模板字符串和正则字面量原样保留；可能触发自动分号插入的换行会被保留。
+    """
+    if not js_code:
+        return js_code
+
+    output = []
+    last_char = ''
+    last_tail = ''
+
+    for kind, text, start, gap in tokenize_js(js_code):
+        if last_char:
+            separator = js_separator(last_tail, last_char, text[0], gap)
+            if last_char == '<' and text == '!' and JS_HTML_COMMENT_AFTER_RE.match(js_code, start):
+                separator = ' '
+            if separator:
+                output.append(separator)
+        output.append(text)
+        last_char = text[-1]
+        last_tail = js_token_tail(kind, text)
+
+    return ''.join(output)
+
+def utf16_length(text):
+    """文本的UTF-16长度（源码映射中的列号按UTF-16计算，表情符号占两列）"""
+    return len(text) if text.isascii() else len(text.encode('utf-16-le')) // 2
+
+def line_columns(text, offsets):
+    """把递增排列的字符位置换算为 (行, 列)，列按UTF-16计算（单遍扫描，不逐个切分行）"""
+    results = []
+    line = 0
+    position = 0
+    column = 0
+    next_newline = text.find('\n')
+
+    for offset in offsets:
+        while 0 <= next_newline < offset:
+            line += 1
+            position = next_newline + 1
+            column = 0
+            next_newline = text.find('\n', position)
+        column += utf16_length(text[position:offset])
+        position = offset
+        results.append((line, column))
+
+    return results
+
+def minify_js_with_map(js_code):
+    """与 minify_js 输出相同的压缩，同时记录源码映射
+
+    返回 (压缩结果, 映射列表)，映射为 (输出行, 输出列, 源码位置)：在每个输出行的开头、
+    每个源码行的第一个词法单元处各记录一项，足以把压缩后的位置对应回源码中的行。
+    扫描时只记录输出块的序号，行列在拼接完成后统一换算，压缩循环中几乎没有额外开销。
+    """
+    if not js_code:
+        return js_code, []
+
+    output = []
+    marks = []  # (输出块序号, 块内位置, 源码位置)
+    last_char = ''
+    last_tail = ''
+
+    for kind, text, start, gap in tokenize_js(js_code):
+        if last_char:
+            separator = js_separator(last_tail, last_char, text[0], gap)
+            if last_char == '<' and text == '!' and JS_HTML_COMMENT_AFTER_RE.match(js_code, start):
+                separator = ' '
+            if separator:
+                output.append(separator)
+        if gap == '\n' or not last_char:
+            marks.append((len(output), 0, start))
+        output.append(text)
+        last_char = text[-1]
+        last_tail = js_token_tail(kind, text)
+
+        if '\n' in text:
+            # 跨行的字符串和模板字符串原样输出，每个续行的开头与源码中的行一一对应
+            newline = text.find('\n')
+            while newline >= 0:
+                marks.append((len(output) - 1, newline + 1, start + newline + 1))
+                newline = text.find('\n', newline + 1)
+
+    code = ''.join(output)
+    piece_starts = [0]
+    piece_starts.extend(itertools.accumulate(map(len, output)))
+    positions = line_columns(code, [piece_starts[piece] + offset for piece, offset, _ in marks])
+    return code, [(line, column, source) for (line, column), (_, _, source) in zip(positions, marks)]
+
+def line_start_mappings(content):
+    """未压缩内容的映射：每一行的开头对应源码中同一行的开头"""
+    mappings = [(0, 0, 0)]
+    position = content.find('\n')
+    while position >= 0:
+        mappings.append((len(mappings), 0, position + 1))
+        position = content.find('\n', position + 1)
+    return mappings
 
 def minify_css(css_code):
     """简单的CSS压缩"""
@@ -159,91 +761,979 @@ def minify_css(css_code):
 
     return ' '.join(cleaned_lines)
 
-def merge_js_files(js_files, minify=True):
-    """合并JS文件"""
-    print("[开始] 合并JavaScript文件...")
+# HTML中的内联事件处理器（onclick="game.restart()" 等），是JS的入口
+HTML_EVENT_HANDLER_RE = re.compile(r'\son[a-z]+="([^"]*)"')
+
+# 字符串和模板字符串中可能是标识符的单词（如拼接进HTML的 onclick="game.startFromLevel(1)"）
+JS_STRING_WORD_RE = re.compile(r"[A-Za-z_$][\w$]*")
+
+def find_matching_token(tokens, index):
+    """返回与 tokens[index] 处左括号配对的右括号位置"""
+    opening = tokens[index][1]
+    closing = {'(': ')', '[': ']', '{': '}'}[opening]
+    depth = 0
+
+    for position in range(index, len(tokens)):
+        kind, text = tokens[position][0], tokens[position][1]
+        if kind != 'punct':
+            continue
+        if text == opening:
+            depth += 1
+        elif text == closing:
+            depth -= 1
+            if depth == 0:
+                return position
+
+    raise ValueError(f"括号不匹配: 位置 {tokens[index][2]} 的 '{opening}'")
+
+def token_words(token):
+    """词法单元中可能引用声明的标识符：字符串和模板字符串中的单词也算在内"""
+    kind, text = token[0], token[1]
+    if kind == 'word':
+        return [text]
+    if kind in ('string', 'template'):
+        return JS_STRING_WORD_RE.findall(text)
+    return []
+
+def collect_words(tokens, start, end):
+    """收集 tokens[start:end] 中出现的所有标识符（含字符串中的单词）"""
+    words = set()
+    for token in tokens[start:end]:
+        words.update(token_words(token))
+    return words
+
+def skip_statement(tokens, index, end):
+    """从 index 向后跳到深度为0的分号，返回分号之后的位置"""
+    nested = 0
+    while index < end:
+        kind, text = tokens[index][0], tokens[index][1]
+        if kind == 'punct':
+            if text in '([{':
+                nested += 1
+            elif text in ')]}':
+                nested -= 1
+            elif text == ';' and nested == 0:
+                break
+        index += 1
+    return index + 1
+
+def parse_class_methods(tokens, body_start, body_end, class_name):
+    """解析类体 tokens[body_start+1:body_end] 中的方法定义
+
+    返回 (方法列表, 类字段初始值引用的标识符集合)，字段在创建实例时求值，其引用属于类本身。
+    """
+    methods = []
+    field_refs = set()
+    index = body_start + 1
+
+    while index < body_end:
+        member_start = index
+        # 方法修饰符和方法名，直到参数列表的左括号
+        while index < body_end and not (tokens[index][0] == 'punct' and tokens[index][1] in '(;='):
+            index += 1
+
+        if index >= body_end or tokens[index][1] != '(':
+            # 类字段或多余的分号：跳过到语句结束（初始值中可能有带分号的对象或函数）
+            index = skip_statement(tokens, index, body_end)
+            field_refs |= collect_words(tokens, member_start, min(index, body_end))
+            continue
+
+        name_token = tokens[index - 1]
+        params_end = find_matching_token(tokens, index)
+        body_open = params_end + 1
+        body_close = find_matching_token(tokens, body_open)
+
+        methods.append({
+            'name': name_token[1],
+            'owner': class_name,
+            'kind': 'method',
+            'token_range': (member_start, body_close + 1),
+            'header': ' '.join(token[1] for token in tokens[member_start:index]),
+            'refs': collect_words(tokens, member_start, body_close + 1)
+        })
+        index = body_close + 1
+
+    return methods, field_refs
+
+def parse_js_declarations(js_code):
+    """找出模块中的顶层声明（类、函数、常量/变量）和类方法
+
+    返回 (声明列表, 顶层语句引用的标识符集合)。只按名字分析引用关系：
+    出现在代码中的同名标识符（包括属性访问 obj.name）都视为引用，结果偏保守。
+    """
+    tokens = list(tokenize_js(js_code))
+    declarations = []
+    root_refs = set()
+    depth = 0
+    index = 0
+
+    while index < len(tokens):
+        kind, text = tokens[index][0], tokens[index][1]
+        next_kind = tokens[index + 1][0] if index + 1 < len(tokens) else None
+
+        if depth == 0 and kind == 'word' and next_kind == 'word':
+            if text == 'class':
+                body_open = index
+                while tokens[body_open][1] != '{':
+                    body_open += 1
+                body_close = find_matching_token(tokens, body_open)
+                class_name = tokens[index + 1][1]
+                methods, field_refs = parse_class_methods(tokens, body_open, body_close, class_name)
+                declarations.append({
+                    'name': class_name,
+                    'owner': None,
+                    'kind': 'class',
+                    'token_range': (index, body_close + 1),
+                    'refs': collect_words(tokens, index + 2, body_open) | field_refs
+                })
+                declarations.extend(methods)
+                index = body_close + 1
+                continue
+
+            if text in ('function', 'async') and (text == 'function' or tokens[index + 1][1] == 'function'):
+                name_index = index + 1 if text == 'function' else index + 2
+                if name_index < len(tokens) and tokens[name_index][0] == 'word':
+                    params_open = name_index + 1
+                    body_open = find_matching_token(tokens, params_open) + 1
+                    body_close = find_matching_token(tokens, body_open)
+                    declarations.append({
+                        'name': tokens[name_index][1],
+                        'owner': None,
+                        'kind': 'function',
+                        'token_range': (index, body_close + 1),
+                        'header': ' '.join(token[1] for token in tokens[index:params_open]),
+                        'refs': collect_words(tokens, name_index + 1, body_close + 1)
+                    })
+                    index = body_close + 1
+                    continue
+
+            if text in ('const', 'let', 'var'):
+                # 到深度为0的分号为止
+                end = skip_statement(tokens, index + 2, len(tokens)) - 1
+                declarations.append({
+                    'name': tokens[index + 1][1],
+                    'owner': None,
+                    'kind': 'variable',
+                    'token_range': (index, min(end + 1, len(tokens))),
+                    'refs': collect_words(tokens, index + 2, end)
+                })
+                index = end + 1
+                continue
+
+        if kind == 'punct':
+            if text in '([{':
+                depth += 1
+            elif text in ')]}':
+                depth -= 1
+        else:
+            root_refs.update(token_words(tokens[index]))
+        index += 1
+
+    # 把token范围换算成源码位置：删除时连同声明前的注释和空白一起删除
+    for declaration in declarations:
+        first, last = declaration.pop('token_range')
+        declaration['start'] = tokens[first - 1][2] + len(tokens[first - 1][1]) if first > 0 else 0
+        declaration['code_start'] = tokens[first][2]
+        declaration['end'] = tokens[last - 1][2] + len(tokens[last - 1][1])
+
+    return declarations, root_refs
+
+def tree_shake_js(sources, html_content, stubs, keep=TREE_SHAKE_KEEP):
+    """跨模块摇树：从入口出发标记可达的声明，移除不可达的函数、类、方法和常量
+
+    入口包括各模块的顶层语句、HTML内联事件处理器和 keep 中的公开接口。stubs 中的函数/方法被替换为空实现，
+    它们的函数体不再作为引用来源。返回 (处理后的源码列表, 被移除的声明列表, 被替换的声明列表)，
+    每个被移除/替换的声明记录了所在模块的序号 module 和对源码的修改 edit (起始位置, 结束位置, 替换内容)。
+    """
+    modules = [parse_js_declarations(source) for source in sources]
+    declarations = [declaration for module_declarations, _ in modules for declaration in module_declarations]
+    stub_names = set(stubs or [])
+    keep_names = set(keep)
+
+    def qualified_name(declaration):
+        if declaration['owner']:
+            return f"{declaration['owner']}.{declaration['name']}"
+        return declaration['name']
+
+    known_names = {qualified_name(declaration) for declaration in declarations}
+    unknown_stubs = stub_names - known_names
+    if unknown_stubs:
+        raise ValueError(f"构建模式中的入口不存在: {', '.join(sorted(unknown_stubs))}")
+    unknown_keeps = keep_names - known_names
+    if unknown_keeps:
+        raise ValueError(f"保留的公开接口不存在: {', '.join(sorted(unknown_keeps))}")
+
+    # 入口：顶层语句 + HTML事件处理器
+    referenced = set()
+    for _, root_refs in modules:
+        referenced |= root_refs
+    for handler in HTML_EVENT_HANDLER_RE.findall(html_content):
+        referenced |= {text for kind, text, _, _ in tokenize_js(handler) if kind == 'word'}
+
+    reachable = set()
+    reachable_classes = set()
+    changed = True
+    while changed:
+        changed = False
+        for position, declaration in enumerate(declarations):
+            if position in reachable:
+                continue
+
+            kept = qualified_name(declaration) in keep_names
+            if declaration['kind'] == 'method':
+                if declaration['owner'] not in reachable_classes:
+                    continue
+                if declaration['name'] != 'constructor' and declaration['name'] not in referenced and not kept:
+                    continue
+            elif declaration['name'] not in referenced and not kept:
+                continue
+
+            reachable.add(position)
+            changed = True
+            if declaration['kind'] == 'class':
+                reachable_classes.add(declaration['name'])
+            if qualified_name(declaration) not in stub_names:
+                referenced |= declaration['refs']
+
+    removed = []
+    stubbed = []
+    shaken_sources = []
+
+    for module, (source, (module_declarations, _)) in enumerate(zip(sources, modules)):
+        edits = []
+        for declaration in module_declarations:
+            position = declarations.index(declaration)
+            if position not in reachable:
+                # 类被移除时其方法随之移除，不重复记录
+                if declaration['kind'] != 'method' or declaration['owner'] in reachable_classes:
+                    declaration['edit'] = (declaration['start'], declaration['end'], '')
+                    removed.append(declaration)
+            elif qualified_name(declaration) in stub_names:
+                declaration['edit'] = (declaration['code_start'], declaration['end'],
+                                       f"{declaration['header']}() {{}}")
+                stubbed.append(declaration)
+            else:
+                continue
+            declaration['module'] = module
+            edits.append(declaration['edit'])
+
+        for start, end, replacement in sorted(edits, reverse=True):
+            source = source[:start] + replacement + source[end:]
+        shaken_sources.append(source)
+
+    for declaration in removed + stubbed:
+        declaration['qualified_name'] = qualified_name(declaration)
+        declaration['size'] = declaration['end'] - declaration['start']
+
+    return shaken_sources, removed, stubbed
+
+# constants.js 中的棋盘大小
+BOARD_SIZE_RE = re.compile(r"\bconst\s+BOARD_SIZE\s*=\s*(\d+)\s*;")
+
+# 交换查找表中的三连模式：方块移动到新位置后，三连中另外两个格子相对新位置的偏移 (dr1, dc1, dr2, dc2)
+MOVE_TABLE_PATTERNS = [
+    (0, -2, 0, -1), (0, -1, 0, 1), (0, 1, 0, 2),
+    (-2, 0, -1, 0), (-1, 0, 1, 0), (1, 0, 2, 0)
+]
 
-    all_js_content = []
+# 查找表格式版本，修改 generate_move_table 或 MOVE_TABLE_PATTERNS 后需要递增，使缓存的查找表失效
+MOVE_TABLE_VERSION = "1"
+
+def iter_swaps(board_size):
+    """按 hasPossibleMoves 的顺序（逐行逐列，先向右再向下）列出所有交换 (行1, 列1, 行2, 列2)"""
+    for row in range(board_size):
+        for col in range(board_size):
+            if col < board_size - 1:
+                yield row, col, row, col + 1
+            if row < board_size - 1:
+                yield row, col, row + 1, col
+
+def swap_moves(row1, col1, row2, col2):
+    """一次交换中两个方块的移动 [(新位置, 原位置)]，顺序与查找表中的两个字节一致"""
+    return [((row2, col2), (row1, col1)), ((row1, col1), (row2, col2))]
+
+def generate_move_table(board_size):
+    """生成交换查找表
+
+    第一个元素是棋盘大小，之后每种交换占两个字节，分别对应交换中移动的两个方块：
+    第 i 位表示方块到达新位置后，MOVE_TABLE_PATTERNS[i] 描述的三连需要检查。
+    超出棋盘或包含对方原位置（交换后那里是另一个方块）的三连不需要检查。
+    """
+    table = [board_size]
+    for swap in iter_swaps(board_size):
+        for (row, col), origin in swap_moves(*swap):
+            mask = 0
+            for bit, (dr1, dc1, dr2, dc2) in enumerate(MOVE_TABLE_PATTERNS):
+                cells = [(row + dr1, col + dc1), (row + dr2, col + dc2)]
+                if origin not in cells and all(0 <= r < board_size and 0 <= c < board_size for r, c in cells):
+                    mask |= 1 << bit
+            table.append(mask)
+    return table
+
+def move_table_js(table, minify=True):
+    """生成内联到JS中的查找表代码"""
+    patterns = ','.join(str(offset) for pattern in MOVE_TABLE_PATTERNS for offset in pattern)
+    code = (f"const MOVE_TABLE_PATTERNS=new Int8Array([{patterns}]);"
+            f"const MOVE_TABLE=new Uint8Array([{','.join(map(str, table))}]);")
+    if not minify:
+        code = f"// 交换查找表（由 build.py 生成）\n{code}"
+    return code
+
+def find_board_size(js_files):
+    """在JS文件中查找 BOARD_SIZE 常量"""
+    for file_path in js_files:
+        if os.path.exists(file_path):
+            match = BOARD_SIZE_RE.search(read_file(file_path))
+            if match:
+                return int(match.group(1))
+    return None
+
+def build_move_table(js_files, minify=True, use_cache=True):
+    """生成交换查找表，返回内联的JS代码（找不到棋盘大小时返回None）"""
+    board_size = find_board_size(js_files)
+    if board_size is None or not 3 <= board_size <= 255:
+        print("[警告] 未找到有效的 BOARD_SIZE，跳过交换查找表")
+        return None
+
+    key = get_cache_key("move-table", f"{MOVE_TABLE_VERSION}|{board_size}", minify)
+    code = cache_load(key) if use_cache else None
+    if code is not None:
+        print(f"  [查找表] {board_size}×{board_size} 棋盘（缓存）")
+        return code
+
+    table = generate_move_table(board_size)
+    code = move_table_js(table, minify)
+    if use_cache:
+        cache_store(key, code)
+    print(f"  [查找表] {board_size}×{board_size} 棋盘，{len(table) - 1} 字节")
+    return code
+
+def timed_minify(minify_func, content):
+    """压缩单个文件并返回 (结果, 耗时秒数)"""
+    start = time.perf_counter()
+    result = minify_func(content)
+    return result, time.perf_counter() - start
+
+def minify_in_parallel(minify_func, contents, jobs):
+    """用进程池并行压缩多个文件，返回与输入顺序一致的 (结果, 耗时秒数) 列表"""
+    task = functools.partial(timed_minify, minify_func)
+    workers = min(jobs, len(contents))
+    if workers <= 1:
+        return [task(content) for content in contents]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(task, contents))
+
+def join_chunks(parts, separator):
+    """在各部分之间插入分隔符，返回内容块列表（不拼接成整体字符串）"""
+    chunks = []
+    for part in parts:
+        if chunks:
+            chunks.append(separator)
+        chunks.append(part)
+    return chunks
+
+def chunks_size(chunks):
+    """计算内容块列表的UTF-8字节数"""
+    return sum(len(chunk.encode('utf-8')) for chunk in chunks)
+
+def merge_source_files(files, kind, minify_func, minify=True, use_cache=True, jobs=1, transform=None,
+                       profiler=None, map_func=None):
+    """读取并逐个压缩源文件，未变化的文件直接使用缓存结果，其余文件并行压缩
+
+    transform 可以在压缩前对全部文件内容做跨文件处理（如摇树优化）。
+    传入 map_func（如 minify_js_with_map）时用它代替 minify_func 压缩，同时得到每个文件的源码映射。
+    返回 (内容块列表, 原始总大小, 映射列表)；内容块按文件顺序排列，各文件之间插入分隔符，
+    映射列表与文件一一对应，没有传入 map_func 时为None。
+    """
+    label = kind.upper()
+    contents = []
     total_size = 0
 
-    for js_file in js_files:
-        if not os.path.exists(js_file):
-            print(f"[错误] JS文件不存在: {js_file}")
-            sys.exit(1)
+    with profile_stage(profiler, 'read'):
+        for file_path in files:
+            if not os.path.exists(file_path):
+                print(f"[错误] {label}文件不存在: {file_path}")
+                sys.exit(1)
+
+            content = read_file(file_path)
+            file_size = len(content.encode('utf-8'))
+            total_size += file_size
+
+            print(f"  [{label}] {file_path} ({file_size:,} 字节)")
+            contents.append(content)
+
+    if transform:
+        with profile_stage(profiler, 'merge'):
+            contents = transform(contents)
+
+    if not minify:
+        with profile_stage(profiler, 'merge'):
+            mappings = [line_start_mappings(content) for content in contents] if map_func else None
+            return join_chunks(contents, '\n\n'), total_size, mappings
+
+    processed = []
+    mappings = [] if map_func else None
+    timings = []
+    original_size = 0
+    pending = []  # 需要重新压缩的文件 (序号, 缓存键, 内容)
+
+    # 源码映射和压缩结果一起缓存（JSON格式），与不生成映射时的缓存互不影响
+    cache_kind = f"{kind}-map" if map_func else kind
+
+    with profile_stage(profiler, 'minify'):
+        for content in contents:
+            original_size += len(content.encode('utf-8'))
+            key = get_cache_key(cache_kind, content, minify)
+            result = cache_load(key) if use_cache else None
+            if result is not None and map_func:
+                result = json.loads(result)
+
+            if result is None:
+                pending.append((len(processed), key, content))
+            processed.append(result)
+            timings.append(None)
+
+        if pending:
+            results = minify_in_parallel(map_func or minify_func, [content for _, _, content in pending], jobs)
+            for (index, key, _), (result, seconds) in zip(pending, results):
+                processed[index] = result
+                timings[index] = seconds
+                if use_cache:
+                    cache_store(key, json.dumps(result) if map_func else result)
+
+        if map_func:
+            mappings = [file_mappings for _, file_mappings in processed]
+            processed = [result for result, _ in processed]
+
+    with profile_stage(profiler, 'merge'):
+        merged = join_chunks(processed, '\n')
+        compressed_size = chunks_size(merged)
+
+    if profiler:
+        for file_path, content, result, seconds in zip(files, contents, processed, timings):
+            profiler.record_file(file_path, kind, len(content.encode('utf-8')), len(result.encode('utf-8')),
+                                 seconds or 0.0, seconds is None)
+
+    if use_cache:
+        print(f"  [缓存] 命中 {len(files) - len(pending)}/{len(files)} 个文件")
+
+    if original_size > 0:
+        compression_rate = (1 - compressed_size / original_size) * 100
+        print(f"  [压缩率] {compression_rate:.1f}% ({original_size:,} → {compressed_size:,} 字节)")
+
+    return merged, total_size, mappings
+
+def print_tree_shake_report(mode, removed, stubbed):
+    """打印摇树优化结果"""
+    removed_size = sum(declaration['size'] for declaration in removed)
+    print(f"  [摇树] 模式 {mode}: 移除 {len(removed)} 个声明（{removed_size:,} 字节源码），"
+          f"{len(stubbed)} 个入口替换为空实现")
+    for declaration in removed:
+        print(f"    - {declaration['qualified_name']} ({declaration['size']:,} 字节)")
+
+# 源码映射（Source Map v3）中 Base64 VLQ 使用的字符
+VLQ_BASE64_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+@functools.lru_cache(maxsize=None)
+def encode_vlq(value):
+    """把整数编码为 Base64 VLQ（映射中的增量大多是很小的重复值，编码结果按数值缓存）"""
+    value = ((-value) << 1) | 1 if value < 0 else value << 1
+    encoded = ''
+    while True:
+        digit = value & 31
+        value >>= 5
+        if not value:
+            return encoded + VLQ_BASE64_CHARS[digit]
+        encoded += VLQ_BASE64_CHARS[digit | 32]
+
+def encode_source_map_mappings(segments):
+    """单遍编码 mappings 字段，segments 为按输出位置排序的 (输出行, 输出列, 源文件序号, 源码行, 源码列)"""
+    lines = []
+    current = []
+    line = 0
+    previous_column = previous_source = previous_line = previous_source_column = 0
+
+    for generated_line, column, source, source_line, source_column in segments:
+        if generated_line != line:
+            lines.append(','.join(current))
+            lines.extend([''] * (generated_line - line - 1))
+            current = []
+            line = generated_line
+            previous_column = 0
+
+        current.append(encode_vlq(column - previous_column) + encode_vlq(source - previous_source)
+                       + encode_vlq(source_line - previous_line) + encode_vlq(source_column - previous_source_column))
+        previous_column = column
+        previous_source = source
+        previous_line = source_line
+        previous_source_column = source_column
+
+    lines.append(','.join(current))
+    return ';'.join(lines)
+
+def original_positions(source, edits, positions):
+    """把摇树后源码中的位置（递增排列）换算为原始源码中的 (行, 列)
+
+    edits 为摇树对原始源码的修改 (起始位置, 结束位置, 替换内容)，落在替换内容中的位置对应被替换部分的开头。
+    """
+    edits = sorted(edits)
+    edit_index = 0
+    delta = 0  # 已经过的修改使原始源码比摇树后源码多出的长度
+    originals = []
+
+    for position in positions:
+        original = None
+        while edit_index < len(edits):
+            start, end, replacement = edits[edit_index]
+            if position < start - delta + len(replacement):
+                if position >= start - delta:
+                    original = start
+                break
+            delta += end - start - len(replacement)
+            edit_index += 1
+        if original is None:
+            original = position + delta
+        originals.append(original)
+
+    return line_columns(source, originals)
+
+def build_js_source_map(js_files, sources, edits, file_mappings, file_lines):
+    """组装v3源码映射
+
+    sources / edits 为每个文件的原始源码和摇树修改，file_mappings 为每个文件输出中的映射
+    （见 minify_js_with_map），file_lines 为每个文件在合并结果中的起始行（每个文件都从行首开始）。
+    """
+    segments = []
+    for index, (source, file_edits, mappings, first_line) in enumerate(
+            zip(sources, edits, file_mappings, file_lines)):
+        positions = original_positions(source, file_edits, [position for _, _, position in mappings])
+        segments.extend((first_line + line, column, index, source_line, source_column)
+                        for (line, column, _), (source_line, source_column) in zip(mappings, positions))
+
+    print(f"  [源码映射] {len(js_files)} 个文件，{len(segments):,} 个映射")
+    return {
+        'version': 3,
+        'sources': list(js_files),
+        'sourcesContent': list(sources),
+        'names': [],
+        'mappings': encode_source_map_mappings(segments)
+    }
 
-        content = read_file(js_file)
-        file_size = len(content.encode('utf-8'))
-        total_size += file_size
+def merge_js_files(js_files, minify=True, use_cache=True, jobs=1, mode='full', html_content='', profiler=None,
+                   source_map=False):
+    """合并JS文件
 
-        print(f"  [JS] {js_file} ({file_size:,} 字节)")
-        all_js_content.append(content)
+    mode 不是 full 时，先按 BUILD_PROFILES 中的配置对全部模块做摇树优化再压缩。
+    返回 (内容块列表, 原始总大小, 源码映射)；source_map 为假时源码映射为None。
+    """
+    print("[开始] 合并JavaScript文件...")
 
-    merged_js = '\n\n'.join(all_js_content)
+    # 生成源码映射时需要原始源码和摇树的修改位置
+    sources = []
+    edits = [[] for _ in js_files]
+
+    transform = None
+    stubs = BUILD_PROFILES[mode]['stubs']
+    if stubs is not None or source_map:
+        def transform(contents):
+            sources.extend(contents)
+            if stubs is None:
+                return contents
+            shaken_sources, removed, stubbed = tree_shake_js(contents, html_content, stubs)
+            print_tree_shake_report(mode, removed, stubbed)
+            for declaration in removed + stubbed:
+                edits[declaration['module']].append(declaration['edit'])
+            return shaken_sources
 
     if minify:
         print("[压缩] JavaScript代码...")
-        original_size = len(merged_js.encode('utf-8'))
-        merged_js = minify_js(merged_js)
-        compressed_size = len(merged_js.encode('utf-8'))
-
-        if original_size > 0:
-            compression_rate = (1 - compressed_size / original_size) * 100
-            print(f"  [压缩率] {compression_rate:.1f}% ({original_size:,} → {compressed_size:,} 字节)")
-
-    return merged_js, total_size
-
-def merge_css_files(css_files, minify=True):
+    chunks, total_size, file_mappings = merge_source_files(js_files, "js", minify_js, minify, use_cache, jobs,
+                                                           transform, profiler,
+                                                           map_func=minify_js_with_map if source_map else None)
+
+    # 交换查找表放在最前面，游戏代码通过 typeof MOVE_TABLE 判断是否可用
+    with profile_stage(profiler, 'merge'):
+        move_table = build_move_table(js_files, minify, use_cache)
+    if move_table:
+        chunks = [move_table, '\n' if minify else '\n\n'] + chunks
+
+    js_source_map = None
+    if source_map:
+        with profile_stage(profiler, 'merge'):
+            # 文件内容块和分隔符交替排列，分隔符都以换行结尾
+            first_file = 2 if move_table else 0
+            file_lines = []
+            line = 0
+            for index, chunk in enumerate(chunks):
+                if index >= first_file and (index - first_file) % 2 == 0:
+                    file_lines.append(line)
+                line += chunk.count('\n')
+            js_source_map = build_js_source_map(js_files, sources, edits, file_mappings, file_lines)
+
+    return chunks, total_size, js_source_map
+
+def merge_css_files(css_files, minify=True, use_cache=True, jobs=1, profiler=None):
     """合并CSS文件"""
     print("[开始] 合并CSS文件...")
-
-    all_css_content = []
-    total_size = 0
-
-    for css_file in css_files:
-        if not os.path.exists(css_file):
-            print(f"[错误] CSS文件不存在: {css_file}")
-            sys.exit(1)
-
-        content = read_file(css_file)
-        file_size = len(content.encode('utf-8'))
-        total_size += file_size
-
-        print(f"  [CSS] {css_file} ({file_size:,} 字节)")
-        all_css_content.append(content)
-
-    merged_css = '\n\n'.join(all_css_content)
-
     if minify:
         print("[压缩] CSS代码...")
-        original_size = len(merged_css.encode('utf-8'))
-        merged_css = minify_css(merged_css)
-        compressed_size = len(merged_css.encode('utf-8'))
-
-        if original_size > 0:
-            compression_rate = (1 - compressed_size / original_size) * 100
-            print(f"  [压缩率] {compression_rate:.1f}% ({original_size:,} → {compressed_size:,} 字节)")
-
-    return merged_css, total_size
+    chunks, total_size, _ = merge_source_files(css_files, "css", minify_css, minify, use_cache, jobs, profiler=profiler)
+    return chunks, total_size
+
+# 关键CSS：首屏页面的根元素，--critical-css 只内联这个元素及其子元素用到的样式
+CRITICAL_ROOT_ID = "start-page"
+
+# 关键CSS拆分规则的版本，修改 split_critical_css 后需要递增，使旧缓存失效
+CRITICAL_CSS_VERSION = "1"
+
+# 延迟样式生效前隐藏首屏以外的页面，避免显示未加样式的内容
+CRITICAL_HIDE_ID = "critical-css-hide"
+CRITICAL_HIDE_CSS = f"body>:not(#{CRITICAL_ROOT_ID}):not(script){{display:none!important}}"
+
+# 内联构建中延迟样式的 <style> 元素id
+DEFERRED_CSS_ID = "deferred-css"
+
+# 首屏渲染后启用延迟样式并移除隐藏样式
+DEFERRED_CSS_LOADER = (
+    "requestAnimationFrame(function(){setTimeout(function(){"
+    f"document.getElementById('{DEFERRED_CSS_ID}').media='all';"
+    f"var hide=document.getElementById('{CRITICAL_HIDE_ID}');if(hide)hide.remove();"
+    "})})"
+)
+
+# CSS词法规则：注释、字符串、花括号和分号，其余内容原样保留
+CSS_TOKEN_RE = re.compile(r"""
+    (?P<comment>/\*[\s\S]*?(?:\*/|$))
+  | (?P<string>"(?:[^"\\\n]|\\[\s\S])*"|'(?:[^'\\\n]|\\[\s\S])*')
+  | (?P<punct>[{};])
+  | (?P<text>[^{};/"']+|[/"'])
+""", re.VERBOSE)
+
+# 内部还是规则列表的@规则，拆分时按其中的每条规则分别处理
+CSS_GROUP_AT_RULES = ('@media', '@supports')
+
+CSS_KEYFRAMES_RE = re.compile(r"@(?:-[a-z]+-)?keyframes\s+([\w-]+)")
+
+# 选择器中的 class / id / 标签名（伪类、属性选择器和括号内的参数先去掉）
+CSS_SELECTOR_PART_RE = re.compile(r"([.#]?)(-?[_a-zA-Z][\w-]*)")
+CSS_SELECTOR_ARGUMENT_RE = re.compile(r"\([^()]*\)")
+CSS_SELECTOR_IGNORED_RE = re.compile(r"\[[^\]]*\]|::?[\w-]+")
+
+# 声明中的属性名和 animation / animation-name 引用的动画名
+CSS_PROPERTY_RE = re.compile(r"(?:^|;)\s*(-?[\w-]+)\s*:")
+CSS_ANIMATION_RE = re.compile(r"(?:^|;)\s*(?:-[a-z]+-)?animation(?:-name)?\s*:([^;]*)")
+
+# JS字符串中可能是 class / id / 标签名的单词
+JS_SELECTOR_WORD_RE = re.compile(r"-?[_a-zA-Z][\w-]*")
+
+HTML_VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'source', 'track', 'wbr'
+}
+
+def parse_css_rules(tokens, index, css_code):
+    """解析 tokens[index:] 中的规则，直到对应的右花括号或结尾，返回 (规则列表, 结束位置)
+
+    每条规则是一个字典：type 为 rule（普通规则）、keyframes、group（@media 等，含子规则）
+    或 at（其余@规则，原样保留）。
+    """
+    rules = []
+    prelude = []
+    start = None
+
+    while index < len(tokens):
+        kind, text, position = tokens[index]
+        index += 1
+
+        if kind == 'comment':
+            continue
+        if kind != 'punct':
+            if start is None:
+                if not text.strip():
+                    continue
+                start = position + len(text) - len(text.lstrip())
+            prelude.append(text)
+            continue
+
+        header = ''.join(prelude).strip()
+        if text == '}':
+            return rules, index
+
+        if text == ';':
+            if header:
+                rules.append({'type': 'at', 'text': css_code[start:position + 1]})
+        elif header.startswith(CSS_GROUP_AT_RULES):
+            children, index = parse_css_rules(tokens, index, css_code)
+            rules.append({'type': 'group', 'prelude': header, 'rules': children})
+        else:
+            depth = 1
+            while index < len(tokens) and depth:
+                if tokens[index][0] == 'punct':
+                    depth += {'{': 1, '}': -1}.get(tokens[index][1], 0)
+                index += 1
+            end = tokens[index - 1][2] + 1
+            rule = {'type': 'rule', 'prelude': header, 'text': css_code[start:end],
+                    'body': css_code[position + 1:end - 1]}
+            keyframes = CSS_KEYFRAMES_RE.match(header)
+            if keyframes:
+                rule.update(type='keyframes', name=keyframes.group(1))
+            elif header.startswith('@'):
+                rule['type'] = 'at'
+            rules.append(rule)
+
+        prelude = []
+        start = None
+
+    return rules, index
+
+def parse_css(css_code):
+    """把样式表解析为按顺序排列的扁平规则列表，每条规则附带所在的 @media 等条件（由外到内）"""
+    tokens = [(match.lastgroup, match.group(), match.start()) for match in CSS_TOKEN_RE.finditer(css_code)]
+    flat = []
+
+    def flatten(rules, conditions):
+        for rule in rules:
+            if rule['type'] == 'group':
+                flatten(rule['rules'], conditions + (rule['prelude'],))
+            else:
+                rule['conditions'] = conditions
+                flat.append(rule)
+
+    flatten(parse_css_rules(tokens, 0, css_code)[0], ())
+    return flat
+
+def split_selector_list(prelude):
+    """按顶层逗号拆分选择器列表（:not(a, b) 等括号内的逗号不拆分）"""
+    selectors = []
+    depth = 0
+    start = 0
+    for position, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:position].strip())
+            start = position + 1
+    selectors.append(prelude[start:].strip())
+    return [selector for selector in selectors if selector]
+
+def selector_parts(selector):
+    """返回选择器必须匹配的 (类型, 名称) 列表，类型为 '.'、'#' 或 ''（标签）
+
+    伪类和伪元素的参数（如 :not(.x)）、属性选择器不要求匹配。
+    """
+    previous = None
+    while previous != selector:
+        previous = selector
+        selector = CSS_SELECTOR_ARGUMENT_RE.sub('', selector)
+    selector = CSS_SELECTOR_IGNORED_RE.sub(' ', selector)
+    return CSS_SELECTOR_PART_RE.findall(selector)
+
+def new_selector_names():
+    """选择器名称集合：标签 ''、class '.'、id '#'"""
+    return {'': set(), '.': set(), '#': set()}
+
+class HTMLSelectorCollector(HTMLParser):
+    """收集HTML中出现的标签、class和id，同时单独记录首屏根元素及其子元素中出现的部分"""
+
+    def __init__(self, root_id):
+        super().__init__()
+        self.root_id = root_id
+        self.names = new_selector_names()
+        self.critical = new_selector_names()
+        self.critical[''].update({'html', 'body'})
+        self.depth = 0  # 在首屏根元素内时为嵌套深度
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        element_id = attrs.get('id') or ''
+        inside = self.depth > 0 or element_id == self.root_id
+
+        for names in (self.names, self.critical) if inside else (self.names,):
+            names[''].add(tag)
+            names['.'].update((attrs.get('class') or '').split())
+            if element_id:
+                names['#'].add(element_id)
+
+        if inside and tag not in HTML_VOID_ELEMENTS:
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if self.depth > 0 and tag not in HTML_VOID_ELEMENTS:
+            self.depth -= 1
+
+def collect_js_selector_words(js_sources):
+    """收集JS字符串和模板字符串中的单词，它们可能被用作 class / id / 标签名
+
+    返回 (单词集合, 前缀集合)：以 - 结尾的单词（如 'boss-' + type）视为动态class的前缀。
+    """
+    words = set()
+    for source in js_sources:
+        for kind, text, _, _ in tokenize_js(source):
+            if kind in ('string', 'template'):
+                words.update(JS_SELECTOR_WORD_RE.findall(text))
+    prefixes = {word for word in words if word.endswith('-')}
+    return words, prefixes
+
+def selector_is_used(parts, names, words, prefixes):
+    """选择器中的每个 class / id / 标签都在HTML或JS中出现过"""
+    for kind, name in parts:
+        if name in names[kind] or name in words:
+            continue
+        if kind == '.' and any(name.startswith(prefix) for prefix in prefixes):
+            continue
+        return False
+    return True
+
+def property_roots(body):
+    """声明块中属性的简写名（去掉浏览器前缀后的第一段，如 -webkit-border-radius → border）"""
+    body = re.sub(r'/\*[\s\S]*?\*/', '', body)
+    return {re.sub(r'^-[a-z]+-', '', name).split('-')[0] for name in CSS_PROPERTY_RE.findall(body)}
+
+def rule_text(rule, selectors, minify):
+    """生成只包含指定选择器的规则文本"""
+    if selectors == rule['selectors']:
+        return rule['text']
+    return (',' if minify else ', ').join(selectors) + ('{' if minify else ' {') + rule['body'] + '}'
+
+def serialize_css(entries, minify):
+    """把 (条件, 规则文本) 列表重新组装成样式表，相邻的同条件规则放在同一个 @media 块中"""
+    parts = []
+    current = ()
+    newline = '' if minify else '\n'
+    indent = '' if minify else '    '
+
+    for conditions, text in entries:
+        common = 0
+        while common < min(len(current), len(conditions)) and current[common] == conditions[common]:
+            common += 1
+        for depth in range(len(current) - 1, common - 1, -1):
+            parts.append(indent * depth + '}' + newline)
+        for depth in range(common, len(conditions)):
+            parts.append(indent * depth + conditions[depth] + ('{' if minify else ' {') + newline)
+        current = conditions
+        parts.append(indent * len(conditions) + text + newline)
+
+    for depth in range(len(current) - 1, -1, -1):
+        parts.append(indent * depth + '}' + newline)
+    return ''.join(parts)
+
+def split_critical_css(css_code, html_content, js_sources, minify=True):
+    """拆分出首屏需要的关键CSS，同时移除HTML和JS中都没有用到的选择器
+
+    返回 {'critical', 'deferred', 'removed'}：critical 内联到 <head>，
+    deferred 在首屏渲染后加载，removed 为被移除的 (选择器, 字节数) 列表。
+    关键规则原本排在某条延迟规则之后、且设置了同类属性时，在延迟样式中保留一份，
+    保证延迟样式加载后层叠顺序与原样式表一致。
+    """
+    collector = HTMLSelectorCollector(CRITICAL_ROOT_ID)
+    collector.feed(html_content)
+    words, prefixes = collect_js_selector_words(js_sources + HTML_EVENT_HANDLER_RE.findall(html_content))
+
+    critical = []
+    deferred = []
+    removed = []
+    deferred_roots = set()
+    animations = set()
+    keyframes = {}
+
+    for rule in parse_css(css_code):
+        conditions = rule['conditions']
+        if rule['type'] == 'keyframes':
+            keyframes[rule['name']] = (conditions, rule['text'])
+        if rule['type'] != 'rule':
+            deferred.append((conditions, rule['text']))
+            continue
+
+        rule['selectors'] = split_selector_list(rule['prelude'])
+        used = []
+        unused = []
+        critical_selectors = []
+        for selector in rule['selectors']:
+            parts = selector_parts(selector)
+            if not selector_is_used(parts, collector.names, words, prefixes):
+                unused.append(selector)
+                continue
+            used.append(selector)
+            if all(name in collector.critical[kind] for kind, name in parts):
+                critical_selectors.append(selector)
+
+        if not used:
+            removed.append((', '.join(unused), len(rule['text'])))
+            continue
+        removed += [(selector, len(selector) + 1) for selector in unused]
+
+        roots = property_roots(rule['body'])
+        deferred_selectors = used
+        if critical_selectors:
+            critical.append((conditions, rule_text(rule, critical_selectors, minify)))
+            for match in CSS_ANIMATION_RE.findall(rule['body']):
+                animations.update(JS_SELECTOR_WORD_RE.findall(match))
+            if not roots & deferred_roots:
+                deferred_selectors = [selector for selector in used if selector not in critical_selectors]
+
+        if deferred_selectors:
+            deferred.append((conditions, rule_text(rule, deferred_selectors, minify)))
+            deferred_roots |= roots
+
+    # 关键规则用到的动画：复制最后一个同名定义（与原样式表中生效的定义相同）
+    critical += [keyframes[name] for name in sorted(animations) if name in keyframes]
+
+    return {
+        'critical': serialize_css(critical, minify),
+        'deferred': serialize_css(deferred, minify),
+        'removed': removed
+    }
 
-def generate_version_hash(js_content):
-    """生成版本哈希"""
-    hash_obj = hashlib.md5(js_content.encode('utf-8'))
+def print_critical_css_report(result):
+    """打印关键CSS拆分结果"""
+    removed_size = sum(size for _, size in result['removed'])
+    print(f"  [关键CSS] 首屏内联 {len(result['critical'].encode('utf-8')):,} 字节，"
+          f"延迟加载 {len(result['deferred'].encode('utf-8')):,} 字节，"
+          f"移除 {len(result['removed'])} 个未使用的选择器（{removed_size:,} 字节）")
+    for selector, size in result['removed']:
+        print(f"    - {selector} ({size:,} 字节)")
+
+def extract_critical_css(css_chunks, html_content, js_files, minify=True, use_cache=True):
+    """拆分关键CSS，返回 (关键CSS内容块列表, 延迟CSS内容块列表)"""
+    css_code = ''.join(css_chunks)
+    js_sources = [read_file(js_file) for js_file in js_files]
+
+    content = '\0'.join([CRITICAL_CSS_VERSION, CRITICAL_ROOT_ID, css_code, html_content] + js_sources)
+    key = get_cache_key("critical-css", content, minify)
+    cached = cache_load(key) if use_cache else None
+    if cached is not None:
+        result = json.loads(cached)
+    else:
+        result = split_critical_css(css_code, html_content, js_sources, minify)
+        if use_cache:
+            cache_store(key, json.dumps(result, ensure_ascii=False))
+
+    print_critical_css_report(result)
+    return [result['critical']], [result['deferred']]
+
+def generate_version_hash(chunks):
+    """生成版本哈希（逐块计算，不拼接内容）"""
+    hash_obj = hashlib.md5()
+    for chunk in chunks:
+        hash_obj.update(chunk.encode('utf-8'))
     return hash_obj.hexdigest()[:8]
 
-def build_html_template(html_content, css_content, js_content, version_hash, build_info):
-    """构建最终的HTML文件"""
-    print("[构建] HTML文件...")
-
-    # 移除原有的CSS和JS引用
-    # 移除CSS链接标签
-    css_pattern = r'<link rel="stylesheet" href="src/css/[^"]+">\s*'
-    html_content = re.sub(css_pattern, '', html_content)
+def build_html_template(html_content, css_chunks, js_chunks, version_hash, build_info,
+                        css_href=None, js_href=None, critical_chunks=None):
+    """构建最终的HTML文件（逐块产出）
 
-    # 移除script标签
-    script_pattern = r'<script src="src/js/[^"]+"></script>\s*'
-    html_content = re.sub(script_pattern, '', html_content)
+    对模板只扫描一次：模板片段原样产出，开发用的CSS/JS引用被移除，
+    CSS内容块插入到</head>之前，JS内容块插入到</body>之前，整个页面不会拼成一个字符串。
+    默认将CSS和JS内联到HTML中；传入 css_href / js_href 时改为引用外部资源文件。
+    传入 critical_chunks 时只在<head>中内联关键CSS，css_chunks 为首屏渲染后才启用的延迟样式：
+    内联构建放在</body>之前的 media="print" 样式中，拆分输出时以 media="print" 的方式异步加载。
+    """
+    print("[构建] HTML文件...")
 
-    # 在<head>标签后插入内联的CSS代码
+    # 在</head>标签前插入内联的CSS代码
     css_comment = f"""
 <!--
 ==========================================
@@ -254,33 +1744,112 @@ CSS大小: {build_info['css_size']:,} 字节
 JS大小: {build_info['js_size']:,} 字节
 ==========================================
 -->
-<style>
-{css_content}
-</style>
-"""
-
-    # 在</body>标签前插入内联的JS代码
-    js_comment = f"""
-<script>
-{js_content}
-</script>
 """
 
-    # 插入CSS到<head>标签后
-    if '<head>' in html_content:
-        # 找到<head>标签的位置
-        head_end = html_content.find('</head>')
-        if head_end != -1:
-            html_content = html_content[:head_end] + css_comment + html_content[head_end:]
+    def css_block():
+        yield css_comment
+        if critical_chunks is not None:
+            yield "<style>\n"
+            yield from critical_chunks
+            yield "\n</style>\n"
+            yield f'<style id="{CRITICAL_HIDE_ID}">{CRITICAL_HIDE_CSS}</style>\n'
+            if css_href:
+                yield (f'<link rel="stylesheet" href="{css_href}" media="print" '
+                       f'onload="this.media=\'all\';var hide=document.getElementById(\'{CRITICAL_HIDE_ID}\');'
+                       f'if(hide)hide.remove()">\n')
+                yield f'<noscript><link rel="stylesheet" href="{css_href}"></noscript>\n'
+        elif css_href:
+            yield f'<link rel="stylesheet" href="{css_href}">\n'
+        else:
+            yield "<style>\n"
+            yield from css_chunks
+            yield "\n</style>\n"
 
-    # 插入JS到</body>标签前
-    if '</body>' in html_content:
-        html_content = html_content.replace('</body>', js_comment + '\n</body>')
-    else:
-        # 如果没有找到</body>标签，添加到文件末尾
-        html_content += js_comment
-
-    return html_content
+    # 在</body>标签前插入内联的JS代码
+    def js_block():
+        if critical_chunks is not None and not css_href:
+            yield f'\n<style id="{DEFERRED_CSS_ID}" media="print">\n'
+            yield from css_chunks
+            yield "\n</style>\n"
+            yield f"<script>{DEFERRED_CSS_LOADER}</script>\n"
+        if js_href:
+            yield f'\n<script src="{js_href}"></script>\n'
+        else:
+            yield "\n<script>\n"
+            yield from js_chunks
+            yield "\n</script>\n"
+
+    # 没有<head>标签时不插入CSS
+    css_pending = '<head>' in html_content
+    js_inserted = False
+    position = 0
+
+    for match in HTML_SPLICE_RE.finditer(html_content):
+        yield html_content[position:match.start()]
+        position = match.end()
+        kind = match.lastgroup
+
+        if kind == 'head_end':
+            if css_pending:
+                yield from css_block()
+                css_pending = False
+            yield match.group()
+        elif kind == 'body_end':
+            yield from js_block()
+            yield '\n' + match.group()
+            js_inserted = True
+        # 开发用的 <link>/<script> 引用直接跳过
+
+    yield html_content[position:]
+
+    # 如果没有找到</body>标签，添加到文件末尾
+    if not js_inserted:
+        yield from js_block()
+
+def generate_mode_report(html_content):
+    """分析每个构建模式摇树后的JS体积"""
+    sources = [read_file(js_file) for js_file in JS_FILES]
+    rows = []
+
+    for mode, profile in BUILD_PROFILES.items():
+        removed = []
+        shaken_sources = sources
+        if profile['stubs'] is not None:
+            shaken_sources, removed, _ = tree_shake_js(sources, html_content, profile['stubs'])
+
+        minified = '\n'.join(minify_js(source) for source in shaken_sources).encode('utf-8')
+        rows.append({
+            'mode': mode,
+            'description': profile['description'],
+            'removed': removed,
+            'source_size': sum(len(source.encode('utf-8')) for source in shaken_sources),
+            'minified_size': len(minified),
+            'gzip_size': len(gzip.compress(minified, compresslevel=9, mtime=0))
+        })
+
+    baseline = rows[0]['minified_size']
+    lines = [
+        "==========================================",
+        "PuzzleBossBattle 构建模式体积报告（JS）",
+        "==========================================",
+        f"{'模式':<8}{'移除声明':>8}{'源码':>12}{'压缩后':>12}{'gzip':>10}{'相比full':>10}  说明"
+    ]
+    for row in rows:
+        saving = (1 - row['minified_size'] / baseline) * 100 if baseline else 0
+        lines.append(f"{row['mode']:<10}{len(row['removed']):>10}{row['source_size']:>14,}{row['minified_size']:>14,}"
+                     f"{row['gzip_size']:>12,}{-saving:>11.1f}%  {row['description']}")
+    lines.append("==========================================")
+
+    # 逐个列出被移除的声明，便于发现只从HTML或控制台访问、需要加入 TREE_SHAKE_KEEP 的方法
+    for row in rows:
+        if not row['removed']:
+            continue
+        lines.append(f"模式 {row['mode']} 移除的声明:")
+        for declaration in row['removed']:
+            lines.append(f"  - {declaration['qualified_name']} ({declaration['kind']}, {declaration['size']:,} 字节)")
+    lines.append("==========================================")
+
+    return '\n'.join(lines)
 
 def generate_build_report(args, css_size, js_size, version_hash, output_path):
     """生成构建报告"""
@@ -294,6 +1863,7 @@ PuzzleBossBattle 构建报告
 ==========================================
 构建时间: {timestamp}
 构建方式: {build_type}
+构建模式: {args.mode}（{BUILD_PROFILES[args.mode]['description']}）
 版本哈希: {version_hash}
 CSS文件大小: {css_size:,} 字节
 JS文件大小: {js_size:,} 字节
@@ -315,42 +1885,150 @@ JS文件大小: {js_size:,} 字节
 
     return report
 
-def main():
-    """主函数"""
-    print(f"""
-PuzzleBossBattle 构建脚本 v{VERSION}
-==========================================
-    """)
-
-    # 解析参数
-    args = parse_arguments()
+def write_stream(file_path, chunks, precompress=False):
+    """把内容块依次编码写入文件，不在内存中拼接完整内容
 
-    # 检查必要文件
-    if not os.path.exists("index.html"):
-        print("[错误] index.html 文件不存在")
-        sys.exit(1)
-
-    if not os.path.exists("src/js"):
-        print("[错误] src/js 目录不存在")
-        sys.exit(1)
-
-    if not os.path.exists("src/css"):
-        print("[错误] src/css 目录不存在")
-        sys.exit(1)
-
-    # 读取HTML文件
-    print("[读取] HTML文件...")
-    html_content = read_file("index.html")
+    写入的同时计算SHA-256和大小；precompress 为真时同步写出 .gz（以及安装了brotli时的 .br）副本。
+    成功时返回 (SHA-256, 各版本大小)，失败时返回None。
+    """
+    hasher = hashlib.sha256()
+    raw_size = 0
 
-    # 合并CSS文件
-    merged_css, css_size = merge_css_files(CSS_FILES, minify=not args.no_minify)
-
-    # 合并JS文件
-    merged_js, js_size = merge_js_files(JS_FILES, minify=not args.no_minify)
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
+        with contextlib.ExitStack() as stack:
+            out = stack.enter_context(open(file_path, 'wb'))
+            gzip_out = None
+            brotli_out = None
+            brotli_compressor = None
+
+            if precompress:
+                # mtime=0 且不记录文件名，保证相同内容生成相同的压缩文件
+                gzip_raw = stack.enter_context(open(file_path + '.gz', 'wb'))
+                gzip_out = stack.enter_context(
+                    gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=gzip_raw, mtime=0))
+                if brotli is not None:
+                    brotli_out = stack.enter_context(open(file_path + '.br', 'wb'))
+                    brotli_compressor = brotli.Compressor(quality=11)
+
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                data = chunk.encode('utf-8')
+                raw_size += len(data)
+                hasher.update(data)
+                out.write(data)
+                if gzip_out is not None:
+                    gzip_out.write(data)
+                if brotli_compressor is not None:
+                    brotli_out.write(brotli_compressor.process(data))
+
+            if brotli_compressor is not None:
+                brotli_out.write(brotli_compressor.finish())
+    except Exception as e:
+        print(f"[错误] 写入文件失败 {file_path}: {e}")
+        return None
+
+    sizes = {'raw': raw_size}
+    if precompress:
+        sizes['gzip'] = os.path.getsize(file_path + '.gz')
+        if brotli is not None:
+            sizes['brotli'] = os.path.getsize(file_path + '.br')
+
+    return hasher.hexdigest(), sizes
+
+def remove_stale_assets(output_dir, keep_files):
+    """删除旧构建留下的拆分输出文件"""
+    for file_name in os.listdir(output_dir):
+        if SPLIT_OUTPUT_RE.fullmatch(file_name) and file_name not in keep_files:
+            try:
+                os.remove(os.path.join(output_dir, file_name))
+            except OSError as e:
+                print(f"[警告] 删除旧资源文件失败 {file_name}: {e}")
+
+def source_map_json(source_map, output_dir, file_name=None):
+    """生成写入输出目录的源码映射JSON：源文件路径改为相对于输出目录"""
+    data = {'version': source_map['version']}
+    if file_name:
+        data['file'] = file_name
+    data.update(source_map)
+    data['sources'] = [os.path.relpath(path, output_dir or '.').replace(os.sep, '/') for path in source_map['sources']]
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def source_map_comment(url):
+    """JS末尾指向源码映射的注释"""
+    return f"\n//# sourceMappingURL={url}"
+
+def inline_source_map_comment(source_map, output_dir):
+    """以data URL内嵌源码映射的注释"""
+    encoded = base64.b64encode(source_map_json(source_map, output_dir).encode('utf-8')).decode('ascii')
+    return source_map_comment(f"data:application/json;charset=utf-8;base64,{encoded}")
+
+def write_source_map(file_path, source_map, output_dir, file_name, output_hashes):
+    """写入源码映射文件，成功时返回文件大小"""
+    content = source_map_json(source_map, output_dir, file_name)
+    print(f"[保存] 源码映射: {file_path}")
+    if not write_file(file_path, content):
+        return None
+    data = content.encode('utf-8')
+    output_hashes[file_path] = hash_bytes(data)
+    return len(data)
+
+def write_split_assets(output_dir, css_chunks, js_chunks, output_hashes, profiler=None, source_map=None):
+    """将CSS和JS写成带内容哈希的独立文件，返回资源清单
+
+    传入 source_map 时同时写出 app.<哈希>.js.map，并在JS末尾引用它。
+    """
+    manifest = {'files': {}, 'sizes': {}}
+
+    for logical_name, chunks in (("app.css", css_chunks), ("app.js", js_chunks)):
+        map_content = source_map_json(source_map, output_dir) if logical_name == "app.js" and source_map else None
+
+        # 文件名需要先知道内容哈希，因此先逐块计算一次（有源码映射时映射内容也计入哈希）
+        with profile_stage(profiler, 'hash'):
+            hasher = hashlib.sha256()
+            for chunk in chunks:
+                hasher.update(chunk.encode('utf-8'))
+            if map_content:
+                hasher.update(map_content.encode('utf-8'))
+
+        stem, ext = os.path.splitext(logical_name)
+        file_name = f"{stem}.{hasher.hexdigest()[:ASSET_HASH_LENGTH]}{ext}"
+        file_path = os.path.join(output_dir, file_name)
+
+        if map_content:
+            map_name = file_name + '.map'
+            with profile_stage(profiler, 'write'):
+                map_size = write_source_map(os.path.join(output_dir, map_name), source_map, output_dir,
+                                            file_name, output_hashes)
+            if map_size is None:
+                return None
+            manifest['files'][logical_name + '.map'] = map_name
+            manifest['sizes'][map_name] = {'raw': map_size}
+            chunks = itertools.chain(chunks, [source_map_comment(map_name)])
+
+        print(f"[保存] 资源文件: {file_path}")
+        with profile_stage(profiler, 'write'):
+            result = write_stream(file_path, chunks, precompress=True)
+        if result is None:
+            return None
+
+        output_hashes[file_path], manifest['sizes'][file_name] = result
+        manifest['files'][logical_name] = file_name
+
+    return manifest
+
+def write_build_output(args, html_content, css_chunks, css_size, js_chunks, js_size, output_path, fingerprint=None,
+                       profiler=None, critical_chunks=None, source_map=None):
+    """组装最终HTML并写入输出文件，成功时返回 (HTML大小, 版本哈希)
+
+    传入 critical_chunks 时 css_chunks 为延迟加载的样式（见 build_html_template）。
+    传入 source_map 时按 --sourcemap / --inline-sourcemap 写出或内嵌JS的源码映射。
+    """
     # 生成版本哈希（基于JS和CSS内容）
-    combined_content = merged_css + merged_js
-    version_hash = generate_version_hash(combined_content)
+    with profile_stage(profiler, 'hash'):
+        version_hash = generate_version_hash(itertools.chain(critical_chunks or [], css_chunks, js_chunks))
 
     # 构建信息
     build_info = {
@@ -360,25 +2038,375 @@ PuzzleBossBattle 构建脚本 v{VERSION}
         'js_size': js_size
     }
 
-    # 构建HTML
-    final_html = build_html_template(html_content, merged_css, merged_js, version_hash, build_info)
+    output_dir = os.path.dirname(output_path)
+    output_hashes = {}
+    map_sizes = {}
+
+    # 源码映射：内嵌时直接附加到JS末尾，单独输出时拆分模式随JS文件一起写出，内联构建写到 index.js.map
+    map_mode = source_map_mode(args) if source_map else None
+    if map_mode == 'inline':
+        js_chunks = list(js_chunks) + [inline_source_map_comment(source_map, output_dir)]
+    elif map_mode == 'file' and not args.split:
+        map_path = os.path.join(output_dir, INLINE_SOURCE_MAP_FILE)
+        with profile_stage(profiler, 'write'):
+            map_size = write_source_map(map_path, source_map, output_dir, os.path.basename(output_path),
+                                        output_hashes)
+        if map_size is None:
+            return None
+        map_sizes[INLINE_SOURCE_MAP_FILE] = {'raw': map_size}
+        js_chunks = list(js_chunks) + [source_map_comment(INLINE_SOURCE_MAP_FILE)]
+
+    if args.split:
+        # 拆分输出：CSS/JS写成带哈希的文件，HTML只保留引用
+        asset_manifest = write_split_assets(output_dir, css_chunks, js_chunks, output_hashes, profiler,
+                                            source_map if map_mode == 'file' else None)
+        if asset_manifest is None:
+            return None
+
+        html_chunks = build_html_template(html_content, css_chunks, js_chunks, version_hash, build_info,
+                                          css_href=asset_manifest['files']['app.css'],
+                                          js_href=asset_manifest['files']['app.js'],
+                                          critical_chunks=critical_chunks)
+    else:
+        # 构建HTML
+        html_chunks = build_html_template(html_content, css_chunks, js_chunks, version_hash, build_info,
+                                          critical_chunks=critical_chunks)
+
+    if profiler:
+        html_chunks = profiler.timed_iter('template', html_chunks)
+
+    print(f"[保存] 到: {output_path}")
+    with profile_stage(profiler, 'write'):
+        result = write_stream(output_path, html_chunks, precompress=args.split)
+    if result is None:
+        return None
+    output_hashes[output_path], html_sizes = result
+
+    if args.split:
+        asset_manifest['version'] = version_hash
+        asset_manifest['sizes'][os.path.basename(output_path)] = html_sizes
+
+        manifest_path = os.path.join(output_dir, ASSET_MANIFEST_FILE)
+        manifest_json = json.dumps(asset_manifest, ensure_ascii=False, indent=2)
+        print(f"[保存] 资源清单: {manifest_path}")
+        if not write_file(manifest_path, manifest_json):
+            return None
+        output_hashes[manifest_path] = hash_bytes(manifest_json.encode('utf-8'))
+
+        keep_files = {ASSET_MANIFEST_FILE}
+        for file_name in asset_manifest['sizes']:
+            keep_files.update({file_name, file_name + '.gz', file_name + '.br'})
+        remove_stale_assets(output_dir, keep_files)
+    else:
+        # 内联构建不再需要之前拆分输出的文件
+        remove_stale_assets(output_dir, set(map_sizes))
+
+    if profiler:
+        profiler.outputs[output_path] = html_sizes
+        for file_name, sizes in (asset_manifest['sizes'] if args.split else map_sizes).items():
+            profiler.outputs[os.path.join(output_dir, file_name)] = sizes
+
+    # 记录构建指纹，供下一次构建判断是否可以跳过
+    if fingerprint:
+        save_cache_manifest({
+            'fingerprint': fingerprint,
+            'outputs': output_hashes
+        })
+
+    return html_sizes['raw'], version_hash
+
+def snapshot_files(file_paths):
+    """记录文件的修改时间和大小，文件不存在时记为None"""
+    snapshot = []
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+            snapshot.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            snapshot.append(None)
+    return snapshot
+
+def watch_and_rebuild(args, output_path, html_content, css_result, js_result):
+    """监听源文件变化，只重新构建发生变化的部分
+
+    HTML模板、CSS和JS的合并结果保存在内存中，某一组文件变化时只重新处理该组，
+    其余部分直接复用；未变化的单个文件还会命中构建缓存。
+    """
+    watched = {
+        'html': ["index.html"],
+        'css': CSS_FILES,
+        'js': JS_FILES
+    }
+    snapshots = {group: snapshot_files(paths) for group, paths in watched.items()}
+    use_cache = not args.no_cache
+
+    print(f"[监听] 正在监听 index.html、src/css、src/js（每 {WATCH_INTERVAL * 1000:.0f} 毫秒检查一次），按 Ctrl+C 退出")
+
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+
+            changed = []
+            for group, paths in watched.items():
+                snapshot = snapshot_files(paths)
+                if snapshot != snapshots[group]:
+                    snapshots[group] = snapshot
+                    changed.append(group)
+
+            if not changed:
+                continue
+
+            start_time = time.perf_counter()
+            print(f"\n[监听] 检测到变化: {', '.join(changed)}")
+
+            try:
+                if 'html' in changed:
+                    html_content = read_file("index.html")
+                if 'css' in changed:
+                    css_result = merge_css_files(CSS_FILES, minify=not args.no_minify, use_cache=use_cache, jobs=args.jobs)
+                # 摇树时HTML中的事件处理器也是入口，HTML变化后需要重新分析JS
+                if 'js' in changed or ('html' in changed and BUILD_PROFILES[args.mode]['stubs'] is not None):
+                    js_result = merge_js_files(JS_FILES, minify=not args.no_minify, use_cache=use_cache, jobs=args.jobs,
+                                               mode=args.mode, html_content=html_content,
+                                               source_map=source_map_mode(args) is not None)
+
+                # 关键CSS取决于CSS、HTML和JS中用到的选择器，任何一组变化都需要重新拆分（未变化时命中缓存）
+                css_chunks = css_result[0]
+                critical_chunks = None
+                if args.critical_css:
+                    critical_chunks, css_chunks = extract_critical_css(css_chunks, html_content, JS_FILES,
+                                                                       not args.no_minify, use_cache)
+
+                fingerprint = None
+                if use_cache:
+                    fingerprint = compute_build_fingerprint(args, ["index.html"] + CSS_FILES + JS_FILES)
+
+                result = write_build_output(args, html_content, css_chunks, css_result[1],
+                                            js_result[0], js_result[1], output_path, fingerprint,
+                                            critical_chunks=critical_chunks, source_map=js_result[2])
+                # 每次重新构建后同样记录体积、检查预算，超出预算时只报告，继续监听
+                if result and not record_build_sizes(args, css_result[0], js_result[0], output_path, result[1]):
+                    print("[错误] 体积预算检查失败，修改后会重新检查")
+            except SystemExit:
+                # 读取失败等错误已经打印，继续等待下一次修改
+                result = None
+
+            elapsed = (time.perf_counter() - start_time) * 1000
+            if result:
+                print(f"[监听] 重新构建完成，耗时 {elapsed:.0f} 毫秒")
+            else:
+                print("[错误] 重新构建失败，等待下一次修改...")
+    except KeyboardInterrupt:
+        print("\n[监听] 已停止")
+
+# 体积预算配置文件：每个JS/CSS模块的输出和最终HTML允许的最大原始/gzip字节数
+BUDGET_FILE = "build-budgets.json"
+
+# 每次构建后记录的各文件体积（按构建参数分别保存），--check-budgets 与上一次的记录对比
+SIZE_RECORD_FILE = "sizes.json"
+
+def gzip_size(data):
+    """gzip压缩后的大小（与预压缩文件相同的压缩级别）"""
+    return len(gzip.compress(data, compresslevel=9, mtime=0))
+
+def collect_build_sizes(css_files, css_chunks, js_files, js_chunks, output_path):
+    """统计每个模块的输出和最终HTML的原始/gzip大小
+
+    模块的输出取自合并结果末尾按文件顺序排列、以分隔符隔开的内容块（见 join_chunks），
+    前面的交换查找表等构建时生成的代码不计入任何模块。
+    """
+    sizes = {}
+    for files, chunks in ((css_files, css_chunks), (js_files, js_chunks)):
+        file_chunks = chunks[len(chunks) - 2 * len(files) + 1::2]
+        for file_path, chunk in zip(files, file_chunks):
+            data = chunk.encode('utf-8')
+            sizes[file_path] = {'raw': len(data), 'gzip': gzip_size(data)}
+
+    with open(output_path, 'rb') as f:
+        data = f.read()
+    sizes[output_path.replace(os.sep, '/')] = {'raw': len(data), 'gzip': gzip_size(data)}
+    return sizes
+
+def load_size_records():
+    """读取之前构建记录的文件体积"""
+    try:
+        with open(os.path.join(CACHE_DIR, SIZE_RECORD_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_size_records(records):
+    """保存本次构建的文件体积"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CACHE_DIR, SIZE_RECORD_FILE), 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"[警告] 写入体积记录失败: {e}")
+
+def load_budgets(file_path):
+    """读取体积预算配置，格式错误时中止构建"""
+    if not os.path.exists(file_path):
+        print(f"[错误] 体积预算文件不存在: {file_path}")
+        sys.exit(1)
+
+    try:
+        budgets = json.loads(read_file(file_path))['files']
+        for name, budget in budgets.items():
+            for limit in budget.values():
+                if not isinstance(limit, int) or limit < 1:
+                    raise ValueError(f"{name} 的预算必须是正整数")
+            unknown = set(budget) - {'raw', 'gzip'}
+            if unknown:
+                raise ValueError(f"{name} 中有未知的预算项: {', '.join(sorted(unknown))}")
+    except (KeyError, TypeError, AttributeError, ValueError) as e:
+        print(f"[错误] 体积预算文件格式错误 {file_path}: {e}")
+        sys.exit(1)
+
+    return budgets
+
+def format_size_change(current, previous):
+    """与上一次构建相比的变化，如 +120"""
+    if previous is None:
+        return "新增"
+    change = current - previous
+    return f"{change:+,}" if change else "0"
 
+def has_grown(size, last):
+    """原始大小或gzip大小比上一次构建大"""
+    return any(key in last and size[key] > last[key] for key in ('raw', 'gzip'))
+
+def check_budgets(budgets, sizes, previous):
+    """逐个文件检查体积预算并打印与上一次构建的对比，返回超出预算的 (文件, 项目, 大小, 预算) 列表"""
+    previous = previous or {}
+    violations = []
+
+    print(f"""
+==========================================
+体积预算检查（{BUDGET_FILE}）
+==========================================""")
+    print(f"{'文件':<30}{'原始大小':>8}{'gzip':>10}{'预算(原始/gzip)':>16}{'相比上次(原始/gzip)':>18}")
+
+    for name, size in sizes.items():
+        budget = budgets.get(name, {})
+        last = previous.get(name, {})
+        limits = '/'.join(f"{budget[key]:,}" if key in budget else '-' for key in ('raw', 'gzip'))
+        changes = '/'.join(format_size_change(size[key], last.get(key)) for key in ('raw', 'gzip'))
+
+        marker = ""
+        for key in ('raw', 'gzip'):
+            if key in budget and size[key] > budget[key]:
+                violations.append((name, key, size[key], budget[key]))
+                marker = "  ← 超出预算"
+        if not marker and has_grown(size, last):
+            marker = "  ↑"
+        print(f"{name:<32}{size['raw']:>12,}{size['gzip']:>10,}{limits:>20}{changes:>24}{marker}")
+
+    for name in sorted(set(budgets) - set(sizes)):
+        print(f"[警告] 预算中的文件不在本次构建的输出中: {name}")
+
+    if not violations:
+        print("所有文件都在预算之内")
+        return violations
+
+    print(f"\n[错误] {len(violations)} 项超出体积预算:")
+    for name, key, size, limit in violations:
+        label = '原始大小' if key == 'raw' else 'gzip'
+        last = previous.get(name, {}).get(key)
+        if last is None:
+            history = "没有上一次构建的记录"
+        else:
+            history = f"上一次构建 {last:,} 字节，变化 {format_size_change(size, last)}"
+        print(f"  {name}: {label} {size:,} 字节，超出预算 {size - limit:,} 字节（预算 {limit:,}；{history}）")
+
+    grown = [name for name, size in sizes.items() if has_grown(size, previous.get(name, {}))]
+    if grown:
+        print(f"  与上一次构建相比变大的文件: {', '.join(grown)}")
+    return violations
+
+def record_build_sizes(args, css_chunks, js_chunks, output_path, version_hash):
+    """记录各文件体积，指定 --check-budgets 时检查预算，超出预算时返回 False
+
+    预算针对生产环境的压缩输出，--no-minify 构建只记录体积、不检查预算。
+    超出预算时不更新记录，下次检查仍与最后一次通过的构建对比。
+    """
+    sizes = collect_build_sizes(CSS_FILES, css_chunks, JS_FILES, js_chunks, output_path)
+    size_records = load_size_records()
+    signature = build_options_signature(args)
+    if args.check_budgets and not args.no_minify:
+        previous = size_records.get(signature, {}).get('files')
+        if check_budgets(load_budgets(BUDGET_FILE), sizes, previous):
+            return False
+    size_records[signature] = {
+        'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'version': version_hash,
+        'files': sizes
+    }
+    save_size_records(size_records)
+    return True
+
+def run_build(args, profiler=None):
+    """执行一次完整构建，成功时返回监听模式需要的中间结果"""
     # 输出文件
     output_dir = "dist"
     output_path = os.path.join(output_dir, "index.html")
 
-    print(f"[保存] 到: {output_path}")
-    if write_file(output_path, final_html):
-        # 生成构建报告
-        report = generate_build_report(args, css_size, js_size, version_hash, output_path)
-        print(report)
+    # 输入未变化时直接复用上一次的构建输出
+    use_cache = not args.no_cache
+    fingerprint = None
+    if use_cache:
+        with profile_stage(profiler, 'hash'):
+            fingerprint = compute_build_fingerprint(args, ["index.html"] + CSS_FILES + JS_FILES)
+            # 检查预算时总是重新统计体积（未变化的文件仍然命中缓存）
+            up_to_date = not args.watch and not args.check_budgets and is_build_up_to_date(fingerprint)
+        if up_to_date:
+            print(f"[缓存] 源文件未变化，跳过构建: {output_path}")
+            return None
+
+    # 读取HTML文件
+    print("[读取] HTML文件...")
+    with profile_stage(profiler, 'read'):
+        html_content = read_file("index.html")
+
+    # 合并CSS文件
+    css_chunks, css_size = merge_css_files(CSS_FILES, minify=not args.no_minify, use_cache=use_cache, jobs=args.jobs,
+                                           profiler=profiler)
 
-        # 显示文件大小
-        output_size = len(final_html.encode('utf-8'))
-        print(f"📊 最终文件大小: {output_size:,} 字节")
+    # 合并JS文件
+    js_chunks, js_size, source_map = merge_js_files(JS_FILES, minify=not args.no_minify, use_cache=use_cache,
+                                                    jobs=args.jobs, mode=args.mode, html_content=html_content,
+                                                    profiler=profiler, source_map=source_map_mode(args) is not None)
+
+    # 拆分首屏关键CSS
+    critical_chunks = deferred_chunks = None
+    if args.critical_css:
+        with profile_stage(profiler, 'merge'):
+            critical_chunks, deferred_chunks = extract_critical_css(css_chunks, html_content, JS_FILES,
+                                                                    not args.no_minify, use_cache)
+
+    # 生成并写入HTML
+    result = write_build_output(args, html_content, deferred_chunks or css_chunks, css_size, js_chunks, js_size,
+                                output_path, fingerprint, profiler, critical_chunks, source_map)
+    if not result:
+        print("[错误] 构建失败！")
+        return None
+
+    output_size, version_hash = result
+
+    # 生成构建报告
+    report = generate_build_report(args, css_size, js_size, version_hash, output_path)
+    print(report)
+
+    # 显示文件大小
+    print(f"📊 最终文件大小: {output_size:,} 字节")
+
+    # 记录各文件体积，检查预算
+    if not record_build_sizes(args, css_chunks, js_chunks, output_path, version_hash):
+        print("[错误] 体积预算检查失败！")
+        sys.exit(1)
 
-        # 显示完成信息
-        print("""
+    # 显示完成信息
+    print("""
 构建完成！
 ==========================================
 现在你可以:
@@ -389,8 +2417,57 @@ PuzzleBossBattle 构建脚本 v{VERSION}
 祝游戏愉快！
 ==========================================
         """)
-    else:
-        print("[错误] 构建失败！")
+
+    return output_path, html_content, (css_chunks, css_size), (js_chunks, js_size, source_map)
+
+def main():
+    """主函数"""
+    print(f"""
+PuzzleBossBattle 构建脚本 v{VERSION}
+==========================================
+    """)
+
+    # 解析参数
+    args = parse_arguments()
+
+    # 检查必要文件
+    if not os.path.exists("index.html"):
+        print("[错误] index.html 文件不存在")
+        sys.exit(1)
+
+    if not os.path.exists("src/js"):
+        print("[错误] src/js 目录不存在")
+        sys.exit(1)
+
+    if not os.path.exists("src/css"):
+        print("[错误] src/css 目录不存在")
+        sys.exit(1)
+
+    if args.mode_report:
+        print(generate_mode_report(read_file("index.html")))
+        return
+
+    profiler = None
+    if args.profile or args.report_json:
+        profiler = BuildProfiler()
+        profiler.start()
+
+    if args.check_budgets and args.no_minify:
+        print("[警告] 体积预算只适用于压缩后的构建，--no-minify 时跳过预算检查")
+
+    build_state = run_build(args, profiler)
+
+    if profiler:
+        profiler.finish()
+        if args.profile:
+            print(profiler.format_report())
+        if args.report_json:
+            report_json = json.dumps(profiler.to_dict(args), ensure_ascii=False, indent=2)
+            if write_file(args.report_json, report_json):
+                print(f"[保存] 性能报告: {args.report_json}")
+
+    if args.watch and build_state:
+        watch_and_rebuild(args, *build_state)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,15 @@
+"""
+PuzzleBossBattle 无界面模拟器
+用Python重新实现游戏规则，批量模拟对局，根据数据调整 src/js/constants.js 中的参数
+
+    from simulator.engine import MatchEngine
+
+    engine = MatchEngine(seed=42)
+    engine.new_game()
+    while not engine.is_game_over():
+        engine.play_move(*engine.available_moves[0])
+
+整批对局同时推进的 BatchMatchEngine / BatchBossEngine 规则相同，命令行模拟使用它们。
+
+命令行用法见 python -m simulator --help（需要安装 numpy）。
+"""
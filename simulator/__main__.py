@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+PuzzleBossBattle 模拟器命令行
+
+使用方法：
+    python -m simulator classic                        # 模拟1000局经典模式
+    python -m simulator classic --games 10000 --seed 1 # 指定局数和随机种子
+    python -m simulator classic --batch 5000           # 每批同时模拟5000局
+    python -m simulator classic --shape-prob star=0.15 --color-prob red=0.25   # 覆盖概率配置
+    python -m simulator classic --output classic.json  # 保存统计结果
+    python -m simulator boss                           # 所有关卡各模拟1000局Boss战
+    python -m simulator boss --policy greedy --levels 1-10 --games 5000
+    python -m simulator boss --csv boss.csv --output boss.json   # 保存每关统计
+"""
+
+import os
+import sys
+import argparse
+import json
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    print("[错误] 模拟器需要 numpy，请先运行: pip install numpy")
+    sys.exit(1)
+
+from .constants import load_constants
+from .engine import BatchMatchEngine
+from .montecarlo import run_boss_sweep, write_csv
+from .policies import BATCH_POLICIES
+
+# 经典模式每批同时模拟的局数
+CLASSIC_BATCH_GAMES = 1000
+
+def positive_int(value):
+    """解析正整数参数"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须是正整数: {value}")
+    return number
+
+def parse_levels(value):
+    """解析关卡范围，如 1-70、10,20,30 或 1-9,10"""
+    levels = set()
+    try:
+        for item in value.split(','):
+            first, _, last = item.partition('-')
+            levels.update(range(int(first), int(last or first) + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的关卡范围: {value}")
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError(f"无效的关卡范围: {value}")
+    return sorted(levels)
+
+def parse_probabilities(value):
+    """解析 name=0.1,name2=0.2 形式的概率覆盖"""
+    probabilities = {}
+    for item in value.split(','):
+        name, _, probability = item.partition('=')
+        try:
+            probabilities[name.strip()] = float(probability)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"无效的概率配置: {item}")
+    return probabilities
+
+def parse_arguments():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog="python -m simulator",
+        description="PuzzleBossBattle 无界面模拟器",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python -m simulator classic                        # 模拟1000局经典模式
+  python -m simulator classic --games 10000 --seed 1 # 指定局数和随机种子
+  python -m simulator classic --batch 5000           # 每批同时模拟5000局
+  python -m simulator classic --shape-prob star=0.15 --color-prob red=0.25   # 覆盖概率配置
+  python -m simulator boss                           # 所有关卡各模拟1000局Boss战
+  python -m simulator boss --policy greedy --levels 1-10 --games 5000
+  python -m simulator boss --csv boss.csv --output boss.json   # 保存每关统计
+        """
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    classic = subparsers.add_parser("classic", help="模拟经典模式")
+    classic.add_argument("--games", "-g", type=positive_int, default=1000, help="模拟局数（默认: 1000）")
+    classic.add_argument("--policy", choices=sorted(BATCH_POLICIES), default="random", help="出手策略（默认: random）")
+    classic.add_argument("--batch", "-b", type=positive_int, default=CLASSIC_BATCH_GAMES,
+                         help=f"每批同时模拟的局数（默认: {CLASSIC_BATCH_GAMES}）")
+    classic.add_argument("--seed", type=int, default=None, help="随机种子，相同种子和批量大小的结果可复现")
+    classic.add_argument("--shape-prob", type=parse_probabilities, default=None, metavar="SHAPE=P,...",
+                         help="覆盖 SHAPE_PROBABILITIES 中的形状概率")
+    classic.add_argument("--color-prob", type=parse_probabilities, default=None, metavar="COLOR=P,...",
+                         help="覆盖 COLOR_PROBABILITIES 中的颜色概率")
+    classic.add_argument("--output", "-o", metavar="PATH", help="将统计结果以JSON格式写入指定文件")
+
+    boss = subparsers.add_parser("boss", help="并行模拟Boss战各关卡的胜率")
+    boss.add_argument("--games", "-g", type=positive_int, default=1000, help="每关模拟局数（默认: 1000）")
+    boss.add_argument("--levels", "-l", type=parse_levels, default=None,
+                      help="模拟的关卡，如 1-70、10,20,30（默认: 所有关卡）")
+    boss.add_argument("--policy", choices=sorted(BATCH_POLICIES), default="greedy", help="出手策略（默认: greedy）")
+    boss.add_argument("--jobs", "-j", type=positive_int, default=os.cpu_count(),
+                      help="并行进程数（默认: CPU核心数）")
+    boss.add_argument("--seed", type=int, default=None, help="随机种子，相同种子结果可复现（与进程数无关）")
+    boss.add_argument("--csv", metavar="PATH", help="将每关统计写入CSV文件")
+    boss.add_argument("--output", "-o", metavar="PATH", help="将每关统计以JSON格式写入指定文件")
+
+    return parser.parse_args()
+
+def merge_probabilities(defaults, overrides):
+    """用命令行参数覆盖常量中的概率，未知名称直接报错"""
+    if not overrides:
+        return None
+    unknown = set(overrides) - set(defaults)
+    if unknown:
+        print(f"[错误] 未知的名称: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    return {**defaults, **overrides}
+
+def run_classic(args):
+    """分批同时模拟经典模式并汇总分数分布"""
+    constants = load_constants()
+    engine = BatchMatchEngine(
+        constants, seed=args.seed,
+        shape_probabilities=merge_probabilities(constants['SHAPE_PROBABILITIES'], args.shape_prob),
+        color_probabilities=merge_probabilities(constants['COLOR_PROBABILITIES'], args.color_prob)
+    )
+
+    policy = BATCH_POLICIES[args.policy]
+    scores = []
+    total_moves = total_combos = refreshes = 0
+    start = time.perf_counter()
+
+    for first in range(0, args.games, args.batch):
+        engine.new_games(min(args.batch, args.games - first))
+        while True:
+            rows = engine.playable_rows()
+            if not len(rows):
+                break
+            result = engine.play_moves(rows, policy(engine, rows, engine.available_moves[rows]))
+            total_moves += len(rows)
+            total_combos += int(result.combo_count.sum())
+            refreshes += int(result.refreshed.sum())
+        scores.extend(engine.scores.tolist())
+
+    elapsed = time.perf_counter() - start
+    scores = np.array(scores)
+
+    return {
+        'mode': 'classic',
+        'games': args.games,
+        'seed': args.seed,
+        'batch': args.batch,
+        'policy': args.policy,
+        'probabilities': engine.probabilities,
+        'score_mean': float(scores.mean()),
+        'score_std': float(scores.std()),
+        'score_percentiles': {str(p): float(np.percentile(scores, p)) for p in (10, 25, 50, 75, 90)},
+        'combo_per_move': total_combos / total_moves,
+        'refresh_rate': refreshes / total_moves,
+        'moves': total_moves,
+        'seconds': elapsed,
+        'moves_per_minute': total_moves / elapsed * 60 if elapsed else None
+    }
+
+def print_classic_report(result):
+    """打印经典模式统计结果"""
+    percentiles = result['score_percentiles']
+    print(f"""
+==========================================
+经典模式模拟结果
+==========================================
+模拟局数: {result['games']:,}（策略: {result['policy']}）
+平均分数: {result['score_mean']:.1f} (标准差 {result['score_std']:.1f})
+分数分位: P10 {percentiles['10']:.0f} / P50 {percentiles['50']:.0f} / P90 {percentiles['90']:.0f}
+平均连击: {result['combo_per_move']:.3f} 次/步
+死局刷新: {result['refresh_rate'] * 100:.2f}% 的步数
+模拟速度: {result['moves_per_minute']:,.0f} 步/分钟
+==========================================""")
+
+def run_boss(args):
+    """并行模拟Boss战各关卡"""
+    constants = load_constants()
+    levels = args.levels or list(range(1, constants['BOSS_MAX_LEVEL'] + 1))
+    print(f"[模拟] {len(levels)} 个关卡 × {args.games:,} 局，策略 {args.policy}，{args.jobs} 个进程")
+
+    def progress(done, total):
+        print(f"\r[进度] {done}/{total} 批", end='', flush=True)
+
+    start = time.perf_counter()
+    rows = run_boss_sweep(constants, levels, args.games, args.policy, args.jobs, args.seed, progress)
+    elapsed = time.perf_counter() - start
+    print()
+
+    return {
+        'mode': 'boss',
+        'games_per_level': args.games,
+        'seed': args.seed,
+        'policy': args.policy,
+        'seconds': elapsed,
+        'levels': rows
+    }
+
+def print_boss_report(result):
+    """打印每关的胜率表格"""
+    print("""
+==========================================
+Boss战模拟结果
+==========================================""")
+    print(f"{'关卡':>4}{'触发率':>8}{'胜率':>8}{'平均步数':>10}{'步数耗尽':>10}{'血量归零':>10}{'无法移动':>10}{'技能/局':>9}")
+    for row in result['levels']:
+        print(f"{row['level']:>6}{row['skill_rate']:>10.0%}{row['win_rate']:>10.1%}{row['avg_moves']:>12.1f}"
+              f"{row['out_of_moves_rate']:>13.1%}{row['player_dead_rate']:>13.1%}{row['stuck_rate']:>13.1%}"
+              f"{row['skills_per_game']:>11.2f}")
+    print(f"==========================================\n耗时: {result['seconds']:.1f} 秒")
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+
+    if args.command == "classic":
+        result = run_classic(args)
+        print_classic_report(result)
+    else:
+        result = run_boss(args)
+        print_boss_report(result)
+        if args.csv:
+            write_csv(args.csv, result['levels'])
+            print(f"[保存] 每关统计: {args.csv}")
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[保存] 统计结果: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n[警告] 模拟被用户中断")
+        sys.exit(1)
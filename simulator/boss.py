@@ -0,0 +1,645 @@
+"""
+Boss战规则的无界面实现
+对应 src/js/bossSystem.js 中的 BossSystem，以及 gameLogic.js 中Boss模式下的 processMatches
+（冻结、小怪、毒素、炸弹格子的处理，技能触发，玩家攻击和步数奖励）
+
+每局模拟从选择关卡开始（与关卡选择界面相同：50步、满血），Boss血量归零为胜，
+步数用完或玩家血量归零为负。道具不参与模拟。
+"""
+
+import math
+
+import numpy as np
+
+from .engine import EMPTY, BatchMatchEngine, MatchEngine, MoveResult, triple_starts
+
+# initBoss 中选择关卡时的初始步数
+LEVEL_SELECT_MOVES = 50
+
+# 对局结果
+OUTCOME_WIN = 'win'
+OUTCOME_OUT_OF_MOVES = 'out_of_moves'
+OUTCOME_PLAYER_DEAD = 'player_dead'
+OUTCOME_STUCK = 'stuck'  # 只剩涉及冻结方块的交换，无法继续
+OUTCOMES = [OUTCOME_WIN, OUTCOME_OUT_OF_MOVES, OUTCOME_PLAYER_DEAD, OUTCOME_STUCK]
+
+# 批量模拟中 outcomes 数组存放 OUTCOMES 的下标，尚未分出胜负时为 NO_OUTCOME
+NO_OUTCOME = -1
+
+def boss_skill_rate(skill_rates, level):
+    """获取Boss技能触发率：从指定关卡向下查找最近的配置"""
+    for candidate in range(level, 0, -1):
+        if candidate in skill_rates:
+            return skill_rates[candidate]
+    return 0.1
+
+def run_lengths(starts):
+    """每个三连起点沿最后一维连续的起点数（含自身），加2即为 runs_from_starts 中该起点的匹配长度"""
+    runs = starts.astype(np.int64)
+    for index in range(starts.shape[-1] - 2, -1, -1):
+        runs[..., index] = np.where(starts[..., index], runs[..., index + 1] + 1, 0)
+    return runs
+
+def match_list(horizontal, vertical):
+    """把一批棋盘上的匹配逐个展开，每块棋盘内的顺序与 find_matches 相同
+
+    返回 (所属棋盘下标, 在该棋盘匹配中的序号, 匹配覆盖的格子)，按棋盘下标排序。
+    """
+    size = horizontal.shape[-1] + 2
+    cells = np.arange(size)
+    boards, masks = [], []
+    # 纵向匹配转置后按列优先展开，与 runs_from_starts 对 starts.T 的处理相同
+    for starts, transposed in ((horizontal, False), (vertical.swapaxes(1, 2), True)):
+        lengths = run_lengths(starts) + 2
+        board, line, start = np.nonzero(starts)
+        end = start + lengths[board, line, start]
+        mask = np.zeros((len(board), size, size), dtype=bool)
+        mask[np.arange(len(board)), line] = (cells >= start[:, np.newaxis]) & (cells < end[:, np.newaxis])
+        boards.append(board)
+        masks.append(mask.swapaxes(1, 2) if transposed else mask)
+
+    board = np.concatenate(boards)
+    order = np.argsort(board, kind='stable')
+    board = board[order]
+    rank = np.arange(len(board)) - np.searchsorted(board, board)
+    return board, rank, np.concatenate(masks)[order]
+
+class BossSystem:
+    """Boss状态和技能，对应 BossSystem"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.constants = engine.constants
+        self.rng = engine.rng
+        self.skills = list(self.constants['BOSS_SKILLS'].values())
+        self.skill_rates = {int(level): rate for level, rate in self.constants['BOSS_SKILL_RATES'].items()}
+
+        self.boss_level = 1
+        self.boss = None
+        self.player_hp = 100
+        self.player_max_hp = 100
+        self.boss_skill_sealed = 0
+        self.frozen_cells = {}     # {(行, 列): 剩余消除次数}
+        self.poisoned_cells = set()
+        self.monster_cells = {}    # {(行, 列): 血量}
+        self.bomb_cells = {}       # {(行, 列): 倒计时}
+
+        # 统计数据
+        self.skill_counts = {skill['id']: 0 for skill in self.skills}
+        self.sealed_count = 0
+
+    # ========== 初始化 ==========
+
+    def init_boss(self, level):
+        """初始化指定关卡的Boss（按选择关卡的规则设置步数）"""
+        self.boss_level = level
+        boss_hp = level * 100
+        self.boss = {
+            'max_hp': boss_hp,
+            'hp': boss_hp,
+            'shield': 0,
+            'skill_rate': self.get_boss_skill_rate()
+        }
+
+        self.player_max_hp = math.ceil(boss_hp * self.constants['PLAYER_HP_RATIO'])
+        self.player_hp = self.player_max_hp
+        self.boss_skill_sealed = 0
+
+        self.frozen_cells.clear()
+        self.poisoned_cells.clear()
+        self.monster_cells.clear()
+        self.bomb_cells.clear()
+        self.skill_counts = {skill['id']: 0 for skill in self.skills}
+        self.sealed_count = 0
+
+        self.engine.moves = LEVEL_SELECT_MOVES
+
+    def get_boss_skill_rate(self):
+        """获取Boss技能触发率：从当前关卡向下查找最近的配置"""
+        return boss_skill_rate(self.skill_rates, self.boss_level)
+
+    # ========== 技能 ==========
+
+    def trigger_boss_skill(self):
+        """Boss触发技能，返回触发的技能id（未触发时返回None）"""
+        if self.boss_skill_sealed > 0:
+            self.boss_skill_sealed -= 1
+            self.sealed_count += 1
+            return None
+
+        if self.rng.random() > self.boss['skill_rate']:
+            return None
+
+        # 先随机选择一个技能，再按概率重新选择（概率之和小于1时保留随机结果）
+        selected = self.skills[int(self.rng.integers(len(self.skills)))]
+        rand = self.rng.random()
+        cumulative = 0
+        for skill in self.skills:
+            cumulative += skill['probability']
+            if rand <= cumulative:
+                selected = skill
+                break
+
+        self.execute_boss_skill(selected['id'])
+        return selected['id']
+
+    def execute_boss_skill(self, skill_id):
+        """执行Boss技能"""
+        self.skill_counts[skill_id] += 1
+        getattr(self, f"skill_{skill_id}")()
+
+    def sample_cells(self, excluded, count):
+        """从不在 excluded 中的格子里随机选择最多 count 个"""
+        size = self.engine.board_size
+        available = [(row, col) for row in range(size) for col in range(size) if (row, col) not in excluded]
+        count = min(count, len(available))
+        return [available[index] for index in self.rng.choice(len(available), count, replace=False)]
+
+    def skill_freeze(self):
+        """冻结覆盖：冻结3-5个方块，需要消除3次"""
+        for cell in self.sample_cells(self.frozen_cells, int(self.rng.integers(3, 6))):
+            self.frozen_cells[cell] = 3
+
+    def skill_poison(self):
+        """毒素蔓延：1-10个方块带有毒素"""
+        self.poisoned_cells.update(self.sample_cells(self.poisoned_cells, int(self.rng.integers(1, 11))))
+
+    def skill_summon(self):
+        """召唤小怪：3个小怪，每个2-4点血"""
+        for cell in self.sample_cells(self.monster_cells, 3):
+            self.monster_cells[cell] = int(self.rng.integers(2, 5))
+
+    def skill_shield(self):
+        """护盾生成：Boss最大血量的10%-30%"""
+        shield_rate = 0.1 + self.rng.random() * 0.2
+        self.boss['shield'] += math.ceil(self.boss['max_hp'] * shield_rate)
+
+    def skill_transform(self):
+        """元素转换：40%的方块随机变成其他形状（颜色不变）"""
+        engine = self.engine
+        transform_count = int(engine.board.size * 0.4)
+        filled = np.flatnonzero(engine.board.ravel() != EMPTY)
+        selected = self.rng.choice(filled, min(transform_count, len(filled)), replace=False)
+
+        color_count = len(engine.colors)
+        shape_count = len(engine.shapes)
+        pieces = engine.board.ravel()[selected]
+        shapes = (pieces // color_count + self.rng.integers(1, shape_count, len(pieces))) % shape_count
+        engine.board.ravel()[selected] = shapes * color_count + pieces % color_count
+
+    def skill_countdown(self):
+        """倒计时攻击：放置一个3-5回合的炸弹"""
+        cells = self.sample_cells(self.bomb_cells, 1)
+        if cells:
+            self.bomb_cells[cells[0]] = int(self.rng.integers(3, 6))
+
+    def skill_normal_attack(self):
+        """普通攻击：造成Boss最大血量1%的伤害"""
+        self.player_hp = max(0, self.player_hp - math.ceil(self.boss['max_hp'] * 0.01))
+
+    # ========== 玩家行动 ==========
+
+    def player_attack_boss(self, score, green_count, red_count):
+        """玩家攻击Boss：绿色方块回血、红色方块封印技能，伤害先扣护盾。Boss被击败时返回True"""
+        if green_count > 0:
+            heal_amount = math.ceil(score * 0.2)
+            self.player_hp += min(heal_amount, self.player_max_hp - self.player_hp)
+
+        if red_count > 0:
+            self.boss_skill_sealed += red_count
+
+        damage = score
+        if self.boss['shield'] > 0:
+            if damage >= self.boss['shield']:
+                damage -= self.boss['shield']
+                self.boss['shield'] = 0
+            else:
+                self.boss['shield'] -= damage
+                damage = 0
+
+        if damage > 0:
+            self.boss['hp'] = max(0, self.boss['hp'] - damage)
+
+        return self.boss['hp'] <= 0
+
+    def process_moves_bonus(self):
+        """步数奖励：10%的概率获得1-3步"""
+        if self.rng.random() >= self.constants['ITEM_PROBABILITIES']['movesBonus']:
+            return
+
+        probabilities = self.constants['MOVES_BONUS_PROBABILITIES']
+        rand = self.rng.random()
+        if rand < probabilities['threeSteps']:
+            bonus_type = 'threeSteps'
+        elif rand < probabilities['threeSteps'] + probabilities['twoSteps']:
+            bonus_type = 'twoSteps'
+        else:
+            bonus_type = 'oneStep'
+        self.engine.moves += self.constants['MOVES_BONUS_VALUES'][bonus_type]
+
+class BossEngine(MatchEngine):
+    """Boss战模式的棋盘，消除结算对应 processMatches 中Boss模式的分支"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.boss_system = BossSystem(self)
+        self.outcome = None
+
+    def new_level(self, level):
+        """从指定关卡开始一局"""
+        self.score = 0
+        self.combo_count = 0
+        self.outcome = None
+        self.boss_system.init_boss(level)
+        self.create_board()
+
+    def playable_moves(self):
+        """可以执行的交换（冻结的方块不能移动）"""
+        moves = self.available_moves
+        frozen = self.boss_system.frozen_cells
+        if not frozen or not len(moves):
+            return moves
+        keep = [(row1, col1) not in frozen and (row2, col2) not in frozen for row1, col1, row2, col2 in moves.tolist()]
+        return moves[np.array(keep, dtype=bool)]
+
+    def is_game_over(self):
+        """分出胜负时结束"""
+        return self.outcome is not None
+
+    def play_move(self, row1, col1, row2, col2):
+        """交换并结算；步数用完且Boss未被击败时判负"""
+        result = super().play_move(row1, col1, row2, col2)
+        if result is not None and self.outcome is None and self.moves <= 0:
+            self.outcome = OUTCOME_OUT_OF_MOVES
+        return result
+
+    def clear_matches(self, matches):
+        """清除匹配：含冻结/小怪格子的匹配不消除，只减少这些格子的计数；毒素格子扣玩家血量
+
+        玩家血量归零时返回False。与 gameLogic.js 一样按匹配顺序处理，
+        重叠的匹配会让同一个冻结/小怪格子被多次计数。
+        """
+        boss = self.boss_system
+        skipped = set()
+
+        for index, match in enumerate(matches):
+            cells = match.cells
+            if not any(cell in boss.frozen_cells or cell in boss.monster_cells for cell in cells):
+                continue
+
+            skipped.add(index)
+            for cell in cells:
+                for counters in (boss.frozen_cells, boss.monster_cells):
+                    if cell in counters:
+                        counters[cell] -= 1
+                        if counters[cell] <= 0:
+                            del counters[cell]
+
+        cleared = []
+        for index, match in enumerate(matches):
+            if index in skipped:
+                continue
+            for cell in match.cells:
+                if cell in boss.poisoned_cells and self.board[cell] != EMPTY:
+                    boss.player_hp -= math.ceil(self.piece_values[self.board[cell]])
+                    boss.poisoned_cells.discard(cell)
+                    if boss.player_hp <= 0:
+                        boss.player_hp = 0
+                        return False
+                cleared.append(cell)
+
+        if cleared:
+            rows, cols = zip(*cleared)
+            self.board[list(rows), list(cols)] = EMPTY
+        return True
+
+    def tick_bombs(self):
+        """炸弹倒计时，归零时随机扣除1-3步"""
+        bombs = self.boss_system.bomb_cells
+        for cell in list(bombs):
+            bombs[cell] -= 1
+            if bombs[cell] <= 0:
+                self.moves = max(0, self.moves - int(self.rng.integers(1, 4)))
+                del bombs[cell]
+
+    def process_matches(self, matches=None):
+        """Boss模式的连锁结算：消除后处理炸弹，连锁结束后触发Boss技能、检查死局，最后攻击Boss"""
+        boss = self.boss_system
+        total_score = green_count = red_count = match_count = 0
+        refreshed = False
+
+        while True:
+            if matches is None:
+                matches = self.find_matches()
+
+            if not matches:
+                if match_count > 0:
+                    boss.trigger_boss_skill()
+                    if boss.player_hp <= 0:
+                        self.outcome = OUTCOME_PLAYER_DEAD
+                        break
+
+                self.available_moves = self.possible_moves()
+                refreshed = not len(self.available_moves)
+                if refreshed:
+                    self.refresh_board()
+                break
+
+            self.combo_count += 1
+            match_analysis = self.analyze_matches(matches)
+            score, green, red, count = self.calculate_score(matches, match_analysis, self.combo_count)
+            total_score += score
+            green_count += green
+            red_count += red
+            match_count += count
+            self.add_score(score)
+
+            if not self.clear_matches(matches):
+                self.outcome = OUTCOME_PLAYER_DEAD
+                break
+
+            self.tick_bombs()
+            self.drop_pieces()
+            self.fill_board()
+            matches = None
+
+        result = MoveResult(total_score, green_count, red_count, match_count, self.combo_count, refreshed)
+        if self.outcome is not None:
+            return result
+
+        if match_count > 0 and boss.player_attack_boss(total_score, green_count, red_count):
+            self.outcome = OUTCOME_WIN
+            return result
+
+        boss.process_moves_bonus()
+        return result
+
+class BatchBossEngine(BatchMatchEngine):
+    """同时模拟同一关卡的一批Boss战，规则与 BossEngine 相同
+
+    冻结、毒素、小怪、炸弹都是与棋盘形状相同的数组（冻结/小怪/炸弹存放剩余次数、血量、倒计时，0表示没有），
+    玩家和Boss的血量、护盾、封印次数等每局一个元素。连锁消除、技能触发、玩家攻击和步数奖励
+    都对整批对局一次完成；只有含冻结/小怪格子的匹配需要按 find_matches 的顺序逐个处理，
+    按“每块棋盘的第k个匹配”分轮批量计算。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.skills = list(self.constants['BOSS_SKILLS'].values())
+        self.skill_ids = [skill['id'] for skill in self.skills]
+        self.skill_cumulative = np.cumsum([skill['probability'] for skill in self.skills])
+        self.skill_rates = {int(level): rate for level, rate in self.constants['BOSS_SKILL_RATES'].items()}
+        self.new_level(1, 0)
+
+    def new_level(self, level, count):
+        """从指定关卡同时开始 count 局（与 init_boss 相同：50步、满血）"""
+        self.boss_level = level
+        self.skill_rate = boss_skill_rate(self.skill_rates, level)
+        self.boss_max_hp = level * 100
+        self.player_max_hp = math.ceil(self.boss_max_hp * self.constants['PLAYER_HP_RATIO'])
+
+        self.boss_hp = np.full(count, self.boss_max_hp, dtype=np.int64)
+        self.shields = np.zeros(count, dtype=np.int64)
+        self.player_hp = np.full(count, self.player_max_hp, dtype=np.int64)
+        self.sealed = np.zeros(count, dtype=np.int64)
+
+        cells = (count, self.board_size, self.board_size)
+        self.frozen = np.zeros(cells, dtype=np.int8)
+        self.poisoned = np.zeros(cells, dtype=bool)
+        self.monsters = np.zeros(cells, dtype=np.int8)
+        self.bombs = np.zeros(cells, dtype=np.int8)
+
+        # 统计数据
+        self.skill_counts = np.zeros((count, len(self.skills)), dtype=np.int64)
+        self.sealed_counts = np.zeros(count, dtype=np.int64)
+        self.outcomes = np.full(count, NO_OUTCOME, dtype=np.int8)
+
+        self.new_games(count, LEVEL_SELECT_MOVES)
+
+    def playable_moves(self, rows):
+        """rows 对应对局可以执行的交换（冻结的方块不能移动）"""
+        frozen = self.frozen[rows].reshape(len(rows), self.board_size ** 2) > 0
+        return self.available_moves[rows] & ~frozen[:, self.swap_from] & ~frozen[:, self.swap_to]
+
+    def active_rows(self):
+        """尚未分出胜负的对局"""
+        return np.flatnonzero(self.outcomes == NO_OUTCOME)
+
+    def is_game_over(self):
+        """所有对局都分出胜负时结束"""
+        return not len(self.active_rows())
+
+    def end_games(self, rows, outcome):
+        """记录对局结果"""
+        self.outcomes[rows] = OUTCOMES.index(outcome)
+
+    def play_moves(self, rows, swaps):
+        """交换并结算；步数用完且Boss未被击败时判负"""
+        result = super().play_moves(rows, swaps)
+        self.end_games(rows[(self.outcomes[rows] == NO_OUTCOME) & (self.moves[rows] <= 0)], OUTCOME_OUT_OF_MOVES)
+        return result
+
+    # ========== 技能 ==========
+
+    def sample_cells(self, excluded, counts):
+        """每块棋盘从 excluded 以外的格子里随机选择最多 counts 个，返回选中格子的掩码"""
+        keys = self.rng.random(excluded.shape)
+        keys[excluded] = 2
+        flat = keys.reshape(len(keys), self.board_size ** 2)
+        ranks = flat.argsort(axis=1).argsort(axis=1).reshape(excluded.shape)
+        return (ranks < counts[:, np.newaxis, np.newaxis]) & ~excluded
+
+    def trigger_boss_skills(self, rows):
+        """Boss触发技能：被封印的对局消耗一次封印，其余按触发率和技能概率选择技能"""
+        sealed = self.sealed[rows] > 0
+        self.sealed[rows[sealed]] -= 1
+        self.sealed_counts[rows[sealed]] += 1
+        rows = rows[~sealed]
+        rows = rows[self.rng.random(len(rows)) <= self.skill_rate]
+
+        # 先随机选择一个技能，再按概率重新选择（概率之和小于1时保留随机结果）
+        selected = self.rng.integers(len(self.skills), size=len(rows))
+        by_probability = np.searchsorted(self.skill_cumulative, self.rng.random(len(rows)), side='left')
+        selected = np.where(by_probability < len(self.skills), by_probability, selected)
+
+        for index, skill_id in enumerate(self.skill_ids):
+            chosen = rows[selected == index]
+            if len(chosen):
+                self.skill_counts[chosen, index] += 1
+                getattr(self, f"skill_{skill_id}")(chosen)
+
+    def skill_freeze(self, rows):
+        """冻结覆盖：冻结3-5个方块，需要消除3次"""
+        frozen = self.frozen[rows]
+        cells = self.sample_cells(frozen > 0, self.rng.integers(3, 6, len(rows)))
+        frozen[cells] = 3
+        self.frozen[rows] = frozen
+
+    def skill_poison(self, rows):
+        """毒素蔓延：1-10个方块带有毒素"""
+        poisoned = self.poisoned[rows]
+        self.poisoned[rows] = poisoned | self.sample_cells(poisoned, self.rng.integers(1, 11, len(rows)))
+
+    def skill_summon(self, rows):
+        """召唤小怪：3个小怪，每个2-4点血"""
+        monsters = self.monsters[rows]
+        cells = self.sample_cells(monsters > 0, np.full(len(rows), 3))
+        monsters[cells] = self.rng.integers(2, 5, int(cells.sum()))
+        self.monsters[rows] = monsters
+
+    def skill_shield(self, rows):
+        """护盾生成：Boss最大血量的10%-30%"""
+        shield_rate = 0.1 + self.rng.random(len(rows)) * 0.2
+        self.shields[rows] += np.ceil(self.boss_max_hp * shield_rate).astype(np.int64)
+
+    def skill_transform(self, rows):
+        """元素转换：40%的方块随机变成其他形状（颜色不变）"""
+        boards = self.boards[rows]
+        transform_count = int(self.board_size ** 2 * 0.4)
+        cells = self.sample_cells(boards == EMPTY, np.full(len(rows), transform_count))
+
+        color_count = len(self.colors)
+        shape_count = len(self.shapes)
+        pieces = boards[cells]
+        shapes = (pieces // color_count + self.rng.integers(1, shape_count, len(pieces))) % shape_count
+        boards[cells] = shapes * color_count + pieces % color_count
+        self.boards[rows] = boards
+
+    def skill_countdown(self, rows):
+        """倒计时攻击：放置一个3-5回合的炸弹"""
+        bombs = self.bombs[rows]
+        cells = self.sample_cells(bombs > 0, np.ones(len(rows), dtype=np.int64))
+        bombs[cells] = self.rng.integers(3, 6, int(cells.sum()))
+        self.bombs[rows] = bombs
+
+    def skill_normal_attack(self, rows):
+        """普通攻击：造成Boss最大血量1%的伤害"""
+        self.player_hp[rows] = np.maximum(0, self.player_hp[rows] - math.ceil(self.boss_max_hp * 0.01))
+
+    # ========== 玩家行动 ==========
+
+    def player_attack_boss(self, rows, score, green_count, red_count):
+        """玩家攻击Boss：绿色方块回血、红色方块封印技能，伤害先扣护盾。返回Boss是否被击败"""
+        heal_amount = np.ceil(score * 0.2).astype(np.int64)
+        missing = self.player_max_hp - self.player_hp[rows]
+        self.player_hp[rows] += np.where(green_count > 0, np.minimum(heal_amount, missing), 0)
+        self.sealed[rows] += red_count
+
+        absorbed = np.minimum(score, self.shields[rows])
+        self.shields[rows] -= absorbed
+        self.boss_hp[rows] = np.maximum(0, self.boss_hp[rows] - (score - absorbed))
+        return self.boss_hp[rows] <= 0
+
+    def process_moves_bonus(self, rows):
+        """步数奖励：10%的概率获得1-3步"""
+        rows = rows[self.rng.random(len(rows)) < self.constants['ITEM_PROBABILITIES']['movesBonus']]
+        probabilities = self.constants['MOVES_BONUS_PROBABILITIES']
+        values = self.constants['MOVES_BONUS_VALUES']
+        rand = self.rng.random(len(rows))
+        self.moves[rows] += np.where(
+            rand < probabilities['threeSteps'], values['threeSteps'],
+            np.where(rand < probabilities['threeSteps'] + probabilities['twoSteps'], values['twoSteps'], values['oneStep'])
+        )
+
+    # ========== 消除与结算 ==========
+
+    def clear_matches_batch(self, rows, boards, horizontal, vertical):
+        """对应 BossEngine.clear_matches，在 boards（rows 对应棋盘的副本）上清除匹配
+
+        返回每局玩家是否存活；被毒死的对局棋盘保持不变。
+        """
+        board, rank, masks = match_list(horizontal, vertical)
+        frozen, monsters = self.frozen[rows], self.monsters[rows]
+        skipped = np.zeros(len(board), dtype=bool)
+
+        # 按序号分轮处理：前面的匹配减少计数后，后面的匹配可能不再被阻挡
+        for number in range(int(rank.max()) + 1 if len(rank) else 0):
+            index = np.flatnonzero(rank == number)
+            owner, mask = board[index], masks[index]
+            blocked = (mask & ((frozen[owner] > 0) | (monsters[owner] > 0))).any(axis=(1, 2))
+            index, owner, mask = index[blocked], owner[blocked], mask[blocked]
+            skipped[index] = True
+            frozen[owner] -= (mask & (frozen[owner] > 0)).astype(np.int8)
+            monsters[owner] -= (mask & (monsters[owner] > 0)).astype(np.int8)
+        self.frozen[rows], self.monsters[rows] = frozen, monsters
+
+        cleared = np.zeros(boards.shape, dtype=bool)
+        np.logical_or.at(cleared, board[~skipped], masks[~skipped])
+
+        # 毒素格子按方块分值（向上取整）扣玩家血量，血量归零时整次清除作废
+        poisoned = self.poisoned[rows]
+        hit = cleared & poisoned
+        damage = (np.ceil(self.piece_values[boards]) * hit).sum(axis=(1, 2)).astype(np.int64)
+        player_hp = self.player_hp[rows] - damage
+        alive = player_hp > 0
+        self.player_hp[rows] = np.maximum(player_hp, 0)
+        self.poisoned[rows] = poisoned & ~hit
+
+        boards[cleared & alive[:, np.newaxis, np.newaxis]] = EMPTY
+        return alive
+
+    def tick_bombs(self, rows):
+        """炸弹倒计时，每个归零的炸弹随机扣除1-3步"""
+        bombs = self.bombs[rows]
+        ticking = bombs > 0
+        if not ticking.any():
+            return
+        bombs[ticking] -= 1
+        self.bombs[rows] = bombs
+
+        exploded = (ticking & (bombs == 0)).sum(axis=(1, 2))
+        if exploded.any():
+            penalty = np.zeros(len(rows), dtype=np.int64)
+            np.add.at(penalty, np.repeat(np.arange(len(rows)), exploded), self.rng.integers(1, 4, int(exploded.sum())))
+            self.moves[rows] = np.maximum(0, self.moves[rows] - penalty)
+
+    def process_batch(self, rows):
+        """Boss模式的连锁结算：消除后处理炸弹，连锁结束后触发Boss技能、检查死局，最后攻击Boss"""
+        totals = np.zeros((4, len(rows)), dtype=np.int64)
+        refreshed = np.zeros(len(rows), dtype=bool)
+        pending = np.arange(len(rows))
+        settled = []
+
+        while len(pending):
+            boards = self.boards[rows[pending]]
+            horizontal, vertical = triple_starts(boards)
+            matched = horizontal.any(axis=(1, 2)) | vertical.any(axis=(1, 2))
+            if not matched.all():
+                settled.append(pending[~matched])
+                pending, boards = pending[matched], boards[matched]
+                horizontal, vertical = horizontal[matched], vertical[matched]
+            if not len(pending):
+                break
+
+            board_rows = rows[pending]
+            self.combo_counts[board_rows] += 1
+            *counts, _ = self.score_matches(boards, horizontal, vertical, self.combo_counts[board_rows])
+            totals[:, pending] += counts
+            self.scores[board_rows] += counts[0]
+
+            alive = self.clear_matches_batch(board_rows, boards, horizontal, vertical)
+            self.end_games(board_rows[~alive], OUTCOME_PLAYER_DEAD)
+            pending, boards, board_rows = pending[alive], boards[alive], board_rows[alive]
+
+            self.tick_bombs(board_rows)
+            self.boards[board_rows] = self.drop_and_fill(boards)
+
+        # 连锁结束：每次交换都至少消除了一组，总会尝试触发技能
+        positions = np.concatenate(settled) if settled else pending
+        self.trigger_boss_skills(rows[positions])
+        dead = self.player_hp[rows[positions]] <= 0
+        self.end_games(rows[positions[dead]], OUTCOME_PLAYER_DEAD)
+        positions = positions[~dead]
+        board_rows = rows[positions]
+
+        self.available_moves[board_rows] = self.find_moves(self.boards[board_rows])
+        stuck = ~self.available_moves[board_rows].any(axis=1)
+        refreshed[positions[stuck]] = True
+        if stuck.any():
+            self.refresh_boards(board_rows[stuck])
+
+        won = self.player_attack_boss(board_rows, *totals[:3, positions])
+        self.end_games(board_rows[won], OUTCOME_WIN)
+        self.process_moves_bonus(board_rows[~won])
+
+        return MoveResult(*totals, self.combo_counts[rows], refreshed)
@@ -0,0 +1,87 @@
+"""
+从 src/js/constants.js 读取游戏常量
+模拟器与游戏共用同一份配置，修改概率或Boss参数后无需同步Python代码
+
+constants.js 中只有字面量常量，这里用一个只认识注释、字符串、标识符/数字和标点的小型词法分析器读取，
+不依赖构建脚本。
+"""
+
+import ast
+import json
+import os
+import re
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认常量文件
+CONSTANTS_FILE = os.path.join(ROOT_DIR, "src", "js", "constants.js")
+
+# 字面量常量的词法规则（按顺序尝试）
+LITERAL_TOKEN_RE = re.compile(r"""
+    (?P<skip>\s+|//[^\n]*|/\*[\s\S]*?(?:\*/|$))
+  | (?P<string>'(?:[^'\\\n]|\\[\s\S])*'|"(?:[^"\\\n]|\\[\s\S])*")
+  | (?P<word>[\w$\u0080-\uffff]+)
+  | (?P<punct>[\s\S])
+""", re.VERBOSE)
+
+def tokenize_literals(js_code):
+    """把JS源码切分为 (类型, 文本) 列表，丢弃空白和注释"""
+    return [(match.lastgroup, match.group()) for match in LITERAL_TOKEN_RE.finditer(js_code)
+            if match.lastgroup != 'skip']
+
+def js_literal_to_json(tokens):
+    """把对象/数组/数字/字符串字面量的词法单元转换为JSON文本
+
+    对象的键（标识符、数字或字符串）统一加引号，单引号字符串转为JSON字符串，
+    去掉 } 和 ] 之前多余的逗号。遇到其他表达式时抛出 ValueError。
+    """
+    parts = []
+    for index, (kind, text) in enumerate(tokens):
+        next_text = tokens[index + 1][1] if index + 1 < len(tokens) else ''
+        if kind == 'string':
+            value = ast.literal_eval(text)
+            parts.append(json.dumps(value if next_text != ':' else str(value), ensure_ascii=False))
+        elif kind == 'word':
+            if next_text == ':':
+                parts.append(json.dumps(text))
+            elif text in ('true', 'false', 'null') or text[0].isdigit():
+                parts.append(text)
+            else:
+                raise ValueError(f"不支持的表达式: {text}")
+        elif kind == 'punct':
+            if text == ',' and next_text in ('}', ']'):
+                continue
+            parts.append(text)
+        else:
+            raise ValueError(f"不支持的字面量: {text}")
+    return json.loads(''.join(parts))
+
+def load_constants(file_path=CONSTANTS_FILE):
+    """读取 constants.js 中所有 const 声明的字面量常量，返回 {名称: 值}"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tokens = tokenize_literals(f.read())
+
+    constants = {}
+    index = 0
+    while index < len(tokens):
+        if tokens[index][1] != 'const' or index + 2 >= len(tokens) or tokens[index + 2][1] != '=':
+            index += 1
+            continue
+
+        name = tokens[index + 1][1]
+        end = index + 3
+        depth = 0
+        while end < len(tokens) and not (depth == 0 and tokens[end][1] == ';'):
+            if tokens[end][1] in '{[(':
+                depth += 1
+            elif tokens[end][1] in '}])':
+                depth -= 1
+            end += 1
+
+        try:
+            constants[name] = js_literal_to_json(tokens[index + 3:end])
+        except ValueError:
+            pass  # 不是纯字面量的常量（模拟器用不到）
+        index = end + 1
+
+    return constants
@@ -0,0 +1,642 @@
+"""
+消消乐棋盘规则的无界面实现（NumPy）
+与 src/js/gameLogic.js 中 GameLogic 的规则保持一致：生成棋盘、查找匹配、
+分析L/T型、计分、下落填充和死局检测，去掉了动画、日志和界面更新，用于批量模拟
+
+棋盘是 int8 的二维数组，每个格子存放方块编码 形状序号 × 颜色数 + 颜色序号
+（与 calculateProbabilities 中 "形状-颜色" 的顺序一致），空格子为 EMPTY。
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from .constants import load_constants
+
+# 空格子
+EMPTY = -1
+
+# 经过某个格子的所有三连（另外两个格子相对该格子的偏移）
+TRIPLE_OFFSETS = [
+    ((0, -2), (0, -1)), ((0, -1), (0, 1)), ((0, 1), (0, 2)),
+    ((-2, 0), (-1, 0)), ((-1, 0), (1, 0)), ((1, 0), (2, 0))
+]
+
+class Match(namedtuple('Match', ['type', 'row', 'col', 'length'])):
+    """一次匹配：方向（'horizontal' / 'vertical'）、起点和长度"""
+    __slots__ = ()
+
+    @property
+    def cells(self):
+        """匹配包含的格子 [(行, 列)]，顺序与 gameLogic.js 相同"""
+        if self.type == 'horizontal':
+            return [(self.row, self.col + offset) for offset in range(self.length)]
+        return [(self.row + offset, self.col) for offset in range(self.length)]
+
+# 一次有效交换的结算结果（processMatches 中累计的数据）
+MoveResult = namedtuple('MoveResult', ['score', 'green_count', 'red_count', 'match_count', 'combo_count', 'refreshed'])
+
+def triple_starts(boards):
+    """返回 (横向, 纵向) 两个布尔数组，标记每个位置是否是连续三个相同方块的起点
+
+    boards 的最后两维是棋盘，前面可以有任意批量维度。
+    """
+    boards = np.asarray(boards)
+    filled = boards != EMPTY
+
+    left, middle, right = boards[..., :, :-2], boards[..., :, 1:-1], boards[..., :, 2:]
+    horizontal = (left == middle) & (middle == right) & filled[..., :, :-2]
+
+    top, center, bottom = boards[..., :-2, :], boards[..., 1:-1, :], boards[..., 2:, :]
+    vertical = (top == center) & (center == bottom) & filled[..., :-2, :]
+
+    return horizontal, vertical
+
+def has_match(boards):
+    """判断棋盘上是否有匹配；传入一批棋盘时逐个返回"""
+    horizontal, vertical = triple_starts(boards)
+    return horizontal.any(axis=(-2, -1)) | vertical.any(axis=(-2, -1))
+
+def runs_from_starts(starts, match_type):
+    """由三连起点计算每个起点的匹配长度
+
+    gameLogic.js 对每个起点都会记录一次匹配，因此长度为5的连线会产生长度5、4、3三个匹配。
+    """
+    rows, cols = np.nonzero(starts if match_type == 'horizontal' else starts.T)
+    matches = []
+    length = 0
+    for index in range(len(rows) - 1, -1, -1):
+        # 同一行（纵向时为同一列）中紧接着的起点，长度比后一个多1
+        follows = (index + 1 < len(rows) and rows[index + 1] == rows[index] and
+                   cols[index + 1] == cols[index] + 1)
+        length = length + 1 if follows else 3
+        if match_type == 'horizontal':
+            matches.append(Match(match_type, int(rows[index]), int(cols[index]), length))
+        else:
+            matches.append(Match(match_type, int(cols[index]), int(rows[index]), length))
+    matches.reverse()
+    return matches
+
+class MatchEngine:
+    """无界面的消消乐棋盘，规则对应 GameLogic"""
+
+    def __init__(self, constants=None, seed=None, shape_probabilities=None, color_probabilities=None):
+        self.constants = constants or load_constants()
+        self.board_size = self.constants['BOARD_SIZE']
+        self.shapes = self.constants['SHAPES']
+        self.colors = self.constants['COLORS']
+        self.rng = np.random.default_rng(seed)
+
+        # 方块编码 → 形状分数、颜色倍数、T型晋级后的单格分值
+        pieces = [(shape, color) for shape in self.shapes for color in self.colors]
+        shape_scores = self.constants['SHAPE_SCORES']
+        color_multipliers = self.constants['COLOR_MULTIPLIERS']
+        self.piece_names = [f"{shape}-{color}" for shape, color in pieces]
+        self.shape_scores = np.array([shape_scores[shape] for shape, _ in pieces], dtype=np.float64)
+        self.piece_values = np.array([shape_scores[shape] * color_multipliers[color] for shape, color in pieces])
+        self.promoted_values = np.array([
+            shape_scores[self.get_next_shape(shape)] * color_multipliers[self.get_next_color(color)]
+            for shape, color in pieces
+        ])
+        self.is_green = np.array([color == 'green' for _, color in pieces])
+        self.is_red = np.array([color == 'red' for _, color in pieces])
+        self.default_piece = self.piece_names.index('triangle-green')
+
+        self.probabilities = self.calculate_probabilities(shape_probabilities, color_probabilities)
+        self.cumulative = np.cumsum(list(self.probabilities.values()))
+
+        # 所有可能的交换（先向右、再向下，顺序与 hasPossibleMoves 相同），以展开后的下标表示
+        swaps = []
+        for row in range(self.board_size):
+            for col in range(self.board_size):
+                if col < self.board_size - 1:
+                    swaps.append((row, col, row, col + 1))
+                if row < self.board_size - 1:
+                    swaps.append((row, col, row + 1, col))
+        self.swaps = np.array(swaps, dtype=np.intp)
+        self.swap_from = self.swaps[:, 0] * self.board_size + self.swaps[:, 1]
+        self.swap_to = self.swaps[:, 2] * self.board_size + self.swaps[:, 3]
+        self.build_swap_lines()
+
+        self.board = np.full((self.board_size, self.board_size), EMPTY, dtype=np.int8)
+        self.padded = np.full((self.board_size + 4, self.board_size + 4), EMPTY, dtype=np.int8)
+        # 生成棋盘或结算完成后棋盘上可用的交换，供策略直接使用（直接修改棋盘后需要重新调用 possible_moves）
+        self.available_moves = self.swaps[:0]
+        self.score = 0
+        self.moves = 0
+        self.combo_count = 0
+
+    # ========== 概率与随机方块 ==========
+
+    def calculate_probabilities(self, shape_probabilities=None, color_probabilities=None):
+        """计算各个组合的出现概率（可以覆盖 constants.js 中的配置用于调参）"""
+        shape_probabilities = shape_probabilities or self.constants['SHAPE_PROBABILITIES']
+        color_probabilities = color_probabilities or self.constants['COLOR_PROBABILITIES']
+        probs = {}
+        for shape in self.shapes:
+            for color in self.colors:
+                probs[f"{shape}-{color}"] = shape_probabilities.get(shape, 0) * color_probabilities.get(color, 0)
+        return probs
+
+    def random_pieces(self, count):
+        """按概率生成 count 个随机方块，累积概率都小于随机数时返回绿色三角形"""
+        pieces = np.searchsorted(self.cumulative, self.rng.random(count), side='left')
+        pieces[pieces >= len(self.cumulative)] = self.default_piece
+        return pieces.astype(np.int8)
+
+    def get_random_piece(self):
+        """根据概率生成一个随机方块"""
+        return int(self.random_pieces(1)[0])
+
+    # ========== 棋盘生成 ==========
+
+    def randomize_board(self):
+        """用随机方块重新填满整个棋盘"""
+        self.board[:] = self.random_pieces(self.board.size).reshape(self.board.shape)
+
+    def create_board(self):
+        """创建棋盘：没有现成匹配，并且至少有一种可消除的交换（最多重试100次）"""
+        self.randomize_board()
+        while self.has_match():
+            self.randomize_board()
+
+        attempts = 0
+        moves = self.possible_moves()
+        while not len(moves) and attempts < 100:
+            self.randomize_board()
+            while self.has_match():
+                self.randomize_board()
+            moves = self.possible_moves()
+            attempts += 1
+
+        self.available_moves = moves
+
+    def refresh_board(self):
+        """刷新棋盘（死局时调用），规则与创建棋盘相同"""
+        self.create_board()
+
+    def new_game(self, moves=None):
+        """开始一局新游戏"""
+        self.score = 0
+        self.moves = self.constants['CLASSIC_MOVES'] if moves is None else moves
+        self.combo_count = 0
+        self.create_board()
+
+    # ========== 匹配 ==========
+
+    def has_match(self):
+        """判断当前棋盘上是否有匹配"""
+        return bool(has_match(self.board))
+
+    def find_matches(self):
+        """查找匹配：先按行查找横向匹配，再按列查找纵向匹配，结果顺序与 findMatches 相同"""
+        horizontal, vertical = triple_starts(self.board)
+        if not horizontal.any() and not vertical.any():
+            return []
+        return runs_from_starts(horizontal, 'horizontal') + runs_from_starts(vertical, 'vertical')
+
+    def match_mask(self, matches):
+        """所有匹配覆盖的格子"""
+        mask = np.zeros(self.board.shape, dtype=bool)
+        for match in matches:
+            if match.type == 'horizontal':
+                mask[match.row, match.col:match.col + match.length] = True
+            else:
+                mask[match.row:match.row + match.length, match.col] = True
+        return mask
+
+    def build_swap_lines(self):
+        """预先计算每种交换后需要检查的三连
+
+        棋盘四周各填充两格空格子后展开为一维。交换后每个方块只可能和它新位置上的三连形成匹配，
+        对每种交换的两个方块各记录6种三连中另外两个格子的下标；包含对方原位置的三连
+        （交换后那里放着另一个方块）改为指向填充格，永远不会匹配。
+        """
+        padded_size = self.board_size + 4
+        first, second = [], []
+        for row1, col1, row2, col2 in self.swaps:
+            for (row, col), (other_row, other_col) in (((row2, col2), (row1, col1)), ((row1, col1), (row2, col2))):
+                # 方块从 (other_row, other_col) 移动到 (row, col)
+                for (dr1, dc1), (dr2, dc2) in TRIPLE_OFFSETS:
+                    cells = [(row + dr1, col + dc1), (row + dr2, col + dc2)]
+                    if (other_row, other_col) in cells:
+                        cells = [(-2, -2), (-2, -2)]
+                    first.append((cells[0][0] + 2) * padded_size + cells[0][1] + 2)
+                    second.append((cells[1][0] + 2) * padded_size + cells[1][1] + 2)
+
+        shape = (len(self.swaps), 2, len(TRIPLE_OFFSETS))
+        self.line_first = np.array(first, dtype=np.intp).reshape(shape)
+        self.line_second = np.array(second, dtype=np.intp).reshape(shape)
+        # 两个移动方块交换前的位置，顺序与上面一致：先是移到 swap_to 的方块，再是移到 swap_from 的方块
+        self.line_pieces = np.stack([self.swap_from, self.swap_to], axis=1)
+
+    def possible_moves(self):
+        """返回所有能产生匹配的交换 (行1, 列1, 行2, 列2)
+
+        没有现成匹配时（生成棋盘和连锁结算后总是如此），只检查交换后两个方块所在的三连；
+        否则退回到生成每种交换后的棋盘并整批检查，结果都与 hasPossibleMoves 逐个尝试一致。
+        """
+        if self.has_match():
+            return self.swaps[self.swapped_boards_have_match()]
+
+        self.padded[2:-2, 2:-2] = self.board
+        padded = self.padded.ravel()
+        pieces = self.board.ravel()[self.line_pieces][..., np.newaxis]
+        lines = (padded[self.line_first] == pieces) & (padded[self.line_second] == pieces) & (pieces != EMPTY)
+        return self.swaps[lines.any(axis=(1, 2))]
+
+    def swapped_boards(self, swaps=None):
+        """生成每种交换后的棋盘，返回形状为 (交换数, 行, 列) 的数组"""
+        swaps = self.swaps if swaps is None else swaps
+        swap_from = swaps[:, 0] * self.board_size + swaps[:, 1]
+        swap_to = swaps[:, 2] * self.board_size + swaps[:, 3]
+
+        flat = self.board.ravel()
+        index = np.arange(len(swaps))
+        boards = np.repeat(flat[np.newaxis, :], len(swaps), axis=0)
+        boards[index, swap_from] = flat[swap_to]
+        boards[index, swap_to] = flat[swap_from]
+        return boards.reshape(-1, self.board_size, self.board_size)
+
+    def swapped_boards_have_match(self):
+        """生成每种交换后的棋盘，整批检查是否有匹配"""
+        return has_match(self.swapped_boards())
+
+    def has_possible_moves(self):
+        """检查是否有可以消除的移动"""
+        return len(self.possible_moves()) > 0
+
+    # ========== 匹配分析 ==========
+
+    def analyze_matches(self, matches):
+        """分析匹配类型：'five'（五连）、'special'（T型）、'L'、'normal'"""
+        if not matches:
+            return {'type': 'normal', 'total_cells': 0}
+
+        total_cells = int(self.match_mask(matches).sum())
+
+        if any(match.length >= 5 for match in matches):
+            return {'type': 'five', 'total_cells': total_cells}
+
+        if self.check_intersection(matches):
+            if self.detect_t_or_l_shape(matches) == 'T':
+                return {'type': 'special', 'total_cells': total_cells}
+            return {'type': 'L', 'total_cells': total_cells}
+
+        return {'type': 'normal', 'total_cells': total_cells}
+
+    @staticmethod
+    def intersection(horizontal, vertical):
+        """横向和纵向匹配的交叉点，不相交时返回None"""
+        if (horizontal.col <= vertical.col < horizontal.col + horizontal.length and
+                vertical.row <= horizontal.row < vertical.row + vertical.length):
+            return horizontal.row, vertical.col
+        return None
+
+    def check_intersection(self, matches):
+        """检查横向和纵向匹配是否有交叉点"""
+        if len(matches) < 2:
+            return False
+
+        horizontal = [match for match in matches if match.type == 'horizontal']
+        vertical = [match for match in matches if match.type == 'vertical']
+        return any(self.intersection(h, v) for h in horizontal for v in vertical)
+
+    def detect_t_or_l_shape(self, matches):
+        """检测是T型还是L型：交叉点位于长度≥4的线中间1/3范围内时为T型"""
+        horizontal = [match for match in matches if match.type == 'horizontal']
+        vertical = [match for match in matches if match.type == 'vertical']
+
+        # 有多个横向或纵向匹配（包括长连线重叠产生的匹配）时视为T型
+        if len(horizontal) >= 2 or len(vertical) >= 2:
+            return 'T'
+
+        if len(horizontal) == 1 and len(vertical) == 1:
+            h_match, v_match = horizontal[0], vertical[0]
+            point = self.intersection(h_match, v_match)
+            if point:
+                for line, index in ((h_match, point[1] - h_match.col), (v_match, point[0] - v_match.row)):
+                    if line.length >= 4 and abs(index - line.length // 2) <= line.length // 3:
+                        return 'T'
+
+        return 'L'
+
+    # ========== 计分 ==========
+
+    def get_next_shape(self, shape):
+        """获取下一个形状（星星已经是最高的）"""
+        progression = self.constants['SHAPE_PROGRESSION']
+        index = progression.index(shape)
+        return progression[index + 1] if index < len(progression) - 1 else shape
+
+    def get_next_color(self, color):
+        """获取下一个颜色（红色已经是最高的）"""
+        progression = self.constants['COLOR_PROGRESSION']
+        index = progression.index(color)
+        return progression[index + 1] if index < len(progression) - 1 else color
+
+    def calculate_score(self, matches, match_analysis, combo_count):
+        """计算分数，返回 (分数, 绿色方块形状分之和, 红色方块数, 消除方块数)"""
+        combo_multiplier = min(combo_count, 5) if combo_count >= 2 else 1
+
+        pieces = self.board[self.match_mask(matches)]
+        pieces = pieces[pieces != EMPTY]
+        counts = np.bincount(pieces, minlength=len(self.piece_names))
+
+        green_count = int(counts[self.is_green] @ self.shape_scores[self.is_green])
+        red_count = int(counts[self.is_red].sum())
+        match_count = int(pieces.size)
+
+        if match_analysis['type'] == 'five':
+            total_score = float(counts @ self.piece_values) * 2
+        elif match_analysis['type'] == 'special':
+            # T型晋级：所有方块都按第一个匹配起点方块晋级后的形状和颜色计分
+            first = matches[0]
+            total_score = match_count * float(self.promoted_values[self.board[first.row, first.col]])
+        else:
+            total_score = float(counts @ self.piece_values)
+
+        return math.floor(total_score * combo_multiplier), green_count, red_count, match_count
+
+    def add_score(self, points):
+        """增加分数"""
+        self.score += points
+
+    # ========== 消除、下落与填充 ==========
+
+    def clear_matches(self, matches):
+        """清除匹配的格子"""
+        self.board[self.match_mask(matches)] = EMPTY
+
+    def drop_pieces(self):
+        """方块下落：每列的空格子移到顶部，其余方块保持原有顺序"""
+        order = np.argsort(self.board != EMPTY, axis=0, kind='stable')
+        self.board = np.take_along_axis(self.board, order, axis=0)
+
+    def fill_board(self):
+        """用随机方块填充空格子"""
+        empty = self.board == EMPTY
+        count = int(empty.sum())
+        if count:
+            self.board[empty] = self.random_pieces(count)
+
+    # ========== 交换与结算 ==========
+
+    def swap(self, row1, col1, row2, col2):
+        """交换两个方块"""
+        board = self.board
+        board[row1, col1], board[row2, col2] = board[row2, col2], board[row1, col1]
+
+    def play_move(self, row1, col1, row2, col2):
+        """交换两个相邻方块并结算所有连锁消除
+
+        没有形成匹配时换回原位并返回None（不消耗步数），否则返回 MoveResult。
+        """
+        self.swap(row1, col1, row2, col2)
+        matches = self.find_matches()
+        if not matches:
+            self.swap(row1, col1, row2, col2)
+            return None
+
+        self.moves -= 1
+        self.combo_count = 0
+        return self.process_matches(matches)
+
+    def process_matches(self, matches=None):
+        """循环消除、下落、填充直到没有新的匹配，死局时自动刷新棋盘
+
+        matches 是当前棋盘上已经找到的匹配（省去一次查找）。
+        """
+        total_score = green_count = red_count = match_count = 0
+
+        while True:
+            if matches is None:
+                matches = self.find_matches()
+            if not matches:
+                break
+
+            self.combo_count += 1
+            match_analysis = self.analyze_matches(matches)
+            score, green, red, count = self.calculate_score(matches, match_analysis, self.combo_count)
+            total_score += score
+            green_count += green
+            red_count += red
+            match_count += count
+            self.add_score(score)
+
+            self.clear_matches(matches)
+            self.drop_pieces()
+            self.fill_board()
+            matches = None
+
+        self.available_moves = self.possible_moves()
+        refreshed = not len(self.available_moves)
+        if refreshed:
+            self.refresh_board()
+
+        return MoveResult(total_score, green_count, red_count, match_count, self.combo_count, refreshed)
+
+    def is_game_over(self):
+        """步数用完时游戏结束"""
+        return self.moves <= 0
+
+def covered_cells(horizontal, vertical):
+    """由三连起点计算横向、纵向匹配覆盖的格子，返回 (横向覆盖, 纵向覆盖)"""
+    shape = horizontal.shape[:-1] + (horizontal.shape[-1] + 2,)
+    covered_horizontal = np.zeros(shape, dtype=bool)
+    covered_vertical = np.zeros(shape, dtype=bool)
+    for offset in range(3):
+        covered_horizontal[..., :, offset:offset + horizontal.shape[-1]] |= horizontal
+        covered_vertical[..., offset:offset + vertical.shape[-2], :] |= vertical
+    return covered_horizontal, covered_vertical
+
+class BatchMatchEngine(MatchEngine):
+    """同时推进一批棋盘的 MatchEngine
+
+    boards 是形状为 (局数, 行, 列) 的数组，选择交换、查找匹配、计分、下落和填充
+    每一步都对整批棋盘一次完成，只在连锁消除时按仍有匹配的棋盘缩小批量。
+    规则与 MatchEngine 逐个结算相同，只是随机数的使用顺序不同。
+
+    available_moves 是 (局数, 交换数) 的布尔数组，对应 swaps 中的每种交换；
+    分数、剩余步数和连击数都是每局一个元素的数组。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.piece_codes = np.arange(len(self.piece_names), dtype=np.int8)
+        self.boards = np.full((0, self.board_size, self.board_size), EMPTY, dtype=np.int8)
+        self.available_moves = np.zeros((0, len(self.swaps)), dtype=bool)
+        self.scores = np.zeros(0, dtype=np.int64)
+        self.moves = np.zeros(0, dtype=np.int64)
+        self.combo_counts = np.zeros(0, dtype=np.int64)
+
+    # ========== 棋盘生成 ==========
+
+    def random_boards(self, count):
+        """生成 count 块填满随机方块的棋盘"""
+        return self.random_pieces(count * self.board_size ** 2).reshape(count, self.board_size, self.board_size)
+
+    def create_boards(self, count):
+        """按 create_board 的规则生成 count 块棋盘，返回 (棋盘, 可消除的交换)"""
+        boards = self.random_boards(count)
+        attempts = np.zeros(count, dtype=np.int64)
+        while True:
+            matched = has_match(boards)
+            if matched.any():
+                boards[matched] = self.random_boards(int(matched.sum()))
+                continue
+
+            moves = self.find_moves(boards)
+            stuck = ~moves.any(axis=1) & (attempts < 100)
+            if not stuck.any():
+                return boards, moves
+            attempts[stuck] += 1
+            boards[stuck] = self.random_boards(int(stuck.sum()))
+
+    def refresh_boards(self, rows):
+        """刷新指定的棋盘（死局时调用）"""
+        self.boards[rows], self.available_moves[rows] = self.create_boards(len(rows))
+
+    def new_games(self, count, moves=None):
+        """同时开始 count 局新游戏"""
+        self.boards, self.available_moves = self.create_boards(count)
+        self.scores = np.zeros(count, dtype=np.int64)
+        self.moves = np.full(count, self.constants['CLASSIC_MOVES'] if moves is None else moves, dtype=np.int64)
+        self.combo_counts = np.zeros(count, dtype=np.int64)
+
+    # ========== 可消除的交换 ==========
+
+    def swapped_candidates(self, boards, board_index, swap_index):
+        """生成 boards[board_index] 执行 swaps[swap_index] 后的棋盘，返回 (候选数, 行, 列)"""
+        flat = boards.reshape(len(boards), self.board_size ** 2)[board_index]
+        index = np.arange(len(flat))
+        swap_from, swap_to = self.swap_from[swap_index], self.swap_to[swap_index]
+        flat[index, swap_from], flat[index, swap_to] = flat[index, swap_to], flat[index, swap_from]
+        return flat.reshape(-1, self.board_size, self.board_size)
+
+    def find_moves(self, boards):
+        """返回每块棋盘上每种交换能否产生匹配，形状为 (棋盘数, 交换数)
+
+        与 possible_moves 相同：没有现成匹配的棋盘只检查交换后两个方块所在的三连，
+        已有匹配的棋盘（Boss技能改变棋盘后可能出现）生成每种交换后的棋盘逐个检查。
+        """
+        count = len(boards)
+        padded = np.full((count, self.board_size + 4, self.board_size + 4), EMPTY, dtype=np.int8)
+        padded[:, 2:-2, 2:-2] = boards
+        padded = padded.reshape(count, (self.board_size + 4) ** 2)
+        pieces = boards.reshape(count, self.board_size ** 2)[:, self.line_pieces][..., np.newaxis]
+        lines = (padded[:, self.line_first] == pieces) & (padded[:, self.line_second] == pieces) & (pieces != EMPTY)
+        moves = lines.any(axis=(2, 3))
+
+        matched = np.flatnonzero(has_match(boards))
+        if len(matched):
+            board_index = np.repeat(matched, len(self.swaps))
+            swap_index = np.tile(np.arange(len(self.swaps)), len(matched))
+            swapped = self.swapped_candidates(boards, board_index, swap_index)
+            moves[matched] = has_match(swapped).reshape(len(matched), len(self.swaps))
+        return moves
+
+    # ========== 计分 ==========
+
+    def score_matches(self, boards, horizontal, vertical, combo_counts):
+        """对每块棋盘上的全部匹配做 analyze_matches 和 calculate_score
+
+        返回 (分数, 绿色方块形状分之和, 红色方块数, 消除方块数, 匹配覆盖的格子)，前四项每块棋盘一个元素。
+        """
+        covered_horizontal, covered_vertical = covered_cells(horizontal, vertical)
+        mask = covered_horizontal | covered_vertical
+        counts = ((boards[..., np.newaxis] == self.piece_codes) & mask[..., np.newaxis]).sum(axis=(1, 2))
+
+        # 五连：连续三个起点；T型：横纵匹配相交，且横向或纵向有两个以上的匹配
+        # （只有一横一纵时两条线长度都是3，detect_t_or_l_shape 总是判为L型，计分与普通匹配相同）
+        five = ((horizontal[..., :, :-2] & horizontal[..., :, 1:-1] & horizontal[..., :, 2:]).any(axis=(1, 2)) |
+                (vertical[..., :-2, :] & vertical[..., 1:-1, :] & vertical[..., 2:, :]).any(axis=(1, 2)))
+        crossed = (covered_horizontal & covered_vertical).any(axis=(1, 2))
+        several = (horizontal.sum(axis=(1, 2)) >= 2) | (vertical.sum(axis=(1, 2)) >= 2)
+        special = ~five & crossed & several
+
+        match_count = counts.sum(axis=1)
+        base_score = counts @ self.piece_values
+        # T型按第一个匹配（按行优先的第一个横向起点）的方块晋级后计分
+        first = horizontal.reshape(len(boards), -1).argmax(axis=1)
+        width = horizontal.shape[-1]
+        first_piece = boards[np.arange(len(boards)), first // width, first % width]
+        total_score = np.where(five, base_score * 2,
+                               np.where(special, match_count * self.promoted_values[first_piece], base_score))
+
+        combo_multiplier = np.where(combo_counts >= 2, np.minimum(combo_counts, 5), 1)
+        score = np.floor(total_score * combo_multiplier).astype(np.int64)
+        green_count = (counts[:, self.is_green] @ self.shape_scores[self.is_green]).astype(np.int64)
+        red_count = counts[:, self.is_red].sum(axis=1)
+        return score, green_count, red_count, match_count, mask
+
+    # ========== 下落与填充 ==========
+
+    def drop_and_fill(self, boards):
+        """整批执行 drop_pieces 和 fill_board，返回新的棋盘"""
+        order = np.argsort(boards != EMPTY, axis=1, kind='stable')
+        boards = np.take_along_axis(boards, order, axis=1)
+        empty = boards == EMPTY
+        count = int(empty.sum())
+        if count:
+            boards[empty] = self.random_pieces(count)
+        return boards
+
+    # ========== 交换与结算 ==========
+
+    def swap_boards(self, rows, swaps):
+        """在 rows 对应的棋盘上执行 swaps 中下标为 swaps 的交换"""
+        flat = self.boards.reshape(len(self.boards), self.board_size ** 2)
+        swap_from, swap_to = self.swap_from[swaps], self.swap_to[swaps]
+        flat[rows, swap_from], flat[rows, swap_to] = flat[rows, swap_to], flat[rows, swap_from]
+
+    def play_moves(self, rows, swaps):
+        """rows 对应的每局各执行一次交换并结算所有连锁消除
+
+        swaps 是 swaps 数组中的下标，必须取自 available_moves（每局都会形成匹配）。
+        返回每个元素都是数组（与 rows 一一对应）的 MoveResult。
+        """
+        self.swap_boards(rows, swaps)
+        self.moves[rows] -= 1
+        self.combo_counts[rows] = 0
+        return self.process_batch(rows)
+
+    def process_batch(self, rows):
+        """循环消除、下落、填充直到所有棋盘都没有新的匹配，死局的棋盘自动刷新"""
+        totals = np.zeros((4, len(rows)), dtype=np.int64)
+        pending = np.arange(len(rows))
+
+        while len(pending):
+            boards = self.boards[rows[pending]]
+            horizontal, vertical = triple_starts(boards)
+            matched = horizontal.any(axis=(1, 2)) | vertical.any(axis=(1, 2))
+            if not matched.all():
+                pending, boards = pending[matched], boards[matched]
+                horizontal, vertical = horizontal[matched], vertical[matched]
+            if not len(pending):
+                break
+
+            board_rows = rows[pending]
+            self.combo_counts[board_rows] += 1
+            *counts, mask = self.score_matches(boards, horizontal, vertical, self.combo_counts[board_rows])
+            totals[:, pending] += counts
+            self.scores[board_rows] += counts[0]
+
+            boards[mask] = EMPTY
+            self.boards[board_rows] = self.drop_and_fill(boards)
+
+        self.available_moves[rows] = self.find_moves(self.boards[rows])
+        refreshed = ~self.available_moves[rows].any(axis=1)
+        if refreshed.any():
+            self.refresh_boards(rows[refreshed])
+
+        return MoveResult(*totals, self.combo_counts[rows], refreshed)
+
+    def playable_rows(self):
+        """还有步数并且有可消除交换的对局"""
+        return np.flatnonzero((self.moves > 0) & self.available_moves.any(axis=1))
+
+    def is_game_over(self):
+        """所有对局的步数都用完（或者无法移动）时结束"""
+        return not len(self.playable_rows())
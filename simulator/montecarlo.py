@@ -0,0 +1,124 @@
+"""
+Boss战蒙特卡洛模拟
+把每个关卡的对局拆成批次分给进程池并行模拟，汇总每关的胜率、平均步数和技能触发频率
+
+每个批次的对局由 BatchBossEngine 同时推进（每一步整批选择交换、结算连锁消除），
+并使用由 --seed 派生的独立随机种子，结果与进程数无关、可以复现。
+"""
+
+import concurrent.futures
+import csv
+import os
+
+import numpy as np
+
+from .boss import (BatchBossEngine, OUTCOMES, OUTCOME_WIN, OUTCOME_OUT_OF_MOVES, OUTCOME_PLAYER_DEAD, OUTCOME_STUCK,
+                   boss_skill_rate)
+from .policies import BATCH_POLICIES
+
+# 每个批次同时模拟的局数
+CHUNK_GAMES = 1000
+
+def simulate_level_chunk(constants, level, games, policy_name, seed):
+    """同时模拟一个关卡的一批对局，返回可以直接累加的计数"""
+    engine = BatchBossEngine(constants, seed=seed)
+    policy = BATCH_POLICIES[policy_name]
+    engine.new_level(level, games)
+    moves_played = np.zeros(games, dtype=np.int64)
+    refreshes = 0
+
+    while True:
+        rows = engine.active_rows()
+        if not len(rows):
+            break
+        moves = engine.playable_moves(rows)
+        stuck = ~moves.any(axis=1)
+        if stuck.any():
+            engine.end_games(rows[stuck], OUTCOME_STUCK)
+            rows, moves = rows[~stuck], moves[~stuck]
+            if not len(rows):
+                continue
+        result = engine.play_moves(rows, policy(engine, rows, moves))
+        moves_played[rows] += 1
+        refreshes += int(result.refreshed.sum())
+
+    outcomes = np.bincount(engine.outcomes, minlength=len(OUTCOMES))
+    won = engine.outcomes == OUTCOMES.index(OUTCOME_WIN)
+    return {
+        'level': level,
+        'games': games,
+        'outcomes': {outcome: int(count) for outcome, count in zip(OUTCOMES, outcomes)},
+        'moves': int(moves_played.sum()),
+        'win_moves': int(moves_played[won].sum()),
+        'skills': {skill_id: int(count) for skill_id, count in zip(engine.skill_ids, engine.skill_counts.sum(axis=0))},
+        'sealed': int(engine.sealed_counts.sum()),
+        'refreshes': refreshes
+    }
+
+def merge_stats(total, stats):
+    """累加两个批次的计数"""
+    if total is None:
+        return stats
+    for key in ('games', 'moves', 'win_moves', 'sealed', 'refreshes'):
+        total[key] += stats[key]
+    for group in ('outcomes', 'skills'):
+        for key, value in stats[group].items():
+            total[group][key] += value
+    return total
+
+def summarize_level(stats, skill_rate):
+    """把计数换算成每关的报告行"""
+    games = stats['games']
+    wins = stats['outcomes'][OUTCOME_WIN]
+    triggers = sum(stats['skills'].values())
+    row = {
+        'level': stats['level'],
+        'games': games,
+        'skill_rate': skill_rate,
+        'win_rate': wins / games,
+        'avg_moves': stats['moves'] / games,
+        'avg_moves_win': stats['win_moves'] / wins if wins else None,
+        'out_of_moves_rate': stats['outcomes'][OUTCOME_OUT_OF_MOVES] / games,
+        'player_dead_rate': stats['outcomes'][OUTCOME_PLAYER_DEAD] / games,
+        'stuck_rate': stats['outcomes'][OUTCOME_STUCK] / games,
+        'skills_per_game': triggers / games,
+        'skills_per_move': triggers / stats['moves'] if stats['moves'] else 0,
+        'sealed_per_game': stats['sealed'] / games,
+        'refreshes_per_game': stats['refreshes'] / games
+    }
+    for skill_id, count in stats['skills'].items():
+        row[f"{skill_id}_per_game"] = count / games
+    return row
+
+def run_boss_sweep(constants, levels, games, policy_name, jobs, seed=None, progress=None):
+    """并行模拟所有关卡，返回按关卡排序的报告行"""
+    tasks = []
+    for level in levels:
+        for start in range(0, games, CHUNK_GAMES):
+            tasks.append((level, min(CHUNK_GAMES, games - start)))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+
+    totals = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(simulate_level_chunk, constants, level, count, policy_name, task_seed)
+            for (level, count), task_seed in zip(tasks, seeds)
+        ]
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            stats = future.result()
+            totals[stats['level']] = merge_stats(totals.get(stats['level']), stats)
+            if progress:
+                progress(done, len(futures))
+
+    skill_rates = {int(level): rate for level, rate in constants['BOSS_SKILL_RATES'].items()}
+    return [summarize_level(totals[level], boss_skill_rate(skill_rates, level)) for level in sorted(totals)]
+
+def write_csv(file_path, rows):
+    """每关一行写入CSV"""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,61 @@
+"""
+模拟用的出手策略
+策略是一个函数 policy(engine, moves)，从可执行的交换数组中选出一个 (行1, 列1, 行2, 列2)
+
+批量策略 policy(engine, rows, moves) 用于 BatchMatchEngine：moves 是 rows 对应棋盘的
+(局数, 交换数) 布尔数组，为每局选出一个 engine.swaps 中的下标。
+"""
+
+import numpy as np
+
+from .engine import covered_cells, triple_starts
+
+def random_policy(engine, moves):
+    """随机选择一个可消除的交换"""
+    return moves[engine.rng.integers(len(moves))]
+
+def greedy_policy(engine, moves):
+    """选择第一次消除得分最高的交换（按方块的形状分×颜色倍数之和估算，分数相同时随机选择）
+
+    不考虑五连/T型加成和后续的连锁消除，所有候选交换一次性批量计算。
+    """
+    boards = engine.swapped_boards(moves)
+    covered_horizontal, covered_vertical = covered_cells(*triple_starts(boards))
+
+    values = (engine.piece_values[boards] * (covered_horizontal | covered_vertical)).sum(axis=(1, 2))
+    best = np.flatnonzero(values == values.max())
+    return moves[best[engine.rng.integers(len(best))]]
+
+def random_batch_policy(engine, rows, moves):
+    """每局随机选择一个可消除的交换"""
+    keys = engine.rng.random(moves.shape)
+    keys[~moves] = -1
+    return keys.argmax(axis=1)
+
+def greedy_batch_policy(engine, rows, moves):
+    """每局选择第一次消除得分最高的交换，估算方法与 greedy_policy 相同
+
+    只为可消除的交换生成交换后的棋盘，所有对局的候选交换一次性批量计算。
+    """
+    board_index, swap_index = np.nonzero(moves)
+    boards = engine.swapped_candidates(engine.boards[rows], board_index, swap_index)
+    covered_horizontal, covered_vertical = covered_cells(*triple_starts(boards))
+    covered = covered_horizontal | covered_vertical
+
+    values = np.full(moves.shape, -np.inf)
+    values[board_index, swap_index] = (engine.piece_values[boards] * covered).sum(axis=(1, 2))
+    # 分数相同的交换中随机选择
+    best = values == values.max(axis=1, keepdims=True)
+    keys = engine.rng.random(moves.shape)
+    keys[~(best & moves)] = -1
+    return keys.argmax(axis=1)
+
+POLICIES = {
+    'random': random_policy,
+    'greedy': greedy_policy
+}
+
+BATCH_POLICIES = {
+    'random': random_batch_policy,
+    'greedy': greedy_batch_policy
+}
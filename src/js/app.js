@@ -8,8 +8,12 @@ class Match3Game {
         this.score = 0;
         this.moves = CLASSIC_MOVES;
         this.isAnimating = false;
+        this.isRestarting = false; // Boss战失败后等待重新开始当前关卡
         this.comboCount = 0;
 
+        // 游戏内的随机数（每局开始时由对局记录设置为带种子的生成器）
+        this.random = Math.random;
+
         // DOM元素引用
         this.boardEl = document.getElementById('game-board');
         this.scoreEl = document.getElementById('score');
@@ -22,6 +26,7 @@ class Match3Game {
         this.bossSystem = new BossSystem(this);
         this.itemSystem = new ItemSystem(this);
         this.logSystem = new LogSystem(this);
+        this.replayLog = new ReplayLog(this);
         this.gameLogic = new GameLogic(this);
         this.uiRenderer = new UIRenderer(this);
 
@@ -36,6 +41,7 @@ class Match3Game {
 
     // 初始化游戏
     init() {
+        this.replayLog.startGame();
         this.gameLogic.createBoard();
         this.uiRenderer.renderBoard(this);
         this.setupEventListeners();
@@ -53,7 +59,7 @@ class Match3Game {
 
     // 处理格子点击
     handleCellClick(e) {
-        if (this.isAnimating) return;
+        if (this.isAnimating || this.isRestarting) return;
 
         const cell = e.target.closest('.cell');
         if (!cell) return;
@@ -165,28 +171,34 @@ class Match3Game {
         if (this.gameMode === 'boss') {
             if (!isVictory) {
                 // 玩家失败，重新开始当前关卡
+                this.replayLog.recordResult('lose');
+                this.isRestarting = true;
                 this.uiRenderer.showMatchEffect('游戏结束！');
                 setTimeout(() => {
                     alert(`你在第${this.bossSystem.bossLevel}关被Boss击败了！`);
                     this.bossSystem.initBoss();
                     this.gameLogic.createBoard();
                     this.uiRenderer.renderBoard(this);
+                    this.isRestarting = false;
                 }, 500);
             }
             return;
         }
 
         // 经典模式的游戏结束
+        this.replayLog.recordResult('over');
         document.getElementById('final-score').textContent = this.score;
         document.getElementById('game-over').classList.add('active');
     }
 
     // 重新开始
     restart() {
+        this.replayLog.startGame();
         this.score = 0;
         this.moves = 30;
         this.selectedCell = null;
         this.isAnimating = false;
+        this.isRestarting = false;
         this.comboCount = 0;
 
         // 重置道具系统
@@ -272,11 +284,17 @@ class Match3Game {
             return;
         }
 
+        this.enterLevel(level);
+        this.uiRenderer.closeModal();
+    }
+
+    // 进入指定关卡（回放对局记录时直接调用）
+    enterLevel(level) {
+        this.replayLog.recordLevelSelect(level);
         this.bossSystem.setLevel(level);
         this.bossSystem.initBoss();
         this.gameLogic.createBoard();
         this.uiRenderer.renderBoard(this);
-        this.uiRenderer.closeModal();
         this.logSystem.addLog('系统', `从第${level}关开始`, 'system');
     }
 
@@ -285,6 +303,11 @@ class Match3Game {
         this.logSystem.toggleLog();
     }
 
+    // 导出对局记录
+    exportReplays() {
+        this.replayLog.exportLogs();
+    }
+
     // 关闭模态框
     closeModal() {
         this.uiRenderer.closeModal();
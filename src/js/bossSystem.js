@@ -29,10 +29,10 @@ class BossSystem {
         const skillRate = this.getBossSkillRate();
 
         // 随机生成Boss名字
-        const bossName = BOSS_NAMES[Math.floor(Math.random() * BOSS_NAMES.length)];
+        const bossName = BOSS_NAMES[Math.floor(this.game.random() * BOSS_NAMES.length)];
 
         // 生成Boss头像（组合简单形象）
-        const bossAvatar = BOSS_AVATARS[Math.floor(Math.random() * BOSS_AVATARS.length)];
+        const bossAvatar = BOSS_AVATARS[Math.floor(this.game.random() * BOSS_AVATARS.length)];
 
         this.boss = {
             name: bossName,
@@ -81,6 +81,7 @@ class BossSystem {
         // 更新Boss UI
         this.game.uiRenderer.updateBossUI(this);
         this.game.uiRenderer.updateMoves(this.game.moves, this.initialMoves, this.game.gameMode);
+        this.game.replayLog.recordLevel(this.bossLevel, this.game.moves);
     }
 
     // 获取Boss技能触发率
@@ -110,16 +111,16 @@ class BossSystem {
         }
 
         // 检查是否触发技能
-        if (Math.random() > this.boss.skillRate) {
+        if (this.game.random() > this.boss.skillRate) {
             return;
         }
 
         // 随机选择一个技能
         const skills = Object.values(BOSS_SKILLS);
-        let selectedSkill = skills[Math.floor(Math.random() * skills.length)];
+        let selectedSkill = skills[Math.floor(this.game.random() * skills.length)];
 
         // 根据概率重新选择
-        const rand = Math.random();
+        const rand = this.game.random();
         let cumulative = 0;
         for (const skill of skills) {
             cumulative += skill.probability;
@@ -167,7 +168,7 @@ class BossSystem {
 
     // 技能：冻结覆盖
     async skillFreeze() {
-        const freezeCount = Math.floor(Math.random() * 3) + 3; // 3-5个
+        const freezeCount = Math.floor(this.game.random() * 3) + 3; // 3-5个
         const availableCells = [];
 
         for (let row = 0; row < this.game.boardSize; row++) {
@@ -179,7 +180,7 @@ class BossSystem {
         }
 
         const selected = availableCells
-            .sort(() => Math.random() - 0.5)
+            .sort(() => this.game.random() - 0.5)
             .slice(0, Math.min(freezeCount, availableCells.length));
 
         selected.forEach(({ row, col }) => {
@@ -192,7 +193,7 @@ class BossSystem {
 
     // 技能：毒素蔓延
     async skillPoison() {
-        const poisonCount = Math.floor(Math.random() * 10) + 1; // 1-10个
+        const poisonCount = Math.floor(this.game.random() * 10) + 1; // 1-10个
         const availableCells = [];
 
         for (let row = 0; row < this.game.boardSize; row++) {
@@ -204,7 +205,7 @@ class BossSystem {
         }
 
         const selected = availableCells
-            .sort(() => Math.random() - 0.5)
+            .sort(() => this.game.random() - 0.5)
             .slice(0, Math.min(poisonCount, availableCells.length));
 
         selected.forEach(({ row, col }) => {
@@ -228,11 +229,11 @@ class BossSystem {
         }
 
         const selected = availableCells
-            .sort(() => Math.random() - 0.5)
+            .sort(() => this.game.random() - 0.5)
             .slice(0, Math.min(3, availableCells.length));
 
         selected.forEach(({ row, col }) => {
-            const hp = Math.floor(Math.random() * 3) + 2; // 2-4点血
+            const hp = Math.floor(this.game.random() * 3) + 2; // 2-4点血
             this.monsterCells.set(`${row},${col}`, hp);
         });
 
@@ -242,7 +243,7 @@ class BossSystem {
 
     // 技能：护盾生成
     async skillShield() {
-        const shieldRate = 0.1 + Math.random() * 0.2; // 0.1-0.3倍
+        const shieldRate = 0.1 + this.game.random() * 0.2; // 0.1-0.3倍
         const shieldAmount = Math.ceil(this.boss.maxHp * shieldRate);
 
         this.boss.shield += shieldAmount;
@@ -270,7 +271,7 @@ class BossSystem {
 
         // 随机打乱并选择要转换的格子
         const selected = availableCells
-            .sort(() => Math.random() - 0.5)
+            .sort(() => this.game.random() - 0.5)
             .slice(0, Math.min(transformCount, availableCells.length));
 
         selected.forEach(({ row, col }) => {
@@ -279,7 +280,7 @@ class BossSystem {
                 // 随机选择一个不同于当前形状的新形状
                 const currentShapeIndex = SHAPES.indexOf(piece.shape);
                 const otherShapes = SHAPES.filter((_, index) => index !== currentShapeIndex);
-                const newShape = otherShapes[Math.floor(Math.random() * otherShapes.length)];
+                const newShape = otherShapes[Math.floor(this.game.random() * otherShapes.length)];
                 piece.shape = newShape;
                 transformed++;
             }
@@ -303,8 +304,8 @@ class BossSystem {
 
         if (availableCells.length === 0) return;
 
-        const selected = availableCells[Math.floor(Math.random() * availableCells.length)];
-        const countdown = Math.floor(Math.random() * 3) + 3; // 3-5回合
+        const selected = availableCells[Math.floor(this.game.random() * availableCells.length)];
+        const countdown = Math.floor(this.game.random() * 3) + 3; // 3-5回合
         this.bombCells.set(`${selected.row},${selected.col}`, countdown);
 
         this.game.uiRenderer.renderBoard(this.game);
@@ -399,6 +400,7 @@ class BossSystem {
 
         // 检查是否通关
         if (this.bossLevel >= this.bossMaxLevel) {
+            this.game.replayLog.recordResult('clear');
             setTimeout(() => {
                 alert('恭喜你通关了所有70关！');
                 this.game.switchMode('classic');
@@ -430,7 +432,7 @@ class BossSystem {
     giveRandomItemAfterBoss() {
         // 所有道具（普通+特殊）
         const allItems = Object.values(ITEM_TYPES);
-        const randomItem = allItems[Math.floor(Math.random() * allItems.length)];
+        const randomItem = allItems[Math.floor(this.game.random() * allItems.length)];
 
         this.game.itemSystem.items[randomItem.id]++;
         this.game.itemSystem.updateItemsDisplay();
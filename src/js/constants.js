@@ -244,3 +244,11 @@ const BOSS_MAX_LEVEL = 70;
 
 // 玩家血量比例（相对于Boss血量）
 const PLAYER_HP_RATIO = 0.1;
+
+// ========== 对局记录配置 ==========
+
+// 对局记录格式版本（2：交换引起的结算记录在交换之后）
+const REPLAY_LOG_VERSION = 2;
+
+// localStorage中保留的最近对局数
+const REPLAY_MAX_GAMES = 20;
@@ -28,7 +28,7 @@ class GameLogic {
 
     // 根据概率生成随机图形
     getRandomPiece() {
-        const rand = Math.random();
+        const rand = this.game.random();
         let cumulative = 0;
 
         for (const [key, prob] of Object.entries(this.game.probabilities)) {
@@ -83,8 +83,74 @@ class GameLogic {
         }
     }
 
+    // 把棋盘编码为一维数组：形状序号 * 颜色数 + 颜色序号，空格为-1
+    encodeBoard() {
+        const size = this.game.boardSize;
+        const codes = new Int8Array(size * size);
+        for (let row = 0; row < size; row++) {
+            for (let col = 0; col < size; col++) {
+                const piece = this.game.board[row][col];
+                codes[row * size + col] = piece
+                    ? SHAPES.indexOf(piece.shape) * COLORS.length + COLORS.indexOf(piece.color)
+                    : -1;
+            }
+        }
+        return codes;
+    }
+
+    // 用构建时生成的交换查找表找出能形成匹配的交换 [行1, 列1, 行2, 列2]
+    // 没有查找表、棋盘大小不符或棋盘上已有匹配时返回null，由调用方逐个尝试交换
+    findPossibleSwaps(stopAtFirst = false) {
+        const size = this.game.boardSize;
+        if (typeof MOVE_TABLE === 'undefined' || MOVE_TABLE[0] !== size) return null;
+        if (this.findMatches().length > 0) return null;
+
+        const codes = this.encodeBoard();
+        const swaps = [];
+        let offset = 1;
+
+        // 与逐个尝试交换的顺序相同：逐行逐列，先向右再向下
+        for (let row = 0; row < size; row++) {
+            for (let col = 0; col < size; col++) {
+                for (let dir = 0; dir < 2; dir++) {
+                    const row2 = dir === 0 ? row : row + 1;
+                    const col2 = dir === 0 ? col + 1 : col;
+                    if (row2 >= size || col2 >= size) continue;
+
+                    // 两个字节分别对应移动到 (row2, col2) 和移动到 (row, col) 的方块
+                    if (this.swapFormsMatch(codes, MOVE_TABLE[offset], row2, col2, codes[row * size + col]) ||
+                        this.swapFormsMatch(codes, MOVE_TABLE[offset + 1], row, col, codes[row2 * size + col2])) {
+                        swaps.push([row, col, row2, col2]);
+                        if (stopAtFirst) return swaps;
+                    }
+                    offset += 2;
+                }
+            }
+        }
+
+        return swaps;
+    }
+
+    // 检查方块移动到 (row, col) 后，查找表掩码中的三连模式是否有一个成立
+    swapFormsMatch(codes, mask, row, col, code) {
+        if (code < 0) return false;
+        const size = this.game.boardSize;
+        for (let bit = 0; mask >> bit; bit++) {
+            if (!(mask & (1 << bit))) continue;
+            const p = bit * 4;
+            if (codes[(row + MOVE_TABLE_PATTERNS[p]) * size + col + MOVE_TABLE_PATTERNS[p + 1]] === code &&
+                codes[(row + MOVE_TABLE_PATTERNS[p + 2]) * size + col + MOVE_TABLE_PATTERNS[p + 3]] === code) {
+                return true;
+            }
+        }
+        return false;
+    }
+
     // 检查是否有可以消除的移动
     hasPossibleMoves() {
+        const swaps = this.findPossibleSwaps(true);
+        if (swaps) return swaps.length > 0;
+
         // 检查所有可能的交换
         for (let row = 0; row < this.game.boardSize; row++) {
             for (let col = 0; col < this.game.boardSize; col++) {
@@ -464,7 +530,7 @@ class GameLogic {
                     const newCountdown = countdown - 1;
                     if (newCountdown <= 0) {
                         // 炸弹爆炸，随机扣除1-3步
-                        const stepsToDeduct = Math.floor(Math.random() * 3) + 1;
+                        const stepsToDeduct = Math.floor(this.game.random() * 3) + 1;
                         this.game.moves = Math.max(0, this.game.moves - stepsToDeduct);
                         this.game.uiRenderer.updateMoves(this.game.moves, bossSystem.initialMoves, this.game.gameMode);
                         bossSystem.bombCells.delete(cellKey);
@@ -501,10 +567,10 @@ class GameLogic {
         if (this.game.gameMode !== 'boss') return;
 
         // 10%的概率获得步数奖励
-        if (Math.random() < ITEM_PROBABILITIES.movesBonus) {
+        if (this.game.random() < ITEM_PROBABILITIES.movesBonus) {
             // 根据概率决定奖励多少步
             let bonusType;
-            const rand = Math.random();
+            const rand = this.game.random();
             if (rand < MOVES_BONUS_PROBABILITIES.threeSteps) {
                 bonusType = 'threeSteps';
             } else if (rand < MOVES_BONUS_PROBABILITIES.threeSteps + MOVES_BONUS_PROBABILITIES.twoSteps) {
@@ -784,7 +850,9 @@ class GameLogic {
             this.game.moves--;
             this.game.uiRenderer.updateMoves(this.game.moves, this.game.bossSystem ? this.game.bossSystem.initialMoves : 30, this.game.gameMode);
             this.game.comboCount = 0; // 重置连击计数
+            this.game.replayLog.beginSwap();
             await this.processMatches();
+            this.game.replayLog.recordSwap(row1, col1, row2, col2, this.game.comboCount);
         } else {
             // 没有匹配，换回来
             await this.game.delay(200);
@@ -792,6 +860,7 @@ class GameLogic {
             this.game.board[row1][col1] = this.game.board[row2][col2];
             this.game.board[row2][col2] = temp;
             this.game.uiRenderer.renderBoard(this.game);
+            this.game.replayLog.recordSwap(row1, col1, row2, col2, 0);
         }
 
         this.game.isAnimating = false;
@@ -54,7 +54,10 @@ class ItemSystem {
 
     // 使用道具
     useItem(itemId) {
-        if (this.items[itemId] <= 0) return;
+        // 动画和连锁消除进行中不能使用道具，保证对局记录中的操作顺序与实际执行顺序一致
+        if (this.items[itemId] <= 0 || this.game.isAnimating) return;
+
+        this.game.replayLog.recordItem(itemId);
 
         switch (itemId) {
             case ITEM_TYPES.MAGNIFYING_GLASS.id:
@@ -91,7 +94,7 @@ class ItemSystem {
 
         // 随机选择3个，如果不足则全部选择
         const selected = possibleMatches
-            .sort(() => Math.random() - 0.5)
+            .sort(() => this.game.random() - 0.5)
             .slice(0, 3);
 
         // 清除之前的高亮
@@ -137,7 +140,7 @@ class ItemSystem {
         }
 
         // 随机选择一个中心点
-        const center = centers[Math.floor(Math.random() * centers.length)];
+        const center = centers[Math.floor(this.game.random() * centers.length)];
 
         // 炸毁3x3区域
         const destroyed = [];
@@ -163,10 +166,12 @@ class ItemSystem {
         });
 
         // 下落填充
+        this.game.isAnimating = true;
         setTimeout(async () => {
             await this.game.gameLogic.dropPieces();
             await this.game.gameLogic.fillBoard();
-            this.game.gameLogic.processMatches();
+            await this.game.gameLogic.processMatches();
+            this.game.isAnimating = false;
         }, 300);
 
         this.items[ITEM_TYPES.BOMB.id]--;
@@ -191,12 +196,14 @@ class ItemSystem {
         this.game.logSystem.addLog('刷新', '重新生成了所有方块', 'item');
 
         // 检查并消除匹配
+        this.game.isAnimating = true;
         setTimeout(async () => {
             const matches = this.game.gameLogic.findMatches();
             if (matches.length > 0) {
                 this.game.comboCount = 0;
                 await this.game.gameLogic.processMatches();
             }
+            this.game.isAnimating = false;
         }, 300);
     }
 
@@ -218,12 +225,14 @@ class ItemSystem {
         this.game.logSystem.addLog('改色', '将所有方块变为蓝色（系数×1.5）', 'item');
 
         // 检查并消除匹配
+        this.game.isAnimating = true;
         setTimeout(async () => {
             const matches = this.game.gameLogic.findMatches();
             if (matches.length > 0) {
                 this.game.comboCount = 0;
                 await this.game.gameLogic.processMatches();
             }
+            this.game.isAnimating = false;
         }, 300);
     }
 
@@ -284,15 +293,7 @@ class ItemSystem {
 
                 // 交换两个方块
                 this.swapPiecesWithoutCheck(firstRow, firstCol, row, col);
-
-                this.game.uiRenderer.clearSelection();
-                this.firstSwapCell = null;
-                this.swapModeActive = false;
-
-                // 恢复原始事件监听器
-                this.game.boardEl.removeEventListener('click', this.swapClickHandler);
-                this.game.boardEl.addEventListener('click', this.game.originalClickHandler);
-                this.swapClickHandler = null;
+                this.exitSwapMode();
             }
         };
 
@@ -300,9 +301,22 @@ class ItemSystem {
         this.game.boardEl.addEventListener('click', this.swapClickHandler);
     }
 
+    // 退出交换模式
+    exitSwapMode() {
+        this.game.uiRenderer.clearSelection();
+        this.firstSwapCell = null;
+        this.swapModeActive = false;
+
+        // 恢复原始事件监听器
+        this.game.boardEl.removeEventListener('click', this.swapClickHandler);
+        this.game.boardEl.addEventListener('click', this.game.originalClickHandler);
+        this.swapClickHandler = null;
+    }
+
     // 交换方块（不检查是否相邻）
     swapPiecesWithoutCheck(row1, col1, row2, col2) {
         this.game.isAnimating = true;
+        this.game.replayLog.recordItemSwap(row1, col1, row2, col2);
 
         // 交换
         const temp = this.game.board[row1][col1];
@@ -343,40 +357,49 @@ class ItemSystem {
     // 找到所有可消除的方块
     findAllPossibleMatches() {
         const matches = [];
+        const swaps = this.game.gameLogic.findPossibleSwaps();
 
-        // 检查所有可能的交换
-        for (let row = 0; row < this.game.boardSize; row++) {
-            for (let col = 0; col < this.game.boardSize; col++) {
-                // 尝试向右交换
-                if (col < this.game.boardSize - 1) {
-                    const temp = this.game.board[row][col];
-                    this.game.board[row][col] = this.game.board[row][col + 1];
-                    this.game.board[row][col + 1] = temp;
-
-                    if (this.game.gameLogic.findMatches().length > 0) {
-                        matches.push({ row, col });
-                        matches.push({ row, col: col + 1 });
+        if (swaps) {
+            // 使用交换查找表
+            for (const [row1, col1, row2, col2] of swaps) {
+                matches.push({ row: row1, col: col1 });
+                matches.push({ row: row2, col: col2 });
+            }
+        } else {
+            // 检查所有可能的交换
+            for (let row = 0; row < this.game.boardSize; row++) {
+                for (let col = 0; col < this.game.boardSize; col++) {
+                    // 尝试向右交换
+                    if (col < this.game.boardSize - 1) {
+                        const temp = this.game.board[row][col];
+                        this.game.board[row][col] = this.game.board[row][col + 1];
+                        this.game.board[row][col + 1] = temp;
+
+                        if (this.game.gameLogic.findMatches().length > 0) {
+                            matches.push({ row, col });
+                            matches.push({ row, col: col + 1 });
+                        }
+
+                        // 换回来
+                        this.game.board[row][col + 1] = this.game.board[row][col];
+                        this.game.board[row][col] = temp;
                     }
 
-                    // 换回来
-                    this.game.board[row][col + 1] = this.game.board[row][col];
-                    this.game.board[row][col] = temp;
-                }
+                    // 尝试向下交换
+                    if (row < this.game.boardSize - 1) {
+                        const temp = this.game.board[row][col];
+                        this.game.board[row][col] = this.game.board[row + 1][col];
+                        this.game.board[row + 1][col] = temp;
 
-                // 尝试向下交换
-                if (row < this.game.boardSize - 1) {
-                    const temp = this.game.board[row][col];
-                    this.game.board[row][col] = this.game.board[row + 1][col];
-                    this.game.board[row + 1][col] = temp;
+                        if (this.game.gameLogic.findMatches().length > 0) {
+                            matches.push({ row, col });
+                            matches.push({ row: row + 1, col });
+                        }
 
-                    if (this.game.gameLogic.findMatches().length > 0) {
-                        matches.push({ row, col });
-                        matches.push({ row: row + 1, col });
+                        // 换回来
+                        this.game.board[row + 1][col] = this.game.board[row][col];
+                        this.game.board[row][col] = temp;
                     }
-
-                    // 换回来
-                    this.game.board[row + 1][col] = this.game.board[row][col];
-                    this.game.board[row][col] = temp;
                 }
             }
         }
@@ -397,7 +420,7 @@ class ItemSystem {
 
     // 随机给道具
     giveRandomItem() {
-        const rand = Math.random();
+        const rand = this.game.random();
         const scoreMilestone = Math.floor(this.game.score / 100) * 100;
 
         if (rand < ITEM_PROBABILITIES.normal) {
@@ -407,7 +430,7 @@ class ItemSystem {
                 ITEM_TYPES.BOMB,
                 ITEM_TYPES.REFRESH
             ];
-            const item = normalItems[Math.floor(Math.random() * normalItems.length)];
+            const item = normalItems[Math.floor(this.game.random() * normalItems.length)];
             this.items[item.id]++;
             this.showItemGain(item);
             this.game.logSystem.addLog('道具获得',
@@ -420,7 +443,7 @@ class ItemSystem {
                 ITEM_TYPES.TRIPLE_COMBO,
                 ITEM_TYPES.SWAP
             ];
-            const item = specialItems[Math.floor(Math.random() * specialItems.length)];
+            const item = specialItems[Math.floor(this.game.random() * specialItems.length)];
             this.items[item.id]++;
             this.showItemGain(item);
             this.game.logSystem.addLog('道具获得',
@@ -436,7 +459,7 @@ class ItemSystem {
 
     // 给步数奖励
     giveMovesBonus(scoreMilestone) {
-        const rand = Math.random();
+        const rand = this.game.random();
         let moves = 0;
         let percentage = '';
 
@@ -482,7 +505,7 @@ class ItemSystem {
 
         if (this.tripleComboActive) {
             const multipliers = [0.5, 0.8, 1, 1.5, 2, 3, 5];
-            const tripleMultiplier = multipliers[Math.floor(Math.random() * multipliers.length)];
+            const tripleMultiplier = multipliers[Math.floor(this.game.random() * multipliers.length)];
             const newPoints = Math.ceil(points * tripleMultiplier);
             this.game.logSystem.addLog('三部曲',
                 `第${this.tripleComboCount + 1}步：${points}分 × ${tripleMultiplier.toFixed(1)} = ${newPoints}分`,
@@ -64,8 +64,9 @@ const PageManager = {
         this.showStartPage();
         // 清除游戏开始标志
         localStorage.removeItem('gameStarted');
-        // 销毁游戏实例
+        // 销毁游戏实例（先保存未结束的对局记录）
         if (window.game) {
+            window.game.replayLog.finish('quit');
             window.game = null;
         }
     }
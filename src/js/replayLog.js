@@ -0,0 +1,215 @@
+// 对局记录模块
+// 每局使用一个随机种子驱动所有游戏内的随机数，并按行记录玩家的操作和结果，
+// 同一份记录可以在任何地方确定性地回放。每行一个事件，字段以空格分隔：
+//   G <版本> <种子> <模式> <开始时间>              对局开始
+//   L <关卡> <步数>                               Boss关卡开始
+//   P <关卡>                                      选择关卡
+//   S <行1> <列1> <行2> <列2> <分数> <连击> <步数>  交换方块（连击为0表示交换无效）
+//   I <道具> <分数>                               使用道具
+//   X <行1> <列1> <行2> <列2>                      交换道具选择的两个方块
+//   E <结果> <分数> <关卡>                         结算：over 经典模式结束、lose Boss战失败、clear 通关、quit 中途退出
+// 交换引起的结算（Boss被击败后进入下一关、中毒或被攻击而失败、通关）记录在该交换的 S 行之后。
+
+// 基于种子的随机数生成器（mulberry32），返回 [0, 1) 之间的数
+function createSeededRandom(seed) {
+    let state = seed >>> 0;
+    return function () {
+        state = (state + 0x6D2B79F5) >>> 0;
+        let t = state;
+        t = Math.imul(t ^ (t >>> 15), t | 1);
+        t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+
+// 当前的对局记录：关闭页面时由下面唯一的监听器保存未结束的对局，不随实例重复注册
+let activeReplayLog = null;
+
+window.addEventListener('pagehide', () => {
+    if (activeReplayLog) activeReplayLog.finish('quit');
+});
+
+class ReplayLog {
+    constructor(game) {
+        this.game = game;
+        this.lines = [];      // 当前对局的记录
+        this.seed = 0;
+        this.nextSeed = null; // 回放时指定下一局的种子
+        this.finished = false;
+        this.saving = true;   // 回放生成的对局不保存
+        this.swapLines = null; // 交换结算过程中产生的记录，等交换本身记录之后再写入
+
+        activeReplayLog = this;
+    }
+
+    // 开始新的一局：结算上一局，设置随机种子并写入对局头
+    startGame() {
+        this.finish('quit');
+
+        this.saving = this.nextSeed === null;
+        this.seed = this.saving ? Math.floor(Math.random() * 4294967296) : this.nextSeed;
+        this.nextSeed = null;
+        this.game.random = createSeededRandom(this.seed);
+
+        this.lines = [`G ${REPLAY_LOG_VERSION} ${this.seed} ${this.game.gameMode} ${Date.now()}`];
+        this.swapLines = null;
+        this.finished = false;
+    }
+
+    // 追加一行记录（交换结算过程中先暂存）
+    record(...fields) {
+        (this.swapLines || this.lines).push(fields.join(' '));
+    }
+
+    // 有效的交换开始结算：结算完成、记录交换之前产生的记录都排在交换之后
+    beginSwap() {
+        this.swapLines = [];
+    }
+
+    // 记录Boss关卡开始
+    recordLevel(level, moves) {
+        this.record('L', level, moves);
+    }
+
+    // 记录选择关卡
+    recordLevelSelect(level) {
+        this.record('P', level);
+    }
+
+    // 记录交换方块及结算后的状态，随后写入结算过程中暂存的记录
+    recordSwap(row1, col1, row2, col2, comboCount) {
+        const pending = this.swapLines || [];
+        this.swapLines = null;
+        this.record('S', row1, col1, row2, col2, this.game.score, comboCount, this.game.moves);
+        if (pending.length > 0) {
+            this.lines.push(...pending);
+            this.save();
+        }
+    }
+
+    // 记录使用道具
+    recordItem(itemId) {
+        this.record('I', itemId, this.game.score);
+    }
+
+    // 记录交换道具选择的方块
+    recordItemSwap(row1, col1, row2, col2) {
+        this.record('X', row1, col1, row2, col2);
+    }
+
+    // 记录结算，over / clear / quit 表示本局结束
+    recordResult(result) {
+        const level = this.game.gameMode === 'boss' ? this.game.bossSystem.bossLevel : 0;
+        this.record('E', result, this.game.score, level);
+        if (result !== 'lose') {
+            this.finished = true;
+        }
+        this.save();
+    }
+
+    // 结束当前对局（没有任何操作的对局不保存）
+    finish(result) {
+        if (this.finished || this.lines.length <= 1) return;
+        this.recordResult(result);
+    }
+
+    // 获取保存的对局记录（每项为一局的完整文本）
+    getStoredLogs() {
+        const stored = localStorage.getItem('match3_replays');
+        return stored ? JSON.parse(stored) : [];
+    }
+
+    // 保存当前对局，只保留最近的 REPLAY_MAX_GAMES 局
+    save() {
+        if (!this.saving || this.lines.length <= 1) return;
+
+        const logs = this.getStoredLogs();
+        const text = this.lines.join('\n');
+        if (logs.length > 0 && logs[logs.length - 1].startsWith(this.lines[0] + '\n')) {
+            logs[logs.length - 1] = text;
+        } else {
+            logs.push(text);
+        }
+
+        try {
+            localStorage.setItem('match3_replays', JSON.stringify(logs.slice(-REPLAY_MAX_GAMES)));
+        } catch (e) {
+            // 存储空间不足时只保留当前对局
+            localStorage.setItem('match3_replays', JSON.stringify([text]));
+        }
+    }
+
+    // 导出所有保存的对局记录为文本文件
+    exportLogs() {
+        this.save();
+        const logs = this.getStoredLogs();
+        if (logs.length === 0) {
+            this.game.uiRenderer.showMatchEffect('还没有对局记录！');
+            return;
+        }
+
+        const blob = new Blob([logs.join('\n') + '\n'], { type: 'text/plain' });
+        const url = URL.createObjectURL(blob);
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = `puzzle-replays-${Date.now()}.log`;
+        link.click();
+        // 立即释放会让部分浏览器（Firefox、Safari）取消下载，等下载开始后再释放
+        setTimeout(() => URL.revokeObjectURL(url), 1000);
+        this.game.logSystem.addLog('系统', `导出了 ${logs.length} 局对局记录`, 'system');
+    }
+
+    // 等待动画、道具效果和Boss战失败后的重新开始结束
+    async waitForIdle() {
+        while (this.game.isAnimating || this.game.isRestarting) {
+            await new Promise(resolve => setTimeout(resolve, 50));
+        }
+    }
+
+    // 回放一局记录：使用相同的种子重新开始，按顺序重新执行选择关卡、交换和道具操作
+    // 回放时重新生成的记录与原记录逐行比较，返回第一处不一致的行号（完全一致时返回0）
+    async replay(text) {
+        const lines = text.trim().split('\n');
+        const [tag, version, seed, mode] = lines[0].split(' ');
+        if (tag !== 'G' || Number(version) !== REPLAY_LOG_VERSION) {
+            throw new Error('不支持的对局记录格式');
+        }
+
+        this.nextSeed = Number(seed);
+        if (this.game.gameMode !== mode) {
+            this.game.switchMode(mode);
+        } else {
+            this.game.restart();
+        }
+
+        for (const line of lines.slice(1)) {
+            const [type, ...fields] = line.split(' ');
+            const values = fields.map(Number);
+
+            if (type === 'P') {
+                this.game.enterLevel(values[0]);
+            } else if (type === 'S') {
+                await this.game.gameLogic.swapPieces(...values.slice(0, 4));
+            } else if (type === 'I') {
+                this.game.itemSystem.useItem(fields[0]);
+            } else if (type === 'X') {
+                this.game.itemSystem.swapPiecesWithoutCheck(...values);
+                this.game.itemSystem.exitSwapMode();
+            }
+            await this.waitForIdle();
+        }
+
+        // 中途退出的结算不是操作，回放结果中没有对应的行
+        const expected = [];
+        lines.forEach((line, index) => {
+            if (index > 0 && !line.startsWith('E quit ')) expected.push({ number: index + 1, line });
+        });
+        const actual = this.lines.slice(1);
+        for (let i = 0; i < Math.max(expected.length, actual.length); i++) {
+            if (!expected[i] || expected[i].line !== actual[i]) {
+                return expected[i] ? expected[i].number : lines.length + 1;
+            }
+        }
+        return 0;
+    }
+}
@@ -0,0 +1,186 @@
+"""
+simulator 中批量引擎的测试：与逐局结算的 MatchEngine / BossEngine 逐块棋盘对比
+"""
+
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    from simulator.boss import BatchBossEngine, BossEngine, OUTCOMES, OUTCOME_STUCK, OUTCOME_WIN, match_list
+    from simulator.engine import EMPTY, BatchMatchEngine, MatchEngine, triple_starts
+
+# 随机生成的棋盘数量（随机棋盘上大多数都有现成的匹配，包括五连和T/L型）
+RANDOM_BOARDS = 300
+
+
+def cell_mask(shape, cells):
+    """由格子列表生成掩码"""
+    mask = np.zeros(shape, dtype=bool)
+    for cell in cells:
+        mask[cell] = True
+    return mask
+
+
+def counter_array(shape, counters):
+    """把 {(行, 列): 次数} 转换为数组"""
+    array = np.zeros(shape, dtype=np.int8)
+    for cell, count in counters.items():
+        array[cell] = count
+    return array
+
+
+def has_any_match(boards):
+    """任意一块棋盘上有匹配"""
+    horizontal, vertical = triple_starts(boards)
+    return bool(horizontal.any() or vertical.any())
+
+
+@unittest.skipIf(np is None, "模拟器需要 numpy")
+class BatchMatchEngineTest(unittest.TestCase):
+    """BatchMatchEngine 的每一步与 MatchEngine 的结果相同"""
+
+    def setUp(self):
+        self.engine = MatchEngine(seed=1)
+        self.batch = BatchMatchEngine(seed=2)
+        self.rng = np.random.default_rng(3)
+        self.boards = self.batch.random_boards(RANDOM_BOARDS)
+        horizontal, vertical = triple_starts(self.boards)
+        self.matched = horizontal.any(axis=(1, 2)) | vertical.any(axis=(1, 2))
+
+    def matched_boards(self):
+        """有匹配的棋盘及其三连起点"""
+        boards = self.boards[self.matched]
+        return (boards,) + triple_starts(boards)
+
+    def test_score_matches(self):
+        boards, horizontal, vertical = self.matched_boards()
+        combo_counts = self.rng.integers(1, 7, len(boards))
+        score, green, red, count, mask = self.batch.score_matches(boards, horizontal, vertical, combo_counts)
+
+        types = set()
+        for index, board in enumerate(boards):
+            self.engine.board = board.copy()
+            matches = self.engine.find_matches()
+            analysis = self.engine.analyze_matches(matches)
+            types.add(analysis['type'])
+            expected = self.engine.calculate_score(matches, analysis, int(combo_counts[index]))
+            self.assertEqual((int(score[index]), int(green[index]), int(red[index]), int(count[index])), expected)
+            self.assertTrue((mask[index] == self.engine.match_mask(matches)).all())
+        self.assertEqual(types, {'normal', 'L', 'special', 'five'})
+
+    def test_find_moves(self):
+        created, _ = self.batch.create_boards(100)
+        boards = np.concatenate([created, self.boards[:100]])
+        moves = self.batch.find_moves(boards)
+        for index, board in enumerate(boards):
+            self.engine.board = board.copy()
+            expected = {tuple(swap) for swap in self.engine.possible_moves().tolist()}
+            self.assertEqual({tuple(swap) for swap in self.batch.swaps[moves[index]].tolist()}, expected)
+
+    def test_drop_and_fill(self):
+        boards, horizontal, vertical = self.matched_boards()
+        *_, mask = self.batch.score_matches(boards, horizontal, vertical, np.ones(len(boards), dtype=np.int64))
+        boards[mask] = EMPTY
+        filled = self.batch.drop_and_fill(boards.copy())
+        self.assertFalse((filled == EMPTY).any())
+        for index, board in enumerate(boards):
+            self.engine.board = board.copy()
+            self.engine.drop_pieces()
+            kept = self.engine.board != EMPTY
+            self.assertTrue((filled[index][kept] == self.engine.board[kept]).all())
+
+    def test_play_moves(self):
+        self.batch.new_games(50)
+        scores = self.batch.scores.copy()
+        rows = np.arange(0, 50, 2)
+        swaps = self.batch.available_moves[rows].argmax(axis=1)
+        result = self.batch.play_moves(rows, swaps)
+
+        self.assertTrue((result.match_count >= 3).all())
+        self.assertTrue((self.batch.scores[rows] == scores[rows] + result.score).all())
+        self.assertTrue((self.batch.moves[rows] == self.batch.constants['CLASSIC_MOVES'] - 1).all())
+        self.assertTrue((self.batch.moves[1::2] == self.batch.constants['CLASSIC_MOVES']).all())
+        self.assertFalse(has_any_match(self.batch.boards))
+
+
+@unittest.skipIf(np is None, "模拟器需要 numpy")
+class BatchBossEngineTest(unittest.TestCase):
+    """BatchBossEngine 的消除规则与 BossEngine 相同"""
+
+    def setUp(self):
+        self.engine = BossEngine(seed=1)
+        self.batch = BatchBossEngine(seed=2)
+        self.rng = np.random.default_rng(3)
+        boards = self.batch.random_boards(RANDOM_BOARDS)
+        horizontal, vertical = triple_starts(boards)
+        self.boards = boards[horizontal.any(axis=(1, 2)) | vertical.any(axis=(1, 2))]
+
+    def test_match_list_order(self):
+        board, rank, masks = match_list(*triple_starts(self.boards))
+        for index, cells in enumerate(self.boards):
+            self.engine.board = cells.copy()
+            matches = self.engine.find_matches()
+            selected = np.flatnonzero(board == index)
+            self.assertEqual(rank[selected].tolist(), list(range(len(matches))))
+            for match, mask in zip(matches, masks[selected]):
+                self.assertTrue((mask == cell_mask(cells.shape, match.cells)).all())
+
+    def test_clear_matches(self):
+        count = len(self.boards)
+        shape = self.boards.shape
+        batch = self.batch
+        batch.new_level(30, count)
+        batch.frozen = np.where(self.rng.random(shape) < 0.08, self.rng.integers(1, 4, shape), 0).astype(np.int8)
+        batch.monsters = np.where(self.rng.random(shape) < 0.08, self.rng.integers(1, 5, shape), 0).astype(np.int8)
+        batch.poisoned = self.rng.random(shape) < 0.1
+        batch.player_hp = self.rng.integers(1, 60, count)
+        frozen, monsters = batch.frozen.copy(), batch.monsters.copy()
+        poisoned, player_hp = batch.poisoned.copy(), batch.player_hp.copy()
+
+        boards = self.boards.copy()
+        alive = batch.clear_matches_batch(np.arange(count), boards, *triple_starts(self.boards))
+        self.assertTrue(alive.any() and not alive.all())
+
+        boss = self.engine.boss_system
+        for index in range(count):
+            self.engine.board = self.boards[index].copy()
+            boss.frozen_cells = {tuple(map(int, cell)): int(frozen[index][tuple(cell)])
+                                 for cell in np.argwhere(frozen[index])}
+            boss.monster_cells = {tuple(map(int, cell)): int(monsters[index][tuple(cell)])
+                                  for cell in np.argwhere(monsters[index])}
+            boss.poisoned_cells = {tuple(map(int, cell)) for cell in np.argwhere(poisoned[index])}
+            boss.player_hp = int(player_hp[index])
+
+            expected_alive = self.engine.clear_matches(self.engine.find_matches())
+            self.assertEqual(bool(alive[index]), expected_alive)
+            self.assertEqual(int(batch.player_hp[index]), boss.player_hp)
+            self.assertTrue((batch.frozen[index] == counter_array(shape[1:], boss.frozen_cells)).all())
+            self.assertTrue((batch.monsters[index] == counter_array(shape[1:], boss.monster_cells)).all())
+            if expected_alive:
+                self.assertTrue((batch.poisoned[index] == cell_mask(shape[1:], boss.poisoned_cells)).all())
+                self.assertTrue((boards[index] == self.engine.board).all())
+
+    def test_level_outcomes(self):
+        batch = self.batch
+        batch.new_level(3, 40)
+        while not batch.is_game_over():
+            rows = batch.active_rows()
+            moves = batch.playable_moves(rows)
+            stuck = ~moves.any(axis=1)
+            batch.end_games(rows[stuck], OUTCOME_STUCK)
+            rows, moves = rows[~stuck], moves[~stuck]
+            if len(rows):
+                batch.play_moves(rows, moves.argmax(axis=1))
+
+        won = batch.outcomes == OUTCOMES.index(OUTCOME_WIN)
+        self.assertTrue(won.any())
+        self.assertTrue((batch.boss_hp[won] == 0).all())
+        self.assertTrue((batch.boss_hp[~won] > 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
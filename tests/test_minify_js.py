@@ -0,0 +1,56 @@
+"""
+build.py 中 JavaScript压缩器的测试
+"""
+
+import unittest
+
+from build import minify_js, minify_js_with_map
+
+
+class MinifyJsTest(unittest.TestCase):
+    def assert_minified(self, source, expected):
+        self.assertEqual(minify_js(source), expected)
+        self.assertEqual(minify_js_with_map(source)[0], expected)
+
+    def test_removes_comments_and_whitespace(self):
+        self.assert_minified("var a = 1; // 注释\n/* 块注释 */ var b = a + 2;", "var a=1;var b=a+2;")
+
+    def test_keeps_newline_for_asi(self):
+        self.assert_minified("let a = b\n(c)", "let a=b\n(c)")
+
+    def test_keeps_unary_operators_apart(self):
+        self.assert_minified("a = b + +c - -d", "a=b+ +c- -d")
+
+    def test_keeps_strings_and_templates(self):
+        self.assert_minified("s = 'a  b' + `x ${ y  } z`", "s='a  b'+`x ${y} z`")
+
+    def test_regex_before_keyword(self):
+        self.assert_minified("var t = /ab/ instanceof RegExp", "var t=/ab/ instanceof RegExp")
+
+    def test_regex_before_newline(self):
+        self.assert_minified("var r = /ab/\nfoo()", "var r=/ab/\nfoo()")
+
+    def test_regex_with_flags(self):
+        self.assert_minified("var r = /ab/g ;\nfoo()", "var r=/ab/g;foo()")
+
+    def test_number_before_member_access(self):
+        self.assert_minified("x = 1 .toString()", "x=1 .toString()")
+
+    def test_no_html_comment_open(self):
+        self.assert_minified("a = b < !--c", "a=b< !--c")
+        self.assert_minified("a = b<! --c", "a=b< !--c")
+        self.assert_minified("a = b < !c", "a=b<!c")
+
+    def test_keyword_property_before_division(self):
+        self.assert_minified("x = a.return / 2 / 3", "x=a.return/2/3")
+        self.assert_minified("x = a?.typeof / 2 / i", "x=a?.typeof/2/i")
+
+    def test_keyword_before_regex(self):
+        self.assert_minified("return /a b/.test(s)", "return/a b/.test(s)")
+
+    def test_decimal_number(self):
+        self.assert_minified("x = 1.5 * y . z", "x=1.5*y.z")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+build.py 中交换查找表的测试：与暴力枚举的结果对比
+"""
+
+import random
+import unittest
+
+from build import JS_FILES, MOVE_TABLE_PATTERNS, find_board_size, generate_move_table, iter_swaps, swap_moves
+
+# 参与测试的棋盘大小（另加 constants.js 中的 BOARD_SIZE）
+BOARD_SIZES = [3, 4, 5, 8]
+
+# 每种棋盘大小随机生成的棋盘数量和方块种类数
+RANDOM_BOARDS = 20
+RANDOM_PIECES = 4
+
+
+def board_windows(board_size):
+    """棋盘上所有横向和纵向的连续三格"""
+    windows = []
+    for row in range(board_size):
+        for col in range(board_size - 2):
+            windows.append([(row, col), (row, col + 1), (row, col + 2)])
+    for col in range(board_size):
+        for row in range(board_size - 2):
+            windows.append([(row, col), (row + 1, col), (row + 2, col)])
+    return windows
+
+
+def table_patterns(table, index, side, row, col):
+    """查找表中某个方块需要检查的三连（另外两个格子的集合）"""
+    mask = table[1 + index * 2 + side]
+    return {
+        frozenset([(row + dr1, col + dc1), (row + dr2, col + dc2)])
+        for bit, (dr1, dc1, dr2, dc2) in enumerate(MOVE_TABLE_PATTERNS) if mask & (1 << bit)
+    }
+
+
+def expected_patterns(board_size, row, col, origin):
+    """暴力枚举：包含方块新位置、不包含对方原位置的连续三格"""
+    return {
+        frozenset(cell for cell in window if cell != (row, col))
+        for window in board_windows(board_size) if (row, col) in window and origin not in window
+    }
+
+
+def find_swaps_with_table(table, board):
+    """按浏览器端的方式用查找表找出能形成匹配的交换（要求棋盘上没有现成的匹配）"""
+    swaps = []
+    for index, swap in enumerate(iter_swaps(table[0])):
+        for side, ((row, col), (from_row, from_col)) in enumerate(swap_moves(*swap)):
+            piece = board[from_row][from_col]
+            if any(board[r1][c1] == piece and board[r2][c2] == piece
+                   for (r1, c1), (r2, c2) in table_patterns(table, index, side, row, col)):
+                swaps.append(swap)
+                break
+    return swaps
+
+
+def find_swaps_by_trying(board):
+    """暴力枚举：逐个尝试交换并扫描整个棋盘"""
+    board_size = len(board)
+    windows = board_windows(board_size)
+    swaps = []
+    for swap in iter_swaps(board_size):
+        row1, col1, row2, col2 = swap
+        board[row1][col1], board[row2][col2] = board[row2][col2], board[row1][col1]
+        if any(board[r1][c1] == board[r2][c2] == board[r3][c3] for (r1, c1), (r2, c2), (r3, c3) in windows):
+            swaps.append(swap)
+        board[row1][col1], board[row2][col2] = board[row2][col2], board[row1][col1]
+    return swaps
+
+
+def random_board(rng, board_size):
+    """逐格随机生成，避免和左侧、上方的两格连成三连，得到没有现成匹配的棋盘"""
+    board = [[None] * board_size for _ in range(board_size)]
+    for row in range(board_size):
+        for col in range(board_size):
+            choices = [piece for piece in range(RANDOM_PIECES)
+                       if not (col >= 2 and board[row][col - 1] == board[row][col - 2] == piece)
+                       and not (row >= 2 and board[row - 1][col] == board[row - 2][col] == piece)]
+            board[row][col] = rng.choice(choices)
+    return board
+
+
+class MoveTableTest(unittest.TestCase):
+    def setUp(self):
+        self.board_sizes = list(BOARD_SIZES)
+        board_size = find_board_size(JS_FILES)
+        if board_size is not None and board_size not in self.board_sizes:
+            self.board_sizes.append(board_size)
+
+    def test_table_layout(self):
+        for board_size in self.board_sizes:
+            table = generate_move_table(board_size)
+            swap_count = 2 * board_size * (board_size - 1)
+            self.assertEqual(table[0], board_size)
+            self.assertEqual(len(table), 1 + swap_count * 2)
+            self.assertTrue(all(0 <= mask < 1 << len(MOVE_TABLE_PATTERNS) for mask in table[1:]))
+
+    def test_patterns_match_brute_force(self):
+        # 覆盖每种交换（横向、纵向）中的两个方块，包括棋盘四边和四角
+        for board_size in self.board_sizes:
+            table = generate_move_table(board_size)
+            for index, swap in enumerate(iter_swaps(board_size)):
+                for side, ((row, col), origin) in enumerate(swap_moves(*swap)):
+                    with self.subTest(board_size=board_size, swap=swap, side=side):
+                        self.assertEqual(table_patterns(table, index, side, row, col),
+                                         expected_patterns(board_size, row, col, origin))
+
+    def test_swap_directions(self):
+        # 方块分别向右、向左、向下、向上移动一格后组成三连，其余格子互不相同
+        cases = [
+            ((2, 0, 2, 1), [(2, 0), (1, 1), (3, 1)]),
+            ((2, 1, 2, 2), [(2, 2), (1, 1), (3, 1)]),
+            ((0, 2, 1, 2), [(0, 2), (1, 1), (1, 3)]),
+            ((1, 2, 2, 2), [(2, 2), (1, 1), (1, 3)]),
+        ]
+        board_size = 5
+        table = generate_move_table(board_size)
+        for swap, cells in cases:
+            board = [[10 + row * board_size + col for col in range(board_size)] for row in range(board_size)]
+            for row, col in cells:
+                board[row][col] = 0
+            with self.subTest(swap=swap):
+                self.assertEqual(find_swaps_with_table(table, board), [swap])
+                self.assertEqual(find_swaps_by_trying(board), [swap])
+
+    def test_board_edges(self):
+        # 角落和边上的方块：越界的三连不能出现在表中
+        board_size = 5
+        table = generate_move_table(board_size)
+        for index, swap in enumerate(iter_swaps(board_size)):
+            for side, ((row, col), _) in enumerate(swap_moves(*swap)):
+                for cells in table_patterns(table, index, side, row, col):
+                    with self.subTest(swap=swap, side=side):
+                        self.assertTrue(all(0 <= r < board_size and 0 <= c < board_size for r, c in cells))
+        corner = list(iter_swaps(board_size)).index((0, 0, 0, 1))
+        self.assertEqual(table_patterns(table, corner, 1, 0, 0), {frozenset([(1, 0), (2, 0)])})
+
+    def test_random_boards_match_brute_force(self):
+        for board_size in self.board_sizes:
+            table = generate_move_table(board_size)
+            rng = random.Random(board_size)
+            for attempt in range(RANDOM_BOARDS):
+                board = random_board(rng, board_size)
+                with self.subTest(board_size=board_size, attempt=attempt):
+                    self.assertEqual(find_swaps_with_table(table, board), find_swaps_by_trying(board))
+
+
+if __name__ == '__main__':
+    unittest.main()
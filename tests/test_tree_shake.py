@@ -0,0 +1,78 @@
+"""
+build.py 中摇树优化的测试
+"""
+
+import unittest
+
+from build import JS_FILES, TREE_SHAKE_KEEP, parse_js_declarations, read_file, tree_shake_js
+
+
+def removed_names(sources, html_content='', stubs=()):
+    _, removed, _ = tree_shake_js(sources, html_content, list(stubs), keep=[])
+    return {declaration['qualified_name'] for declaration in removed}
+
+
+class ParseClassMethodsTest(unittest.TestCase):
+    def test_field_initializer_with_semicolons(self):
+        source = """
+class Panel {
+    handlers = { open() { a(); b(); }, close: () => { c(); } };
+    count = 0;
+    show() { return this.count; }
+    hide() {}
+}
+"""
+        declarations, _ = parse_js_declarations(source)
+        methods = [declaration['name'] for declaration in declarations if declaration['kind'] == 'method']
+        self.assertEqual(methods, ['show', 'hide'])
+
+    def test_field_initializer_references_belong_to_class(self):
+        sources = ["""
+function helper() {}
+function unused() {}
+class Panel {
+    callback = () => { helper(); };
+}
+new Panel();
+"""]
+        self.assertEqual(removed_names(sources), {'unused'})
+
+
+class TreeShakeTest(unittest.TestCase):
+    def test_string_contents_are_references(self):
+        sources = ["""
+class Game {
+    render() { return `<button onclick="game.startFromLevel(${1})">1</button>`; }
+    startFromLevel(level) {}
+    unused() {}
+}
+const game = new Game();
+game.render();
+"""]
+        self.assertEqual(removed_names(sources), {'Game.unused'})
+
+    def test_html_handlers_are_entries(self):
+        sources = ["function start() {}\nfunction unused() {}\n"]
+        self.assertEqual(removed_names(sources, '<button onclick="start()">开始</button>'), {'unused'})
+
+    def test_stub_bodies_are_not_references(self):
+        sources = ["function entry() { helper(); }\nfunction helper() {}\nentry();\n"]
+        self.assertEqual(removed_names(sources, stubs=['entry']), {'helper'})
+
+    def test_keep_list(self):
+        sources = ["class Log {\n    replay() {}\n    unused() {}\n}\nnew Log();\n"]
+        _, removed, _ = tree_shake_js(sources, '', [], keep=['Log.replay'])
+        self.assertEqual([declaration['qualified_name'] for declaration in removed], ['Log.unused'])
+        with self.assertRaises(ValueError):
+            tree_shake_js(sources, '', [], keep=['Log.missing'])
+
+    def test_project_keep_list(self):
+        # TREE_SHAKE_KEEP 中的名字必须对应真实的声明，否则 tree_shake_js 会报错
+        sources = [read_file(file_path) for file_path in JS_FILES]
+        _, removed, _ = tree_shake_js(sources, '', [])
+        kept = set(TREE_SHAKE_KEEP)
+        self.assertFalse(kept & {declaration['qualified_name'] for declaration in removed})
+
+
+if __name__ == '__main__':
+    unittest.main()